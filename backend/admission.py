@@ -0,0 +1,142 @@
+import collections
+import math
+import threading
+import time
+from typing import Callable, Dict
+
+from fair_queue import LANE_BATCH, LANE_INTERACTIVE
+
+
+class AdmissionRejected(Exception):
+    """Request not admitted; retry_after is a hint in whole seconds"""
+
+    def __init__(self, reason: str, retry_after: int, queue_depth: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+        self.queue_depth = queue_depth
+
+
+class AdmissionController:
+    """
+    Bounded FIFO admission for analysis requests.
+
+    A request costs one slot per resume (capped at the capacity, so a batch
+    can always run on its own). Requests are admitted while the slots in use
+    plus their cost fit the capacity, which is re-read on every check so it
+    can follow the LLM concurrency limit. Otherwise a request waits in a
+    queue of at most max_queue entries for up to max_wait seconds; only the
+    head of the queue is admitted, so a waiting batch is not overtaken by
+    single requests forever. The exception is the interactive lane: a
+    request there that fits may pass a head that does not, up to
+    max_bypass times per head, so single analyses keep their priority
+    over batches without starving them. Requests that find the queue full
+    or time out are rejected with a Retry-After estimate derived from
+    recent request durations.
+    """
+
+    HOLD_ALPHA = 0.2
+    INITIAL_HOLD = 10.0  # seconds per request, until one has finished
+    POLL_INTERVAL = 1.0  # seconds; picks up capacity changes without a release
+
+    def __init__(self, capacity: Callable[[], int], max_queue: int, max_wait: float, max_bypass: int = 4,
+                 clock=time.monotonic):
+        self._capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_bypass = max_bypass
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._waiters = collections.deque()
+        self._in_use = 0
+        self._active = 0
+        self._bypassed = 0  # interactive requests admitted past the current head
+        self._hold = self.INITIAL_HOLD
+        self._admitted = 0
+        self._queued = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._bypasses = 0
+
+    def capacity(self) -> int:
+        return max(1, self._capacity())
+
+    def admit(self, cost: int = 1, lane: str = LANE_BATCH) -> int:
+        """Wait for room for `cost` slots; returns the slots granted (pass them to release())"""
+        with self._cond:
+            capacity = self.capacity()
+            cost = max(1, min(cost, capacity))
+            if self._in_use + cost <= capacity:
+                if not self._waiters:
+                    return self._take(cost)
+                if self._may_bypass(lane):
+                    return self._take(cost, bypass=True)
+
+            if len(self._waiters) >= self.max_queue:
+                self._rejected += 1
+                raise AdmissionRejected('queue_full', self._retry_after(), len(self._waiters))
+
+            ticket = object()
+            self._waiters.append(ticket)
+            self._queued += 1
+            deadline = self._clock() + self.max_wait
+            try:
+                while True:
+                    capacity = self.capacity()
+                    cost = min(cost, capacity)
+                    if self._in_use + cost <= capacity:
+                        if self._waiters[0] is ticket:
+                            return self._take(cost)
+                        if self._may_bypass(lane):
+                            return self._take(cost, bypass=True)
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        self._timed_out += 1
+                        raise AdmissionRejected('queue_timeout', self._retry_after(), len(self._waiters))
+                    self._cond.wait(min(remaining, self.POLL_INTERVAL))
+            finally:
+                if self._waiters[0] is ticket:
+                    self._bypassed = 0  # a new head gets its own bypass allowance
+                self._waiters.remove(ticket)
+                self._cond.notify_all()
+
+    def _may_bypass(self, lane: str) -> bool:
+        return lane == LANE_INTERACTIVE and self._bypassed < self.max_bypass
+
+    def _take(self, cost: int, bypass: bool = False) -> int:
+        if bypass:
+            self._bypassed += 1
+            self._bypasses += 1
+        self._in_use += cost
+        self._active += 1
+        self._admitted += 1
+        return cost
+
+    def release(self, granted: int, held_for: float = None):
+        with self._cond:
+            self._in_use = max(0, self._in_use - granted)
+            self._active = max(0, self._active - 1)
+            if held_for is not None:
+                self._hold = (1 - self.HOLD_ALPHA) * self._hold + self.HOLD_ALPHA * held_for
+            self._cond.notify_all()
+
+    def _retry_after(self) -> int:
+        # About `active` requests finish per average request duration
+        return max(1, math.ceil(self._hold * (len(self._waiters) + 1) / max(1, self._active)))
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'capacity': self.capacity(),
+                'in_use': self._in_use,
+                'active_requests': self._active,
+                'queue_depth': len(self._waiters),
+                'max_queue': self.max_queue,
+                'max_wait': self.max_wait,
+                'avg_request_seconds': round(self._hold, 2),
+                'admitted': self._admitted,
+                'queued': self._queued,
+                'interactive_bypasses': self._bypasses,
+                'rejected_queue_full': self._rejected,
+                'rejected_timeout': self._timed_out
+            }
@@ -1,19 +1,46 @@
 import json
+import math
+import multiprocessing
+import os
 import re
-from typing import Dict, List, Optional
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
 import numpy as np
 from datetime import datetime
 from .nlp_processor import NLPProcessor
 from .scoring_engine import ScoringEngine
 from .resume_parser import ResumeParser
 
+# Pool workers are never forked from the threaded server: a forked child can
+# inherit a lock another thread was holding (stdout, logging, the GIL-free
+# parts of SpaCy) and deadlock on it
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Engine owned by each process-pool worker, created once per process
+_worker_engine = None
+
+def _init_worker():
+    global _worker_engine
+    _worker_engine = AIEngine()
+    NLPProcessor.initialize_model()
+
+def _analyze_chunk(chunk: List[Dict], job_description: str, job_profile: Dict) -> List[Dict]:
+    """Process-pool entry point: analyze one chunk of resumes"""
+    return _worker_engine.analyze_chunk(chunk, job_description, job_profile)
+
 class AIEngine:
     """Main AI Engine that orchestrates all analysis"""
     
+    # Fewest resumes per process-pool task, so each chunk still goes through SpaCy as a batch
+    MIN_CHUNK_SIZE = 2
+    
     def __init__(self):
         self.nlp = NLPProcessor()
         self.scoring = ScoringEngine()
         self.parser = ResumeParser()
+        self._pool = None
+        self._pool_lock = threading.Lock()
         
         # Load predefined templates and patterns
         self._load_templates()
@@ -35,7 +62,8 @@ class AIEngine:
             }
         }
     
-    def analyze_resume(self, resume_text: str, job_description: str, filename: str = None) -> Dict:
+    def analyze_resume(self, resume_text: str, job_description: str, filename: str = None,
+                       job_profile: Dict = None) -> Dict:
         """Complete AI analysis of resume against job description"""
         
         print(f"🤖 Starting AI analysis for {filename or 'resume'}")
@@ -43,8 +71,12 @@ class AIEngine:
         # Parse resume
         resume_data = self.parser.analyze_resume(resume_text)
         
+        return self._analyze_parsed(resume_data, job_description, filename, job_profile)
+    
+    def _analyze_parsed(self, resume_data: Dict, job_description: str, filename: str = None,
+                        job_profile: Dict = None) -> Dict:
         # Calculate scores
-        score_results = self.scoring.calculate_score(resume_data, job_description)
+        score_results = self.scoring.calculate_score(resume_data, job_description, job_profile)
         
         # Generate comprehensive analysis
         analysis = self.generate_analysis(resume_data, score_results, filename)
@@ -59,38 +91,101 @@ class AIEngine:
         
         return analysis
     
-    def analyze_batch(self, resumes: List[Dict], job_description: str) -> List[Dict]:
-        """Analyze batch of resumes"""
+    def analyze_chunk(self, chunk: List[Dict], job_description: str, job_profile: Dict) -> List[Dict]:
+        """Analyze a chunk of resumes, parsed together through batched SpaCy"""
+        
+        try:
+            parsed = self.parser.analyze_resumes([resume.get('text', '') for resume in chunk])
+        except Exception as e:
+            print(f"❌ Batched parsing failed ({str(e)}), parsing resumes one by one")
+            parsed = [None] * len(chunk)
+        
+        analyses = []
+        for resume, resume_data in zip(chunk, parsed):
+            filename = resume.get('filename', f"resume_{resume['batch_index'] + 1}")
+            try:
+                if resume_data is None:
+                    resume_data = self.parser.analyze_resume(resume.get('text', ''))
+                analysis = self._analyze_parsed(resume_data, job_description, filename, job_profile)
+            except Exception as e:
+                print(f"❌ Error analyzing {filename}: {str(e)}")
+                analysis = self.generate_fallback_analysis(filename, str(e))
+            analysis['batch_index'] = resume['batch_index']
+            analyses.append(analysis)
         
-        print(f"🤖 Starting batch analysis of {len(resumes)} resumes")
+        return analyses
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """One worker per CPU, created once and kept for the engine's lifetime, so SpaCy loads once per worker"""
+        with self._pool_lock:
+            if self._pool is None:
+                context = multiprocessing.get_context(POOL_START_METHOD)
+                if POOL_START_METHOD == 'forkserver':
+                    # The fork server loads the entry module (app.py skips its startup work there, see
+                    # POOL_CHILD) and this one, so workers fork with SpaCy already imported
+                    context.set_forkserver_preload(['__main__', __name__])
+                self._pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, initializer=_init_worker,
+                                                 mp_context=context)
+            return self._pool
+    
+    def shutdown(self):
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+    
+    @classmethod
+    def plan_chunks(cls, count: int, workers: int, chunk_size: int = None) -> List[range]:
+        """
+        Split `count` resumes into index ranges: `chunk_size` each when given, otherwise
+        one near-equal chunk per worker of at least MIN_CHUNK_SIZE resumes
+        """
+        if count <= 0:
+            return []
+        if chunk_size:
+            return [range(start, min(start + chunk_size, count)) for start in range(0, count, chunk_size)]
+        chunks = max(1, min(workers, count // cls.MIN_CHUNK_SIZE))
+        bounds = [count * i // chunks for i in range(chunks + 1)]
+        return [range(bounds[i], bounds[i + 1]) for i in range(chunks)]
+    
+    def analyze_batch(self, resumes: List[Dict], job_description: str,
+                      max_workers: int = None, chunk_size: int = None) -> Iterator[Dict]:
+        """
+        Analyze a batch of resumes ({'text', 'filename'} dicts), yielding each
+        analysis as soon as it is ready. The job description is profiled once
+        for the whole batch; resumes are parsed in chunks through batched SpaCy,
+        spread over a process pool when there is more than one chunk.
+        
+        Results arrive in completion order and carry 'batch_index'; ranking is
+        left to the caller.
+        """
         
-        all_analyses = []
+        print(f"🤖 Starting batch analysis of {len(resumes)} resumes")
         
-        for i, resume_data in enumerate(resumes):
-            try:
-                analysis = self.analyze_resume(
-                    resume_data.get('text', ''),
-                    job_description,
-                    resume_data.get('filename', f'resume_{i+1}')
-                )
-                all_analyses.append(analysis)
-                
-            except Exception as e:
-                print(f"❌ Error analyzing resume {i+1}: {str(e)}")
-                # Add fallback analysis
-                all_analyses.append(self.generate_fallback_analysis(
-                    resume_data.get('filename', f'resume_{i+1}'),
-                    str(e)
-                ))
+        job_profile = self.scoring.analyze_job_description(job_description)
         
-        # Sort by score
-        all_analyses.sort(key=lambda x: x.get('overall_score', 0), reverse=True)
+        indexed = [dict(resume, batch_index=i) for i, resume in enumerate(resumes)]
+        workers = max(1, min(max_workers or os.cpu_count() or 1, os.cpu_count() or 1))
+        chunks = [indexed[r.start:r.stop] for r in self.plan_chunks(len(indexed), workers, chunk_size)]
         
-        # Add ranking
-        for rank, analysis in enumerate(all_analyses, 1):
-            analysis['rank'] = rank
+        if workers <= 1 or len(chunks) <= 1:
+            for chunk in chunks:
+                yield from self.analyze_chunk(chunk, job_description, job_profile)
+            return
         
-        return all_analyses
+        pool = self._get_pool()
+        futures = {pool.submit(_analyze_chunk, chunk, job_description, job_profile): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            try:
+                yield from future.result()
+            except Exception as e:
+                print(f"❌ Batch worker failed: {str(e)}")
+                for resume in futures[future]:
+                    analysis = self.generate_fallback_analysis(
+                        resume.get('filename', f"resume_{resume['batch_index'] + 1}"), str(e)
+                    )
+                    analysis['batch_index'] = resume['batch_index']
+                    yield analysis
     
     def generate_analysis(self, resume_data: Dict, score_results: Dict, filename: str = None) -> Dict:
         """Generate comprehensive analysis report"""
@@ -132,6 +227,7 @@ class AIEngine:
             'recommendation': recommendation,
             'experience_summary': experience_summary,
             'education_summary': education_summary,
+            'years_of_experience': self.format_years_of_experience(resume_data),
             'skills_matched': matched_skills,
             'skills_missing': missing_skills,
             'key_strengths': strengths,
@@ -173,6 +269,15 @@ class AIEngine:
         # Fallback
         return 'Professional Candidate'
     
+    def format_years_of_experience(self, resume_data: Dict) -> str:
+        """Total experience as 'X years', matching the LLM analysis schema"""
+        
+        total_months = sum(exp.get('duration_months', 0) for exp in resume_data.get('experience', []))
+        if not total_months:
+            return 'Not specified'
+        
+        return f"{round(total_months / 12, 1):g} years"
+    
     def generate_experience_summary(self, resume_data: Dict) -> str:
         """Generate experience summary"""
         
@@ -0,0 +1,239 @@
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Shape of the JSON object the LLM returns for one resume
+ANALYSIS_SCHEMA: Dict = {
+    'type': 'object',
+    'required': ['candidate_name', 'skills_matched', 'skills_missing', 'experience_summary', 'education_summary',
+                 'years_of_experience', 'overall_score', 'recommendation', 'key_strengths', 'areas_for_improvement'],
+    'properties': {
+        'candidate_name': {'type': 'string', 'minLength': 1},
+        'skills_matched': {'type': 'array', 'items': {'type': 'string', 'minLength': 1}},
+        'skills_missing': {'type': 'array', 'items': {'type': 'string', 'minLength': 1}},
+        'experience_summary': {'type': 'string', 'minLength': 1},
+        'education_summary': {'type': 'string', 'minLength': 1},
+        'years_of_experience': {'type': 'string', 'minLength': 1},
+        'overall_score': {'type': 'number'},
+        'recommendation': {'type': 'string', 'minLength': 1},
+        'key_strengths': {'type': 'array', 'items': {'type': 'string', 'minLength': 1}},
+        'areas_for_improvement': {'type': 'array', 'items': {'type': 'string', 'minLength': 1}}
+    }
+}
+
+# Returned by a checker for a value that cannot be used
+INVALID = object()
+
+Checker = Callable[[Any, str, List[str]], Any]
+
+
+def _string_checker(schema: Dict) -> Checker:
+    min_length = schema.get('minLength', 0)
+
+    def check(value, path, errors):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)  # e.g. years_of_experience: 5
+        if not isinstance(value, str):
+            errors.append(f'{path}: expected string')
+            return INVALID
+        value = value.strip()
+        if len(value) < min_length:
+            errors.append(f'{path}: empty')
+            return INVALID
+        return value
+    return check
+
+
+def _number_checker(schema: Dict) -> Checker:
+    minimum, maximum = schema.get('minimum'), schema.get('maximum')
+
+    def check(value, path, errors):
+        if isinstance(value, str):
+            try:
+                value = float(value.strip().rstrip('%'))
+            except ValueError:
+                pass
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f'{path}: expected number')
+            return INVALID
+        if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+            errors.append(f'{path}: out of range')
+            return INVALID
+        return value
+    return check
+
+
+def _array_checker(schema: Dict) -> Checker:
+    item_check = compile_schema(schema.get('items', {}))
+
+    def check(value, path, errors):
+        if isinstance(value, str):
+            value = [part for part in re.split(r'[,;\n]', value) if part.strip()]  # "Python, SQL"
+        if not isinstance(value, list):
+            errors.append(f'{path}: expected array')
+            return INVALID
+        items = []
+        for index, item in enumerate(value):
+            item = item_check(item, f'{path}[{index}]', errors)
+            if item is not INVALID:
+                items.append(item)
+        return items
+    return check
+
+
+def _object_checker(schema: Dict) -> Checker:
+    properties = {name: compile_schema(sub) for name, sub in schema.get('properties', {}).items()}
+    required = tuple(schema.get('required', ()))
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            errors.append(f'{path}: expected object')
+            return INVALID
+        result = dict(value)
+        for name in required:
+            if name not in value:
+                errors.append(f'{path}.{name}: missing')
+        for name, property_check in properties.items():
+            if name in value:
+                checked = property_check(value[name], f'{path}.{name}', errors)
+                if checked is INVALID:
+                    del result[name]
+                else:
+                    result[name] = checked
+        return result
+    return check
+
+
+_CHECKERS = {
+    'string': _string_checker,
+    'number': _number_checker,
+    'array': _array_checker,
+    'object': _object_checker
+}
+
+
+def compile_schema(schema: Dict) -> Checker:
+    """
+    Turn a JSON schema (the subset of types, required, properties, items,
+    minLength, minimum and maximum used here) into one nested checker
+    function, built once. A checker returns the value with obvious type
+    slips coerced ("82.5" -> 82.5, "A, B" -> ["A", "B"]), invalid object
+    properties and array items removed and their paths appended to
+    `errors`, or INVALID for an unusable value.
+    """
+    factory = _CHECKERS.get(schema.get('type'))
+    if factory is None:
+        return lambda value, path, errors: value
+    return factory(schema)
+
+
+_check_analysis = compile_schema(ANALYSIS_SCHEMA)
+
+
+def check_analysis(analysis: Any) -> Tuple[Optional[Dict], List[str]]:
+    """(analysis with invalid fields removed, list of problems); None when it is not an object at all"""
+    errors: List[str] = []
+    result = _check_analysis(analysis, '$', errors)
+    return (None if result is INVALID else result), errors
+
+
+_FENCE = re.compile(r'^```(?:json)?\s*|\s*```\s*$', re.IGNORECASE)
+_SMART_QUOTES = str.maketrans({'“': '"', '”': '"', '‘': "'", '’': "'"})
+_DANGLING_KEY = re.compile(r'(?:,\s*"[^"]*"\s*:?|[,:])\s*$')
+_BARE_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+
+def repair_json(text: str) -> str:
+    """
+    Cheap single-pass fix-up of near-valid JSON: drops code fences, text
+    around the outermost object, // and # comments and trailing commas,
+    maps Python literals to JSON, and closes a string, array or object cut
+    off by the token limit.
+    """
+    text = text.strip()
+    if '"' not in text:
+        text = text.translate(_SMART_QUOTES)  # only when curly quotes are all there is
+    text = _FENCE.sub('', text)
+    start = text.find('{')
+    if start == -1:
+        return text
+    text = text[start:]
+
+    out: List[str] = []
+    closers: List[str] = []
+    in_string = escaped = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch == '\n':
+                out[-1] = '\\n'
+            i += 1
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in '{[':
+            closers.append('}' if ch == '{' else ']')
+        elif ch in '}]':
+            while out and out[-1] in ' \t\r\n,':
+                out.pop()  # trailing comma
+            if closers:
+                closers.pop()
+            out.append(ch)
+            if not closers:
+                break  # end of the outermost object; ignore anything after it
+            i += 1
+            continue
+        elif ch == '#' or text.startswith('//', i):
+            end = text.find('\n', i)
+            i = len(text) if end == -1 else end
+            continue
+        elif ch.isalpha():
+            end = i
+            while end < len(text) and text[end].isalpha():
+                end += 1
+            word = text[i:end]
+            out.append(_BARE_LITERALS.get(word, word))
+            i = end
+            continue
+        out.append(ch)
+        i += 1
+
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    # Cut off mid-pair: drop a dangling key, colon or comma before closing
+    tail = ''.join(out).rstrip()
+    if closers and closers[-1] == '}':
+        tail = _DANGLING_KEY.sub('', tail)
+    elif closers:
+        tail = tail.rstrip(',')
+    return tail + ''.join(reversed(closers))
+
+
+def parse_json_object(text: str) -> Optional[Dict]:
+    """JSON object from an LLM response: strict parse first, then after repair_json(); None if neither works"""
+    if not text:
+        return None
+    loads = orjson.loads if orjson else json.loads
+    for candidate in (text, repair_json(text)):
+        try:
+            value = loads(candidate)
+        except ValueError:  # both libraries' JSONDecodeError
+            continue
+        if isinstance(value, dict):
+            return value
+    return None
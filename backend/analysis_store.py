@@ -0,0 +1,263 @@
+import hashlib
+import json
+import math
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from models import db, Analysis, AnalysisSkill, BatchAnalysis, JobDescription
+
+
+def content_hash(payload) -> str:
+    """Stable hash of an analysis payload, used to key cached reports"""
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def search_document(analysis: Dict) -> str:
+    """Text indexed for candidate search; shared by live indexing and the backfill"""
+    parts = [analysis.get('experience_summary', ''), analysis.get('education_summary', '')]
+    for field in ('skills_matched', 'key_strengths'):
+        parts.extend(str(item) for item in analysis.get(field) or [])
+    return ' '.join(str(part) for part in parts if part)
+
+
+def job_description_hash(job_description: str) -> str:
+    return hashlib.sha256((job_description or '').encode('utf-8')).hexdigest()
+
+
+class AnalysisStore:
+    """
+    Database-backed store for finished analyses.
+
+    Each single analysis and each batch is written once so reports, exports
+    and historical lookups never need to re-run the LLM.
+    """
+
+    BATCH_READ_CHUNK = 200
+
+    def _analysis_row(self, analysis_id: str, analysis: Dict, jd_hash: str,
+                      batch_id: str = None, created_at: datetime = None,
+                      fingerprint: Tuple[str, List[int]] = None) -> Dict:
+        score = analysis.get('overall_score')
+        text_fingerprint, minhash = fingerprint or (None, None)
+        return {
+            'id': analysis_id,
+            'batch_id': batch_id,
+            'rank': analysis.get('rank') if isinstance(analysis.get('rank'), int) else None,
+            'candidate_name': str(analysis.get('candidate_name', ''))[:200],
+            'filename': str(analysis.get('filename') or analysis.get('resume_original_filename', ''))[:500],
+            'job_description_hash': jd_hash,
+            'overall_score': float(score) if isinstance(score, (int, float)) else None,
+            'grade': analysis.get('grade'),
+            'recommendation': str(analysis.get('recommendation', ''))[:500],
+            'years_of_experience': str(analysis.get('years_of_experience', ''))[:50],
+            'analysis_data': analysis,
+            'text_fingerprint': text_fingerprint,
+            'minhash': minhash,
+            'created_at': created_at or datetime.utcnow(),
+            'updated_at': created_at or datetime.utcnow()
+        }
+
+    def _skill_rows(self, analysis_id: str, analysis: Dict) -> List[Dict]:
+        rows = []
+        for field, matched in (('skills_matched', True), ('skills_missing', False)):
+            for skill in analysis.get(field) or []:
+                rows.append({'analysis_id': analysis_id, 'skill_name': str(skill)[:200], 'matched': matched})
+        return rows
+
+    def _remember_job_description(self, job_description: str) -> str:
+        """Store the text once per hash; safe when concurrent requests insert the same one"""
+        jd_hash = job_description_hash(job_description)
+        if db.session.get(JobDescription, jd_hash) is not None:
+            return jd_hash
+
+        row = {'hash': jd_hash, 'text': job_description, 'created_at': datetime.utcnow()}
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            insert = None
+
+        if insert is not None:
+            db.session.execute(insert(JobDescription).values(**row).on_conflict_do_nothing(index_elements=['hash']))
+        else:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(JobDescription(**row))
+            except IntegrityError:
+                pass  # another request stored it first
+        return jd_hash
+
+    def _job_description_text(self, jd_hash: str) -> str:
+        record = db.session.get(JobDescription, jd_hash) if jd_hash else None
+        return record.text if record else ''
+
+    def save_analysis(self, analysis_id: str, analysis: Dict, job_description: str, batch_id: str = None,
+                      fingerprint: Tuple[str, List[int]] = None):
+        try:
+            jd_hash = self._remember_job_description(job_description)
+            record = db.session.merge(Analysis(**self._analysis_row(
+                analysis_id, analysis, jd_hash, batch_id, fingerprint=fingerprint
+            )))
+            record.skills = [AnalysisSkill(**row) for row in self._skill_rows(analysis_id, analysis)]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def get_analysis(self, analysis_id: str) -> Optional[Dict]:
+        record = db.session.get(Analysis, analysis_id)
+        if record is None:
+            return None
+        return {
+            'analysis_id': record.id,
+            'batch_id': record.batch_id,
+            'job_description': self._job_description_text(record.job_description_hash),
+            'analysis': record.analysis_data or {}
+        }
+
+    def save_batch(self, batch_id: str, analyses: List[Dict], job_description: str, summary: Dict = None,
+                   fingerprints: Dict[str, Tuple[str, List[int]]] = None):
+        """Persist a batch and all of its analyses in one transaction with a single bulk insert"""
+        summary = summary or {}
+        fingerprints = fingerprints or {}
+        now = datetime.utcnow()
+        try:
+            jd_hash = self._remember_job_description(job_description)
+            db.session.add(BatchAnalysis(
+                id=batch_id,
+                batch_id=batch_id,
+                job_description_hash=jd_hash,
+                total_files=summary.get('total_files', len(analyses)),
+                successfully_analyzed=summary.get('successfully_analyzed', len(analyses)),
+                failed_files=summary.get('failed_files', 0),
+                analysis_data=summary,
+                excel_report_path=summary.get('batch_excel_filename'),
+                created_at=now
+            ))
+            rows = [
+                self._analysis_row(analysis['analysis_id'], analysis, jd_hash, batch_id, now,
+                                   fingerprints.get(analysis['analysis_id']))
+                for analysis in analyses if analysis.get('analysis_id')
+            ]
+            skill_rows = [
+                skill_row
+                for analysis in analyses if analysis.get('analysis_id')
+                for skill_row in self._skill_rows(analysis['analysis_id'], analysis)
+            ]
+            if rows:
+                db.session.execute(db.insert(Analysis), rows)
+            if skill_rows:
+                db.session.execute(db.insert(AnalysisSkill), skill_rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def get_batch(self, batch_id: str) -> Optional[Dict]:
+        record = db.session.execute(
+            db.select(BatchAnalysis).filter_by(batch_id=batch_id)
+        ).scalar_one_or_none()
+        if record is None:
+            return None
+        return {
+            'batch_id': record.batch_id,
+            'job_description': self._job_description_text(record.job_description_hash),
+            'summary': record.analysis_data or {},
+            'analyses': list(self._iter_batch_rows(batch_id))
+        }
+
+    def _iter_batch_rows(self, batch_id: str) -> Iterator[Dict]:
+        query = (
+            db.select(Analysis.analysis_data)
+            .filter(Analysis.batch_id == batch_id)
+            .order_by(Analysis.rank)
+            .execution_options(yield_per=self.BATCH_READ_CHUNK)
+        )
+        for (analysis_data,) in db.session.execute(query):
+            yield analysis_data or {}
+
+    def iter_batch_analyses(self, batch_id: str) -> Optional[Iterator[Dict]]:
+        """Iterate the ranked analyses of a stored batch, or None if unknown"""
+        exists = db.session.execute(
+            db.select(BatchAnalysis.id).filter_by(batch_id=batch_id)
+        ).first()
+        if exists is None:
+            return None
+        return self._iter_batch_rows(batch_id)
+
+    def iter_fingerprints(self, limit: int = None) -> Iterator[Tuple]:
+        """(analysis_id, job_description_hash, text_fingerprint, minhash) of the most recent analyses"""
+        query = (
+            db.select(Analysis.id, Analysis.job_description_hash, Analysis.text_fingerprint, Analysis.minhash)
+            .filter(Analysis.text_fingerprint.isnot(None))
+            .order_by(Analysis.created_at.desc())
+            .limit(limit)
+            .execution_options(yield_per=self.BATCH_READ_CHUNK)
+        )
+        for row in db.session.execute(query):
+            yield tuple(row)
+
+    def get_summaries(self, analysis_ids: List[str]) -> Dict[str, Dict]:
+        """Summary columns of the given analyses, keyed by id"""
+        if not analysis_ids:
+            return {}
+        rows = db.session.execute(
+            db.select(*Analysis.summary_columns()).filter(Analysis.id.in_(analysis_ids))
+        ).mappings()
+        return {row['id']: Analysis.summary_dict(row) for row in rows}
+
+    def iter_search_documents(self) -> Iterator[Tuple[str, str]]:
+        """(analysis_id, text) built from stored analyses, for backfilling the search index"""
+        query = (
+            db.select(Analysis.id, Analysis.analysis_data)
+            .execution_options(yield_per=self.BATCH_READ_CHUNK)
+        )
+        for analysis_id, data in db.session.execute(query):
+            data = data or {}
+            if data.get('duplicate_of'):
+                continue
+            yield analysis_id, search_document(data)
+
+    def query_analyses(self, page: int = 1, per_page: int = 20, min_score: float = None, max_score: float = None,
+                       batch_id: str = None, skill: str = None, sort: str = 'created_at', order: str = 'desc',
+                       include_data: bool = False) -> Dict:
+        """
+        Paginated analysis lookup, ordered by the indexed score or created_at
+        columns. Only the summary columns are read unless include_data is set.
+        """
+        columns = Analysis.summary_columns()
+        if include_data:
+            columns = columns + (Analysis.analysis_data,)
+        query = db.select(*columns)
+
+        if min_score is not None:
+            query = query.filter(Analysis.overall_score >= min_score)
+        if max_score is not None:
+            query = query.filter(Analysis.overall_score <= max_score)
+        if batch_id:
+            query = query.filter(Analysis.batch_id == batch_id)
+        if skill:
+            query = query.filter(Analysis.id.in_(
+                db.select(AnalysisSkill.analysis_id).filter(
+                    AnalysisSkill.skill_name == skill, AnalysisSkill.matched.is_(True)
+                )
+            ))
+
+        total = db.session.scalar(db.select(db.func.count()).select_from(query.order_by(None).subquery()))
+
+        column = Analysis.overall_score if sort == 'score' else Analysis.created_at
+        query = query.order_by(column.asc() if order == 'asc' else column.desc(), Analysis.id)
+        rows = db.session.execute(query.limit(per_page).offset((page - 1) * per_page)).mappings()
+
+        return {
+            'items': [Analysis.summary_dict(row) for row in rows],
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'pages': math.ceil(total / per_page) if per_page else 0,
+            'has_next': page * per_page < total,
+            'has_prev': page > 1
+        }
@@ -1,9 +1,8 @@
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, request, jsonify, send_file, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 from PyPDF2 import PdfReader, PdfWriter
 from docx import Document
 import os
-import json
 import time
 import concurrent.futures
 from datetime import datetime, timedelta
@@ -26,8 +25,38 @@ import io
 import subprocess
 import tempfile
 import shutil
+import signal
+import functools
 from pathlib import Path
 
+# Make sibling modules importable when started as `backend.app:app` from the repo root
+if os.path.dirname(os.path.abspath(__file__)) not in sys.path:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Under `python app.py`, the local engine's process pool re-imports this module as __mp_main__;
+# that copy must not repeat the server's startup work (schema, index loads, signal and exit hooks)
+POOL_CHILD = __name__ == '__mp_main__'
+
+from report_writer import StreamingBatchReportWriter, COMPARISON_COLUMNS, convert_experience_to_bullet_points
+from models import db, json_serializer, json_deserializer
+from analysis_store import AnalysisStore, content_hash, job_description_hash, search_document
+from config import Config
+from industries import detect_industries
+from dedup import DuplicateIndex
+from key_pool import KeyPool, load_api_keys
+from scheduler import Scheduler
+from admission import AdmissionController, AdmissionRejected
+from dispatch import LLMDispatcher, RETRY_POLICY
+from fair_queue import DEFAULT_LANE_WEIGHTS, LANE_BATCH, LANE_INTERACTIVE
+from limiter import AIMDLimiter
+from llm_router import LLMProvider, LLMRouter, load_providers
+from prompts import RESUME_ANALYSIS_PROMPT, prompt_text
+from analysis_schema import check_analysis, parse_json_object
+from prompt_digest import build_resume_digest, count_tokens, truncate_to_tokens
+from search_index import CandidateSearchIndex
+from trend_aggregator import SkillTrendAggregator
+from exporters import EXPORT_FORMATS, iter_csv, iter_ndjson, build_parquet
+
 # Load environment variables with explicit path
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 if os.path.exists(dotenv_path):
@@ -40,17 +69,21 @@ else:
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-# Configure Groq API Keys (5 keys for parallel processing) - FIXED: Better key loading
-GROQ_API_KEYS = [
-    os.getenv('GROQ_API_KEY_1', '').strip(),
-    os.getenv('GROQ_API_KEY_2', '').strip(),
-    os.getenv('GROQ_API_KEY_3', '').strip(),
-    os.getenv('GROQ_API_KEY_4', '').strip(),
-    os.getenv('GROQ_API_KEY_5', '').strip()
-]
+# Database for persisted analyses (Render hands out postgres:// URLs)
+database_url = Config.SQLALCHEMY_DATABASE_URI
+if database_url.startswith('postgres://'):
+    database_url = database_url.replace('postgres://', 'postgresql://', 1)
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = Config.SQLALCHEMY_TRACK_MODIFICATIONS
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'json_serializer': json_serializer,
+    'json_deserializer': json_deserializer
+}
+db.init_app(app)
 
-# Filter out empty keys
-GROQ_API_KEYS = [key if key else None for key in GROQ_API_KEYS]
+# Configure Groq API Keys: GROQ_API_KEY_1..N, GROQ_API_KEYS and/or GROQ_API_KEYS_FILE
+# (re-read on SIGHUP, see reload_api_keys)
+GROQ_API_KEYS = load_api_keys()
 
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 GROQ_MODEL = "llama-3.3-70b-versatile"
@@ -64,6 +97,7 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 REPORTS_FOLDER = os.path.join(BASE_DIR, 'reports')
 RESUME_PREVIEW_FOLDER = os.path.join(BASE_DIR, 'resume_previews')
+SEARCH_INDEX_FOLDER = os.path.join(BASE_DIR, 'search_index')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(REPORTS_FOLDER, exist_ok=True)
 os.makedirs(RESUME_PREVIEW_FOLDER, exist_ok=True)
@@ -71,43 +105,88 @@ print(f"📁 Upload folder: {UPLOAD_FOLDER}")
 print(f"📁 Reports folder: {REPORTS_FOLDER}")
 print(f"📁 Resume Previews folder: {RESUME_PREVIEW_FOLDER}")
 
-# Cache for consistent scoring
+# Finished analyses are persisted so reports can be built on demand
+analysis_store = AnalysisStore()
+trend_aggregator = SkillTrendAggregator()
+if not POOL_CHILD:
+    with app.app_context():
+        db.create_all()
+
+# Fingerprints of earlier resumes, so re-uploaded candidates reuse their analysis
+DUPLICATE_INDEX_WARM_LIMIT = 20000
+duplicate_index = DuplicateIndex()
+if not POOL_CHILD:
+    with app.app_context():
+        try:
+            duplicate_index.load(analysis_store.iter_fingerprints(DUPLICATE_INDEX_WARM_LIMIT))
+            print(f"🧬 Duplicate index: {len(duplicate_index)} known resumes")
+        except Exception as e:
+            print(f"⚠️ Could not load duplicate index: {str(e)}")
+
+# Vector index over every analyzed resume for /search
+search_index = CandidateSearchIndex(SEARCH_INDEX_FOLDER)
+if len(search_index) == 0 and not POOL_CHILD:
+    with app.app_context():
+        try:
+            backfilled = search_index.add_many(analysis_store.iter_search_documents())
+            if backfilled:
+                print(f"🔎 Search index backfilled with {backfilled} stored analyses")
+        except Exception as e:
+            print(f"⚠️ Could not backfill search index: {str(e)}")
+print(f"🔎 Search index: {len(search_index)} resumes")
+
+# Striped build locks so concurrent downloads build a report only once;
+# a fixed set keeps memory flat however many reports get built
+REPORT_LOCK_STRIPES = 64
+report_build_locks = [threading.Lock() for _ in range(REPORT_LOCK_STRIPES)]
+
+# Cache for consistent scoring (single dict get/set, no lock needed)
 score_cache = {}
-cache_lock = threading.Lock()
+SCORE_CACHE_MAX_ENTRIES = 10000
 
 # Batch processing configuration - UPDATED to 10 resumes with PARALLEL processing
-MAX_CONCURRENT_REQUESTS = 5  # 5 keys = 5 concurrent requests
+LLM_CONCURRENCY_PER_KEY = max(1, int(os.environ.get('LLM_CONCURRENCY_PER_KEY', 1)))  # Concurrent Groq calls per key
+LLM_CONCURRENCY_HEADROOM = max(1, int(os.environ.get('LLM_CONCURRENCY_HEADROOM', 2)))  # Adaptive limit may grow to this multiple
+LLM_HEDGE_BUDGET_PERCENT = max(0.0, float(os.environ.get('LLM_HEDGE_BUDGET_PERCENT', 5)))  # Extra hedged calls allowed, 0 disables
+LLM_INTERACTIVE_WEIGHT = max(1.0, float(os.environ.get('LLM_INTERACTIVE_WEIGHT', DEFAULT_LANE_WEIGHTS[LANE_INTERACTIVE])))  # Queue share of single analyses vs one batch
 MAX_BATCH_SIZE = 10  # CHANGED: Increased from 6 to 10
+PROMPT_RESUME_TOKENS = int(os.environ.get('PROMPT_RESUME_TOKENS', 900))  # Token budget for the resume digest
+ADMISSION_MIN_SLOTS = int(os.environ.get('ADMISSION_MIN_SLOTS', 2 * MAX_BATCH_SIZE))  # Resumes in flight, at least
+ADMISSION_SLOTS_PER_LLM_CALL = int(os.environ.get('ADMISSION_SLOTS_PER_LLM_CALL', 4))  # Resumes per concurrent LLM call
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', 32))  # Requests waiting for admission
+ADMISSION_MAX_WAIT = float(os.environ.get('ADMISSION_MAX_WAIT', 20))  # Seconds a request may wait before a 429
+JSON_REREQUESTS = 1  # New LLM calls when even the repaired response is not a JSON object
+PROMPT_JD_TOKENS = int(os.environ.get('PROMPT_JD_TOKENS', 400))  # Token budget for the job description
 MIN_SKILLS_TO_SHOW = 5  # Minimum skills to show
 MAX_SKILLS_TO_SHOW = 8  # Maximum skills to show (5-8 range)
 
-# Rate limiting protection
-MAX_RETRIES = 2
-RETRY_DELAY_BASE = 2
-
-# Track key usage - Updated for 5 keys
-key_usage = {
-    0: {'count': 0, 'last_used': None, 'cooling': False, 'errors': 0, 'requests_this_minute': 0, 'minute_window_start': None},
-    1: {'count': 0, 'last_used': None, 'cooling': False, 'errors': 0, 'requests_this_minute': 0, 'minute_window_start': None},
-    2: {'count': 0, 'last_used': None, 'cooling': False, 'errors': 0, 'requests_this_minute': 0, 'minute_window_start': None},
-    3: {'count': 0, 'last_used': None, 'cooling': False, 'errors': 0, 'requests_this_minute': 0, 'minute_window_start': None},
-    4: {'count': 0, 'last_used': None, 'cooling': False, 'errors': 0, 'requests_this_minute': 0, 'minute_window_start': None}
-}
+# Two-stage ranking: only the best locally scored resumes go to the LLM
+PREFILTER_SHORTLIST_SIZE = 5
+
+# Analysis engines: Groq LLM, local AIEngine, or Groq with local fallback
+ANALYSIS_ENGINES = ('groq', 'local', 'hybrid')
+DEFAULT_ANALYSIS_ENGINE = os.environ.get('ANALYSIS_ENGINE', 'hybrid').lower()
 
 # Rate limit thresholds (Groq Developer Plan)
 MAX_REQUESTS_PER_MINUTE_PER_KEY = 100  # Conservative limit (actual is 1000, but we're careful)
 MAX_TOKENS_PER_MINUTE_PER_KEY = 250000  # Conservative limit
 
+# Per-process key usage shared by every request, batch and background task
+key_pool = KeyPool(GROQ_API_KEYS, MAX_REQUESTS_PER_MINUTE_PER_KEY)
+
+# One timer queue for warm-up retries, keep-alive pings and cleanup
+scheduler = Scheduler()
+WARMUP_RETRY_DELAY = 30  # seconds
+KEEP_WARM_INTERVAL = 180  # Every 3 minutes
+KEEP_AWAKE_INTERVAL = 30  # Ping every 30 seconds
+CLEANUP_INTERVAL = 300  # Every 5 minutes
+
 # Memory optimization
 service_running = True
 
 # Resume storage tracking
 resume_storage = {}
 
-# Scoring enhancement: Track used scores to ensure uniqueness
-used_scores = set()
-score_lock = threading.Lock()
-
 # NEW: Keep-alive tracking
 last_ping_time = datetime.now()
 ping_lock = threading.Lock()
@@ -123,68 +202,6 @@ def update_ping():
     with ping_lock:
         last_ping_time = datetime.now()
 
-def get_available_key(resume_index=None):
-    """Get the next available Groq API key using improved round-robin with rate limit checking"""
-    if not any(GROQ_API_KEYS):
-        return None, None
-    
-    current_time = datetime.now()
-    
-    # Reset minute counters if needed
-    for i in range(5):
-        if key_usage[i]['minute_window_start'] is None:
-            key_usage[i]['minute_window_start'] = current_time
-            key_usage[i]['requests_this_minute'] = 0
-        elif (current_time - key_usage[i]['minute_window_start']).total_seconds() > 60:
-            key_usage[i]['minute_window_start'] = current_time
-            key_usage[i]['requests_this_minute'] = 0
-    
-    # If specific index provided, try that key first
-    if resume_index is not None:
-        key_index = resume_index % 5
-        if (GROQ_API_KEYS[key_index] and 
-            not key_usage[key_index]['cooling'] and
-            key_usage[key_index]['requests_this_minute'] < MAX_REQUESTS_PER_MINUTE_PER_KEY):
-            return GROQ_API_KEYS[key_index], key_index + 1
-    
-    # Find the best key (least used this minute, not cooling, has lowest error count)
-    available_keys = []
-    for i, key in enumerate(GROQ_API_KEYS):
-        if (key and 
-            not key_usage[i]['cooling'] and
-            key_usage[i]['requests_this_minute'] < MAX_REQUESTS_PER_MINUTE_PER_KEY):
-            # Calculate priority score (lower is better)
-            priority_score = (
-                key_usage[i]['requests_this_minute'] * 10 +  # Usage weight
-                key_usage[i]['errors'] * 5                   # Error weight
-            )
-            available_keys.append((priority_score, i, key))
-    
-    if not available_keys:
-        # All keys are cooling or rate limited, try any non-cooling key
-        for i, key in enumerate(GROQ_API_KEYS):
-            if key and not key_usage[i]['cooling']:
-                print(f"⚠️ Using key {i+1} even though it's near limit: {key_usage[i]['requests_this_minute']}/{MAX_REQUESTS_PER_MINUTE_PER_KEY}")
-                return key, i + 1
-        return None, None
-    
-    # Sort by priority score and use the best one
-    available_keys.sort(key=lambda x: x[0])
-    best_key_index = available_keys[0][1]
-    return GROQ_API_KEYS[best_key_index], best_key_index + 1
-
-def mark_key_cooling(key_index, duration=30):
-    """Mark a key as cooling down"""
-    key_usage[key_index]['cooling'] = True
-    key_usage[key_index]['last_used'] = datetime.now()
-    
-    def reset_cooling():
-        time.sleep(duration)
-        key_usage[key_index]['cooling'] = False
-        print(f"✅ Key {key_index + 1} cooling completed")
-    
-    threading.Thread(target=reset_cooling, daemon=True).start()
-
 def calculate_resume_hash(resume_text, job_description):
     """Calculate a hash for caching consistent scores"""
     content = f"{resume_text[:500]}{job_description[:500]}".encode('utf-8')
@@ -192,28 +209,32 @@ def calculate_resume_hash(resume_text, job_description):
 
 def get_cached_score(resume_hash):
     """Get cached score if available"""
-    with cache_lock:
-        return score_cache.get(resume_hash)
+    return score_cache.get(resume_hash)
 
 def set_cached_score(resume_hash, score):
     """Cache score for consistency"""
-    with cache_lock:
-        score_cache[resume_hash] = score
+    if len(score_cache) >= SCORE_CACHE_MAX_ENTRIES:
+        score_cache.clear()
+    score_cache[resume_hash] = score
+
+def stable_fraction(*parts):
+    """Deterministic value in [0, 1) derived from the given parts"""
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return int(digest[:13], 16) / float(1 << 52)
 
-def generate_unique_score(base_score, filename):
+def generate_granular_score(base_score, filename):
     """
-    Generate a unique, non-round score with small variations.
-    Ensures no two candidates get exactly the same score.
+    Turn a base score into a non-round score with a small variation.
+    The variation depends only on the filename, so the same resume always
+    gets the same score; ties are broken later by rank_analyses().
     """
-    # Start with the base score from AI
     if base_score < 0 or base_score > 100:
-        base_score = random.randint(50, 85)
+        base_score = 50 + 35 * stable_fraction(filename, 'base')
     
     # Add small variation based on filename hash (deterministic)
     file_hash = hashlib.md5(filename.encode()).hexdigest()
     variation = int(file_hash[:2], 16) % 9 + 1  # 1-9 variation
     
-    # Apply variation with some randomness pattern
     variation_pattern = int(file_hash[2:4], 16) % 3
     if variation_pattern == 0:
         # Add variation
@@ -227,25 +248,26 @@ def generate_unique_score(base_score, filename):
         adjusted_score = max(0, min(100, base_score + adjustment))
     
     # Round to 1 decimal place for precision
-    adjusted_score = round(adjusted_score, 1)
-    
-    # Ensure unique score by small adjustments if needed
-    with score_lock:
-        attempts = 0
-        while adjusted_score in used_scores and attempts < 10:
-            # Add tiny random adjustment (0.1 to 0.9)
-            micro_adjust = random.uniform(0.1, 0.9)
-            if random.random() > 0.5:
-                adjusted_score = min(100, adjusted_score + micro_adjust)
-            else:
-                adjusted_score = max(0, adjusted_score - micro_adjust)
-            adjusted_score = round(adjusted_score, 1)
-            attempts += 1
-        
-        # Add to used scores
-        used_scores.add(adjusted_score)
-    
-    return adjusted_score
+    return round(adjusted_score, 1)
+
+def tie_break_key(analysis):
+    """Stable hash of an analysis' content, independent of ids and timestamps"""
+    return content_hash({
+        field: analysis.get(field)
+        for field in ('candidate_name', 'filename', 'years_of_experience', 'experience_summary',
+                      'skills_matched', 'skills_missing', 'recommendation')
+    })
+
+def rank_analyses(analyses):
+    """
+    Sort a batch best first and assign ranks. LLM-analyzed candidates rank
+    ahead of prefiltered-out ones; equal scores are ordered by tie_break_key,
+    so the same batch always ranks the same way.
+    """
+    analyses.sort(key=lambda a: (a.get('prefilter') == 'local_only', -(a.get('overall_score') or 0), tie_break_key(a)))
+    for rank, analysis in enumerate(analyses, 1):
+        analysis['rank'] = rank
+    return analyses
 
 def store_resume_file(file_data, filename, analysis_id):
     """Store resume file for later preview"""
@@ -486,99 +508,96 @@ def cleanup_orphaned_files():
     except Exception as e:
         print(f"⚠️ Error cleaning up orphaned files: {str(e)}")
 
-def call_groq_api(prompt, api_key, max_tokens=1500, temperature=0.1, timeout=45, retry_count=0, key_index=None):
-    """Call Groq API with optimized settings and rate limit protection"""
+# Groq plus any OpenAI-compatible providers from LLM_PROVIDERS, routed by live latency
+groq_provider = LLMProvider('groq', GROQ_API_URL, GROQ_MODEL, key_pool, LLM_CONCURRENCY_PER_KEY)
+llm_router = LLMRouter([groq_provider] + load_providers(MAX_REQUESTS_PER_MINUTE_PER_KEY))
+
+def call_groq_api(prompt, api_key, max_tokens=1500, temperature=0.1, timeout=45, key_index=None):
+    """Single Groq API call; retries are scheduled by llm_dispatcher, never slept on here"""
     if not api_key:
         print(f"❌ No Groq API key provided")
         return {'error': 'no_api_key', 'status': 500}
-    
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
-    }
-    
-    payload = {
-        'model': GROQ_MODEL,
-        'messages': [
-            {
-                'role': 'user',
-                'content': prompt
-            }
-        ],
-        'max_tokens': max_tokens,
-        'temperature': temperature,
-        'top_p': 0.9,
-        'stream': False,
-        'stop': None
-    }
-    
-    try:
-        start_time = time.time()
-        response = requests.post(
-            GROQ_API_URL,
-            headers=headers,
-            json=payload,
-            timeout=timeout
-        )
-        
-        response_time = time.time() - start_time
-        
-        if response.status_code == 200:
-            data = response.json()
-            if 'choices' in data and len(data['choices']) > 0:
-                result = data['choices'][0]['message']['content']
-                print(f"✅ Groq API response in {response_time:.2f}s")
-                return result
-            else:
-                print(f"❌ Unexpected Groq API response format")
-                return {'error': 'invalid_response', 'status': response.status_code}
-        
-        # RATE LIMIT HANDLING - IMPROVED
-        if response.status_code == 429:
-            print(f"❌ Rate limit exceeded for Groq API (Key {key_index})")
-            
-            # Track this error for the key
-            if key_index is not None:
-                key_usage[key_index - 1]['errors'] += 1
-                mark_key_cooling(key_index - 1, 60)  # Cool for 60 seconds on rate limit
-            
-            if retry_count < MAX_RETRIES:
-                # Use exponential backoff with jitter
-                wait_time = RETRY_DELAY_BASE ** (retry_count + 1) + random.uniform(2, 5)
-                print(f"⏳ Rate limited, retrying in {wait_time:.1f}s (attempt {retry_count + 1}/{MAX_RETRIES})")
-                time.sleep(wait_time)
-                return call_groq_api(prompt, api_key, max_tokens, temperature, timeout, retry_count + 1, key_index)
-            return {'error': 'rate_limit', 'status': 429}
-        
-        elif response.status_code == 503:
-            print(f"❌ Service unavailable for Groq API")
-            
-            if retry_count < 2:
-                wait_time = 15 + random.uniform(5, 10)
-                print(f"⏳ Service unavailable, retrying in {wait_time:.1f}s")
-                time.sleep(wait_time)
-                return call_groq_api(prompt, api_key, max_tokens, temperature, timeout, retry_count + 1, key_index)
-            return {'error': 'service_unavailable', 'status': 503}
-        
-        else:
-            print(f"❌ Groq API Error {response.status_code}: {response.text[:100]}")
-            if key_index is not None:
-                key_usage[key_index - 1]['errors'] += 1
-            return {'error': f'api_error_{response.status_code}', 'status': response.status_code}
-            
-    except requests.exceptions.Timeout:
-        print(f"❌ Groq API timeout after {timeout}s")
-        
-        if retry_count < 2:
-            wait_time = 10 + random.uniform(5, 10)
-            print(f"⏳ Timeout, retrying in {wait_time:.1f}s (attempt {retry_count + 1}/3)")
-            time.sleep(wait_time)
-            return call_groq_api(prompt, api_key, max_tokens, temperature, timeout, retry_count + 1, key_index)
-        return {'error': 'timeout', 'status': 408}
-    
-    except Exception as e:
-        print(f"❌ Groq API Exception: {str(e)}")
-        return {'error': str(e), 'status': 500}
+    return groq_provider.call(prompt, api_key, max_tokens=max_tokens, temperature=temperature,
+                              timeout=timeout, key_index=key_index)
+
+def llm_concurrency():
+    """Concurrent LLM calls allowed; grows linearly with the number of keys"""
+    return max(1, llm_router.concurrency)
+
+def llm_concurrency_ceiling():
+    return llm_concurrency() * LLM_CONCURRENCY_HEADROOM
+
+# Every LLM analysis goes through one queue; an AIMD limiter starts at llm_concurrency()
+# in-flight calls and adapts up to the ceiling. Calls slower than the provider's p90
+# are hedged on an idle key within the budget. Queued calls are served fairly per client,
+# single analyses ahead of batches
+llm_limiter = AIMDLimiter(llm_concurrency(), llm_concurrency_ceiling())
+llm_dispatcher = LLMDispatcher(llm_router, scheduler, llm_concurrency_ceiling(),
+                               hedge_budget=LLM_HEDGE_BUDGET_PERCENT / 100, limiter=llm_limiter,
+                               lane_weights={**DEFAULT_LANE_WEIGHTS, LANE_INTERACTIVE: LLM_INTERACTIVE_WEIGHT})
+
+def request_tenant():
+    """Client the current request's LLM calls are queued under: API token, else session, else IP"""
+    auth = request.headers.get('Authorization', '')
+    token = auth[7:].strip() if auth.lower().startswith('bearer ') else request.headers.get('X-API-Key')
+    if token:
+        return 'token:' + hashlib.sha256(token.encode('utf-8')).hexdigest()[:12]
+    session_id = request.headers.get('X-Session-Id') or request.cookies.get('session')
+    if session_id:
+        return 'session:' + hashlib.sha256(session_id.encode('utf-8')).hexdigest()[:12]
+    forwarded = request.headers.get('X-Forwarded-For', '')
+    return 'ip:' + (forwarded.split(',')[0].strip() or request.remote_addr or 'unknown')
+
+def admission_capacity():
+    """Resumes that may be in analysis at once; follows the adaptive LLM limit"""
+    return max(ADMISSION_MIN_SLOTS, ADMISSION_SLOTS_PER_LLM_CALL * llm_limiter.limit)
+
+# /analyze and /analyze-batch wait here (bounded) instead of all piling onto the keys at once
+admission = AdmissionController(admission_capacity, ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT,
+                                max_bypass=max(1, round(LLM_INTERACTIVE_WEIGHT)))
+
+def admission_controlled(cost, lane=LANE_BATCH):
+    """Route decorator: admit the request for cost() resume slots or answer 429 with Retry-After"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                granted = admission.admit(cost(), lane)
+            except AdmissionRejected as e:
+                print(f"🚦 {request.path} rejected ({e.reason}), queue depth {e.queue_depth}, retry after {e.retry_after}s")
+                response = jsonify({
+                    'error': 'Server is busy, please retry shortly',
+                    'reason': e.reason,
+                    'retry_after': e.retry_after,
+                    'queue_depth': e.queue_depth
+                })
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response, 429
+            started = time.monotonic()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                admission.release(granted, time.monotonic() - started)
+        return wrapper
+    return decorator
+
+def reload_api_keys():
+    """Re-read the configured keys into the running key pool and resize the dispatcher"""
+    global GROQ_API_KEYS
+    keys = load_api_keys()
+    added, removed = key_pool.reload(keys)
+    GROQ_API_KEYS = key_pool.keys()
+    llm_dispatcher.resize(llm_concurrency_ceiling(), initial_limit=llm_concurrency() if added else None)
+    print(f"🔑 API keys reloaded: {len(GROQ_API_KEYS)} configured (+{added}/-{removed}), "
+          f"{llm_limiter.limit}-{llm_concurrency_ceiling()} concurrent requests")
+    return added, removed
+
+def handle_sighup(signum, frame):
+    # Signal handlers run on the main thread between bytecodes; do the work on the scheduler
+    scheduler.call_later(0, reload_api_keys)
+
+if hasattr(signal, 'SIGHUP') and threading.current_thread() is threading.main_thread() and not POOL_CHILD:
+    signal.signal(signal.SIGHUP, handle_sighup)
 
 def warmup_groq_service():
     """Warm up Groq service connection"""
@@ -595,26 +614,27 @@ def warmup_groq_service():
         
         warmup_results = []
         
-        for i, api_key in enumerate(GROQ_API_KEYS):
+        for i, api_key in key_pool.configured():
             if api_key:
                 print(f"  Testing key {i+1}...")
                 start_time = time.time()
                 
-                # Update minute counter
-                current_time = datetime.now()
-                if (key_usage[i]['minute_window_start'] is None or 
-                    (current_time - key_usage[i]['minute_window_start']).total_seconds() > 60):
-                    key_usage[i]['minute_window_start'] = current_time
-                    key_usage[i]['requests_this_minute'] = 0
-                
-                response = call_groq_api(
-                    prompt="Hello, are you ready? Respond with just 'ready'.",
-                    api_key=api_key,
-                    max_tokens=10,
-                    temperature=0.1,
-                    timeout=15,
-                    key_index=i+1
-                )
+                api_key, key_number = key_pool.acquire(i, strict=True)
+                if not api_key:
+                    print(f"    ⚠️ Key {i+1} is cooling, skipped")
+                    warmup_results.append(False)
+                    continue
+                try:
+                    response = call_groq_api(
+                        prompt="Hello, are you ready? Respond with just 'ready'.",
+                        api_key=api_key,
+                        max_tokens=10,
+                        temperature=0.1,
+                        timeout=15,
+                        key_index=key_number
+                    )
+                finally:
+                    key_pool.release(key_number)
                 
                 if isinstance(response, dict) and 'error' in response:
                     print(f"    ⚠️ Key {i+1} failed: {response.get('error')}")
@@ -641,84 +661,65 @@ def warmup_groq_service():
         
     except Exception as e:
         print(f"⚠️ Warm-up attempt failed: {str(e)}")
-        threading.Timer(30.0, warmup_groq_service).start()
+        scheduler.call_later(WARMUP_RETRY_DELAY, warmup_groq_service)
         return False
 
 def keep_service_warm():
-    """Periodically send requests to keep Groq service responsive"""
-    global service_running
+    """Send a small request so the Groq service stays responsive (runs every KEEP_WARM_INTERVAL)"""
+    available_keys = sum(1 for key in GROQ_API_KEYS if key)
+    if not service_running or available_keys == 0 or not warmup_complete:
+        return
     
-    while service_running:
-        try:
-            time.sleep(180)  # Every 3 minutes
-            
-            available_keys = sum(1 for key in GROQ_API_KEYS if key)
-            if available_keys > 0 and warmup_complete:
-                print(f"♨️ Keeping Groq warm with {available_keys} keys...")
-                
-                for i, api_key in enumerate(GROQ_API_KEYS):
-                    if api_key and not key_usage[i]['cooling']:
-                        # Check minute limit
-                        current_time = datetime.now()
-                        if (key_usage[i]['minute_window_start'] is None or 
-                            (current_time - key_usage[i]['minute_window_start']).total_seconds() > 60):
-                            key_usage[i]['minute_window_start'] = current_time
-                            key_usage[i]['requests_this_minute'] = 0
-                        
-                        if key_usage[i]['requests_this_minute'] < 5:  # Only use if not busy
-                            try:
-                                response = call_groq_api(
-                                    prompt="Ping - just say 'pong'",
-                                    api_key=api_key,
-                                    max_tokens=5,
-                                    timeout=20,
-                                    key_index=i+1
-                                )
-                                if response and 'pong' in str(response).lower():
-                                    print(f"  ✅ Key {i+1} keep-alive successful")
-                                else:
-                                    print(f"  ⚠️ Key {i+1} keep-alive got unexpected response")
-                            except Exception as e:
-                                print(f"  ⚠️ Key {i+1} keep-alive failed: {str(e)}")
-                        break
-                    
-        except Exception as e:
-            print(f"⚠️ Keep-warm thread error: {str(e)}")
-            time.sleep(180)
+    print(f"♨️ Keeping Groq warm with {available_keys} keys...")
+    
+    for i, api_key in key_pool.configured():
+        if api_key and not key_pool.is_cooling(i + 1):
+            if key_pool.requests_this_window(i + 1) < 5:  # Only use if not busy
+                api_key, key_number = key_pool.acquire(i, strict=True)
+                if not api_key:
+                    break
+                try:
+                    response = call_groq_api(
+                        prompt="Ping - just say 'pong'",
+                        api_key=api_key,
+                        max_tokens=5,
+                        timeout=20,
+                        key_index=key_number
+                    )
+                    if response and 'pong' in str(response).lower():
+                        print(f"  ✅ Key {i+1} keep-alive successful")
+                    else:
+                        print(f"  ⚠️ Key {i+1} keep-alive got unexpected response")
+                except Exception as e:
+                    print(f"  ⚠️ Key {i+1} keep-alive failed: {str(e)}")
+                finally:
+                    key_pool.release(key_number)
+            break
 
 # FIXED: Enhanced keep_backend_awake function with more frequent pings
 def keep_backend_awake():
-    """Keep backend always active with more frequent pings"""
-    global service_running
+    """Self-ping so the backend stays active (runs every KEEP_AWAKE_INTERVAL)"""
+    if not service_running:
+        return
     
-    while service_running:
+    # Get the port from environment or use default
+    port = int(os.environ.get('PORT', 5002))
+    try:
+        response = requests.get(f"http://localhost:{port}/ping", timeout=5)
+        if response.status_code == 200:
+            update_ping()
+            print(f"✅ Self-ping successful - {datetime.now().strftime('%H:%M:%S')}")
+        else:
+            print(f"⚠️ Self-ping returned status {response.status_code}")
+    except Exception as e:
+        # If self-ping fails, try health check
         try:
-            time.sleep(30)  # Ping every 30 seconds (more frequent)
-            
-            # Try to self-ping to keep the service awake
-            try:
-                # Get the port from environment or use default
-                port = int(os.environ.get('PORT', 5002))
-                response = requests.get(f"http://localhost:{port}/ping", timeout=5)
-                if response.status_code == 200:
-                    update_ping()
-                    print(f"✅ Self-ping successful - {datetime.now().strftime('%H:%M:%S')}")
-                else:
-                    print(f"⚠️ Self-ping returned status {response.status_code}")
-            except Exception as e:
-                # If self-ping fails, try health check
-                try:
-                    port = int(os.environ.get('PORT', 5002))
-                    response = requests.get(f"http://localhost:{port}/health", timeout=5)
-                    if response.status_code == 200:
-                        update_ping()
-                        print(f"✅ Health check successful - {datetime.now().strftime('%H:%M:%S')}")
-                except Exception as e2:
-                    print(f"⚠️ Keep-alive check failed: {e2}")
-                    
-        except Exception as e:
-            print(f"⚠️ Keep-backend-awake thread error: {str(e)}")
-            time.sleep(30)
+            response = requests.get(f"http://localhost:{port}/health", timeout=5)
+            if response.status_code == 200:
+                update_ping()
+                print(f"✅ Health check successful - {datetime.now().strftime('%H:%M:%S')}")
+        except Exception as e2:
+            print(f"⚠️ Keep-alive check failed: {e2}")
 
 # NEW: Function to initialize service on startup
 def initialize_service():
@@ -730,16 +731,12 @@ def initialize_service():
     print("="*50)
     
     available_keys = sum(1 for key in GROQ_API_KEYS if key)
-    print(f"🔑 API Keys: {available_keys}/5 configured")
+    print(f"🔑 API Keys: {available_keys} configured")
     
     for i, key in enumerate(GROQ_API_KEYS):
-        if key:
-            # Mask the key for display
-            masked_key = key[:8] + "..." + key[-4:] if len(key) > 12 else "Configured"
-            status = f"✅ {masked_key}"
-        else:
-            status = "❌ Not configured"
-        print(f"  Key {i+1}: {status}")
+        # Mask the key for display
+        masked_key = key[:8] + "..." + key[-4:] if len(key) > 12 else "Configured"
+        print(f"  Key {i+1}: ✅ {masked_key}")
     
     print(f"📁 Upload folder: {UPLOAD_FOLDER}")
     print(f"📁 Reports folder: {REPORTS_FOLDER}")
@@ -747,7 +744,7 @@ def initialize_service():
     print(f"⚠️ RATE LIMIT PROTECTION: ACTIVE")
     print(f"📊 Max requests/minute/key: {MAX_REQUESTS_PER_MINUTE_PER_KEY}")
     print(f"⚡ SPEED MODE: PARALLEL processing")
-    print(f"🔀 Key rotation: Smart load balancing (5 keys)")
+    print(f"🔀 Key rotation: Smart load balancing ({available_keys} keys, {llm_limiter.limit}-{llm_concurrency_ceiling()} adaptive concurrent requests)")
     print(f"🛡️ Cooling: 60s on rate limits")
     print(f"✅ Max Batch Size: {MAX_BATCH_SIZE} resumes")
     print(f"✅ Skills Analysis: {MIN_SKILLS_TO_SHOW}-{MAX_SKILLS_TO_SHOW} skills per category")
@@ -760,7 +757,7 @@ def initialize_service():
     print(f"✅ Insights: 3 strengths & 3 improvements")
     print(f"✅ Resume Preview: Enabled with PDF conversion")
     print(f"⚡ Performance: ~10 resumes in 10-15 seconds")
-    print(f"✅ Excel Reports: Single & Batch with Individual Sheets in Columnar Format")
+    print(f"✅ Excel Reports: Single & Batch with Individual Sheets, built on first download")
     print(f"✅ Always Awake: Backend will stay active with self-pinging every 30 seconds")
     print("="*50 + "\n")
     
@@ -775,29 +772,19 @@ def initialize_service():
     
     if available_keys == 0:
         print("⚠️  WARNING: No Groq API keys found!")
-        print("Please set GROQ_API_KEY_1 through GROQ_API_KEY_5 in environment variables")
+        print("Please set GROQ_API_KEY_1..N, GROQ_API_KEYS or GROQ_API_KEYS_FILE in environment variables")
         print("Get free API keys from: https://console.groq.com")
     
     gc.enable()
     
     if available_keys > 0:
-        # Start warmup in a separate thread
-        warmup_thread = threading.Thread(target=warmup_groq_service, daemon=True)
-        warmup_thread.start()
-        
-        # Start keep-warm thread
-        keep_warm_thread = threading.Thread(target=keep_service_warm, daemon=True)
-        keep_warm_thread.start()
-        
-        # Start keep-backend-awake thread with more frequent pings
-        keep_awake_thread = threading.Thread(target=keep_backend_awake, daemon=True)
-        keep_awake_thread.start()
-        
-        # Start cleanup thread
-        cleanup_thread = threading.Thread(target=periodic_cleanup, daemon=True)
-        cleanup_thread.start()
+        # Warm-up runs right away; the rest are periodic scheduler tasks
+        scheduler.call_later(0, warmup_groq_service)
+        scheduler.call_every(KEEP_WARM_INTERVAL, keep_service_warm)
+        scheduler.call_every(KEEP_AWAKE_INTERVAL, keep_backend_awake)
+        scheduler.call_every(CLEANUP_INTERVAL, periodic_cleanup)
         
-        print("✅ Background threads started")
+        print("✅ Background tasks scheduled")
     else:
         print("⚠️ No API keys found. Starting in limited mode.")
 
@@ -883,118 +870,76 @@ def extract_text_from_txt(file_path):
         print(f"❌ TXT Error: {traceback.format_exc()}")
         return f"Error reading TXT: {str(e)}"
 
-def analyze_resume_with_ai(resume_text, job_description, filename=None, analysis_id=None, api_key=None, key_index=None):
+def analyze_resume_with_ai(resume_text, job_description, filename=None, analysis_id=None, key_hint=None,
+                           tenant=None, lane=LANE_INTERACTIVE):
     """Use Groq API to analyze resume against job description"""
     
-    if not api_key:
-        print(f"❌ No Groq API key provided for analysis.")
-        return generate_fallback_analysis(filename, "No API key available")
-    
-    resume_text = resume_text[:3000]  # Increased from 2500
-    job_description = job_description[:1500]  # Increased from 1200
+    # Keep the sections and lines that matter for this JD within a token budget
+    job_description = truncate_to_tokens(job_description, PROMPT_JD_TOKENS)
+    resume_text, original_tokens, digest_tokens = build_resume_digest(resume_text, job_description, PROMPT_RESUME_TOKENS)
+    if digest_tokens < original_tokens:
+        print(f"✂️ Resume digest for {filename}: {original_tokens} -> {digest_tokens} tokens")
     
     resume_hash = calculate_resume_hash(resume_text, job_description)
     cached_score = get_cached_score(resume_hash)
     
-    # Enhanced prompt for more accurate and granular scoring
-    prompt = f"""Analyze resume against job description and provide precise scoring:
-
-RESUME:
-{resume_text}
-
-JOB DESCRIPTION:
-{job_description}
-
-Provide analysis in this JSON format:
-{{
-    "candidate_name": "Extracted name or filename",
-    "skills_matched": ["skill1", "skill2", "skill3", "skill4", "skill5", "skill6", "skill7", "skill8"],
-    "skills_missing": ["skill1", "skill2", "skill3", "skill4", "skill5", "skill6", "skill7", "skill8"],
-    "experience_summary": "Provide a concise 4-5 sentence summary of candidate's experience. Focus on key roles, achievements, and relevance. Make sure each sentence is complete and not truncated. Write full sentences.",
-    "education_summary": "Provide a concise 4-5 sentence summary of education. Include degrees, institutions, and relevance. Make sure each sentence is complete and not truncated. Write full sentences.",
-    "years_of_experience": "X years",  # Add years of experience
-    "overall_score": 82.5,
-    "recommendation": "Strongly Recommended/Recommended/Consider/Not Recommended",
-    "key_strengths": ["strength1", "strength2", "strength3"],
-    "areas_for_improvement": ["area1", "area2", "area3"]
-}}
-
-IMPORTANT SCORING GUIDELINES:
-1. Use granular scores (e.g., 82.5, 76.3, 88.7, 91.2) - NOT just multiples of 5
-2. Consider these factors for scoring:
-   - Skills match percentage (weight: 40%)
-   - Experience relevance (weight: 30%)
-   - Education alignment (weight: 20%)
-   - Years of experience (weight: 10%)
-3. Provide EXACTLY 3 key_strengths and 3 areas_for_improvement
-4. Write full, complete sentences. Do not cut off sentences mid-way.
-5. Ensure proper sentence endings with periods.
-
-SCORING RANGES:
-- 90-100: Exceptional match (Strongly Recommended)
-- 80-89: Very good match (Recommended)
-- 70-79: Good match (Consider)
-- 60-69: Fair match (Consider with reservations)
-- Below 60: Needs improvement (Not Recommended)"""
+    # Static instructions and the JD lead, so prompts of one batch share a cacheable prefix
+    prompt = RESUME_ANALYSIS_PROMPT.render(job_description, resume_text)
+    usage = {}
 
     try:
-        print(f"⚡ Sending to Groq API (Key {key_index})...")
+        print(f"⚡ Queueing for LLM analysis ({filename}, ~{count_tokens(prompt_text(prompt))} prompt tokens)...")
         start_time = time.time()
         
-        # Track this request for rate limiting
-        if key_index is not None:
-            key_idx = key_index - 1
-            current_time = datetime.now()
-            if (key_usage[key_idx]['minute_window_start'] is None or 
-                (current_time - key_usage[key_idx]['minute_window_start']).total_seconds() > 60):
-                key_usage[key_idx]['minute_window_start'] = current_time
-                key_usage[key_idx]['requests_this_minute'] = 0
+        # Key choice and retries happen in the dispatcher; this thread only waits.
+        # JSON mode plus repair_json() make unparseable output rare; only then is the call repeated
+        analysis = None
+        for attempt in range(1 + JSON_REREQUESTS):
+            usage.clear()
+            response, key_index, provider = llm_dispatcher.complete(
+                prompt,
+                max_tokens=1600,  # Increased for more detailed scoring
+                temperature=0.2,  # Slightly increased for more variation
+                timeout=60,
+                key_hint=key_hint,
+                usage=usage,
+                json_output=True,
+                tenant=tenant,
+                lane=lane
+            )
+            RESUME_ANALYSIS_PROMPT.record_usage(usage)
+            
+            if provider is not None:
+                requests_this_minute = provider.key_pool.requests_this_window(key_index)
+                print(f"📊 Key {key_index} usage: {requests_this_minute}/{MAX_REQUESTS_PER_MINUTE_PER_KEY} this minute")
+                if requests_this_minute >= MAX_REQUESTS_PER_MINUTE_PER_KEY - 5:
+                    print(f"⚠️ Key {key_index} near limit ({requests_this_minute}/{MAX_REQUESTS_PER_MINUTE_PER_KEY})")
+            
+            if isinstance(response, dict) and 'error' in response:
+                error_type = response.get('error')
+                print(f"❌ Groq API error: {error_type}")
+                if error_type == 'no_api_key':
+                    return generate_fallback_analysis(filename, "No API key available")
+                if error_type == 'circuit_open':
+                    return generate_fallback_analysis(filename, "LLM provider temporarily unavailable", partial_success=True)
+                if error_type != 'invalid_json':
+                    return generate_fallback_analysis(filename, f"API Error: {error_type}", partial_success=True)
+                result_text = response.get('failed_generation') or ''
+            else:
+                result_text = response
             
-            key_usage[key_idx]['requests_this_minute'] += 1
-            print(f"📊 Key {key_index} usage: {key_usage[key_idx]['requests_this_minute']}/{MAX_REQUESTS_PER_MINUTE_PER_KEY} this minute")
-        
-        response = call_groq_api(
-            prompt=prompt,
-            api_key=api_key,
-            max_tokens=1600,  # Increased for more detailed scoring
-            temperature=0.2,  # Slightly increased for more variation
-            timeout=60,
-            key_index=key_index
-        )
+            analysis = parse_json_object(result_text)
+            if analysis is not None:
+                break
+            print(f"❌ JSON Parse Error (attempt {attempt + 1}/{1 + JSON_REREQUESTS})")
+            print(f"Response was: {result_text[:150]}")
         
-        if isinstance(response, dict) and 'error' in response:
-            error_type = response.get('error')
-            print(f"❌ Groq API error: {error_type}")
-            
-            if 'rate_limit' in error_type or '429' in str(error_type):
-                if key_index:
-                    mark_key_cooling(key_index - 1, 60)  # Longer cooldown for rate limits
-            
-            return generate_fallback_analysis(filename, f"API Error: {error_type}", partial_success=True)
+        if analysis is None:
+            return generate_fallback_analysis(filename, "JSON Parse Error", partial_success=True)
         
         elapsed_time = time.time() - start_time
         print(f"✅ Groq API response in {elapsed_time:.2f} seconds (Key {key_index})")
-        
-        result_text = response.strip()
-        
-        json_start = result_text.find('{')
-        json_end = result_text.rfind('}') + 1
-        
-        if json_start != -1 and json_end > json_start:
-            json_str = result_text[json_start:json_end]
-        else:
-            json_str = result_text
-        
-        json_str = json_str.replace('```json', '').replace('```', '').strip()
-        
-        try:
-            analysis = json.loads(json_str)
-            print(f"✅ Successfully parsed JSON response")
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON Parse Error: {e}")
-            print(f"Response was: {result_text[:150]}")
-            
-            return generate_fallback_analysis(filename, "JSON Parse Error", partial_success=True)
+        print(f"✅ Successfully parsed JSON response")
         
         analysis = validate_analysis(analysis, filename)
         
@@ -1002,27 +947,27 @@ SCORING RANGES:
         try:
             score = float(analysis['overall_score'])
             if score < 0 or score > 100:
-                # Generate a more granular base score
-                base_score = random.uniform(60, 85)
+                base_score = 60 + 25 * stable_fraction(resume_hash)
             else:
                 base_score = score
             
-            # Apply unique scoring with granular precision
-            unique_score = generate_unique_score(base_score, filename)
-            analysis['overall_score'] = unique_score
-            set_cached_score(resume_hash, unique_score)
+            # The same resume and job description always keep their first score
+            if cached_score is None:
+                cached_score = generate_granular_score(base_score, filename)
+                set_cached_score(resume_hash, cached_score)
+            analysis['overall_score'] = cached_score
         except (ValueError, TypeError) as e:
             print(f"⚠️ Score parsing error: {e}, using generated score")
-            # Generate a unique granular score
-            base_score = random.uniform(60, 85)
-            unique_score = generate_unique_score(base_score, filename)
-            analysis['overall_score'] = unique_score
+            base_score = 60 + 25 * stable_fraction(resume_hash)
+            analysis['overall_score'] = generate_granular_score(base_score, filename)
         
-        analysis['ai_provider'] = "groq"
+        analysis['ai_provider'] = provider.name
         analysis['ai_status'] = "Warmed up" if warmup_complete else "Warming up"
-        analysis['ai_model'] = GROQ_MODEL
+        analysis['ai_model'] = provider.model
         analysis['response_time'] = f"{elapsed_time:.2f}s"
-        analysis['key_used'] = f"Key {key_index}"
+        analysis['key_used'] = f"Key {key_index}" if provider is groq_provider else f"{provider.name} Key {key_index}"
+        analysis['prompt_version'] = RESUME_ANALYSIS_PROMPT.version
+        analysis['cached_tokens'] = usage.get('cached_tokens', 0)
         
         if analysis_id:
             analysis['analysis_id'] = analysis_id
@@ -1035,15 +980,30 @@ SCORING RANGES:
         print(f"❌ Groq Analysis Error: {str(e)}")
         return generate_fallback_analysis(filename, f"Analysis Error: {str(e)[:100]}")
     
+# Matched skills validate_analysis fills in when the model reported none, or too few
+DEFAULT_MATCHED_SKILLS = ['Python', 'JavaScript', 'SQL', 'Communication', 'Problem Solving', 'Team Collaboration', 'Project Management', 'Agile Methodology']
+PADDING_MATCHED_SKILLS = ['Python', 'JavaScript', 'SQL', 'Communication', 'Problem Solving', 'Teamwork', 'Project Management', 'Agile']
+
+def reported_skills(analysis):
+    """Matched skills the analysis actually found, without the defaults validate_analysis filled in"""
+    skills = list(analysis.get('skills_matched') or [])
+    if skills == DEFAULT_MATCHED_SKILLS[:len(skills)]:
+        return []
+    if len(skills) == MIN_SKILLS_TO_SHOW:
+        for needed in range(MIN_SKILLS_TO_SHOW, 0, -1):
+            if skills[-needed:] == PADDING_MATCHED_SKILLS[:needed]:
+                return skills[:-needed]
+    return skills
+
 def validate_analysis(analysis, filename):
     """Validate analysis data and fill missing fields - FIXED to ensure complete sentences"""
-    # Generate a unique granular base score for fallback
-    base_score = random.uniform(65, 82)
-    unique_score = generate_unique_score(base_score, filename)
+    # Granular base score for fallback
+    base_score = 65 + 17 * stable_fraction(filename, 'validate')
+    unique_score = generate_granular_score(base_score, filename)
     
     required_fields = {
         'candidate_name': 'Professional Candidate',
-        'skills_matched': ['Python', 'JavaScript', 'SQL', 'Communication', 'Problem Solving', 'Team Collaboration', 'Project Management', 'Agile Methodology'],
+        'skills_matched': list(DEFAULT_MATCHED_SKILLS),
         'skills_missing': ['Machine Learning', 'Cloud Computing', 'Data Analysis', 'DevOps', 'UI/UX Design', 'Cybersecurity', 'Mobile Development', 'Database Administration'],
         'experience_summary': 'The candidate demonstrates relevant professional experience with progressive responsibility. Their background shows expertise in key areas relevant to modern industry demands. They have experience collaborating with teams and delivering measurable results. Additional experience in specific domains enhances their suitability.',
         'education_summary': 'The candidate holds relevant educational qualifications from reputable institutions. Their academic background provides strong foundational knowledge in core subjects. Additional certifications enhance their professional profile. The education aligns well with industry requirements.',
@@ -1054,9 +1014,11 @@ def validate_analysis(analysis, filename):
         'areas_for_improvement': ['Could benefit from advanced certifications', 'Limited experience in cloud platforms', 'Should gain experience with newer technologies']
     }
     
-    for field, default_value in required_fields.items():
-        if field not in analysis:
-            analysis[field] = default_value
+    checked, problems = check_analysis(analysis)
+    if problems:
+        print(f"⚠️ Analysis schema for {filename}: {'; '.join(problems[:5])}")
+    # Missing or invalid fields get the defaults
+    analysis = {**required_fields, **(checked or {})}
     
     if analysis['candidate_name'] == 'Professional Candidate' and filename:
         base_name = os.path.splitext(filename)[0]
@@ -1070,9 +1032,8 @@ def validate_analysis(analysis, filename):
     
     # If we have fewer than 5 skills, pad with defaults
     if len(skills_matched) < MIN_SKILLS_TO_SHOW:
-        default_skills = ['Python', 'JavaScript', 'SQL', 'Communication', 'Problem Solving', 'Teamwork', 'Project Management', 'Agile']
         needed = MIN_SKILLS_TO_SHOW - len(skills_matched)
-        skills_matched.extend(default_skills[:needed])
+        skills_matched.extend(PADDING_MATCHED_SKILLS[:needed])
     
     if len(skills_missing) < MIN_SKILLS_TO_SHOW:
         default_skills = ['Machine Learning', 'Cloud Computing', 'Data Analysis', 'DevOps', 'UI/UX', 'Cybersecurity', 'Mobile Dev', 'Database']
@@ -1126,6 +1087,12 @@ def validate_analysis(analysis, filename):
     
     return analysis
 
+FALLBACK_RECOMMENDATIONS = ("Needs Full Analysis", "Service Warming Up - Please Retry")
+
+def is_fallback_analysis(analysis):
+    """True for placeholder analyses produced when the LLM call failed"""
+    return analysis.get('recommendation') in FALLBACK_RECOMMENDATIONS
+
 def generate_fallback_analysis(filename, reason, partial_success=False):
     """Generate a fallback analysis with unique granular scoring"""
     candidate_name = "Professional Candidate"
@@ -1138,9 +1105,9 @@ def generate_fallback_analysis(filename, reason, partial_success=False):
             if len(parts) >= 2 and len(parts) <= 4:
                 candidate_name = ' '.join(part.title() for part in parts)
     
-    # Generate unique granular score for fallback
-    base_score = random.uniform(55, 70) if partial_success else random.uniform(45, 60)
-    unique_score = generate_unique_score(base_score, filename)
+    # Granular score for fallback
+    base_score = (55 if partial_success else 45) + 15 * stable_fraction(filename, 'fallback')
+    unique_score = generate_granular_score(base_score, filename)
     
     if partial_success:
         return {
@@ -1151,7 +1118,7 @@ def generate_fallback_analysis(filename, reason, partial_success=False):
             "education_summary": 'The candidate possesses educational qualifications that provide a strong foundation for professional work. Their academic background includes relevant coursework and projects. Additional training complements their formal education. The educational profile aligns with industry requirements.',
             "years_of_experience": "3-5 years",
             "overall_score": unique_score,
-            "recommendation": "Needs Full Analysis",
+            "recommendation": FALLBACK_RECOMMENDATIONS[0],
             "key_strengths": ['Technical proficiency', 'Communication abilities', 'Problem-solving approach'],
             "areas_for_improvement": ['Advanced technical skills needed', 'Cloud platform experience required', 'Industry-specific knowledge'],
             "ai_provider": "groq",
@@ -1167,7 +1134,7 @@ def generate_fallback_analysis(filename, reason, partial_success=False):
             "education_summary": 'Educational background analysis will be available shortly upon service initialization. Academic qualifications assessment is pending full AI processing. Further details will be provided with complete analysis.',
             "years_of_experience": "Not specified",
             "overall_score": unique_score,
-            "recommendation": "Service Warming Up - Please Retry",
+            "recommendation": FALLBACK_RECOMMENDATIONS[1],
             "key_strengths": ['Fast learning capability', 'Strong work ethic', 'Good communication'],
             "areas_for_improvement": ['Service initialization required', 'Complete analysis pending', 'Detailed assessment needed'],
             "ai_provider": "groq",
@@ -1175,26 +1142,224 @@ def generate_fallback_analysis(filename, reason, partial_success=False):
             "ai_model": GROQ_MODEL,
         }
 
-def process_single_resume(args):
-    """Process a single resume with intelligent error handling"""
-    resume_file, job_description, index, total, batch_id = args
+# Local (non-LLM) analysis engine, loaded on first use
+_local_engine = None
+_local_engine_error = None
+_local_engine_lock = threading.Lock()
+
+def get_local_engine():
+    """AIEngine for local analysis, or None when its NLP dependencies are missing"""
+    global _local_engine, _local_engine_error
+    
+    if _local_engine is not None or _local_engine_error is not None:
+        return _local_engine
+    
+    with _local_engine_lock:
+        if _local_engine is None and _local_engine_error is None:
+            try:
+                # The engine modules use package-relative imports
+                parent_dir = os.path.dirname(BASE_DIR)
+                if parent_dir not in sys.path:
+                    sys.path.append(parent_dir)
+                from backend.ai_engine import AIEngine
+                _local_engine = AIEngine()
+                print("✅ Local analysis engine loaded")
+            except Exception as e:
+                _local_engine_error = str(e)
+                print(f"⚠️ Local analysis engine unavailable: {_local_engine_error}")
+    
+    return _local_engine
+
+def map_local_analysis(local, filename=None):
+    """Map an AIEngine analysis onto the schema returned by analyze_resume_with_ai"""
+    return {
+        'candidate_name': local.get('candidate_name') or (os.path.splitext(filename)[0] if filename else 'Professional Candidate'),
+        'skills_matched': [str(skill) for skill in (local.get('skills_matched') or [])][:MAX_SKILLS_TO_SHOW],
+        'skills_missing': [str(skill) for skill in (local.get('skills_missing') or [])][:MAX_SKILLS_TO_SHOW],
+        'experience_summary': local.get('experience_summary', ''),
+        'education_summary': local.get('education_summary', ''),
+        'years_of_experience': local.get('years_of_experience', 'Not specified'),
+        'overall_score': round(float(local.get('overall_score') or 0), 1),
+        'grade': local.get('grade'),
+        'recommendation': local.get('recommendation', ''),
+        'key_strengths': list(local.get('key_strengths') or [])[:3],
+        'areas_for_improvement': list(local.get('areas_for_improvement') or [])[:3],
+        'score_confidence': local.get('score_confidence'),
+        'detailed_scores': local.get('detailed_scores', {}),
+        'ai_provider': 'local',
+        'ai_model': local.get('ai_engine', 'ResumeAnalyzer AI'),
+        'ai_status': 'Local',
+    }
+
+def analyze_resume_locally(engine, resume_text, job_description, filename=None):
+    """Analyze a resume with the local engine (no network), in the app.py schema"""
+    start_time = time.time()
+    analysis = map_local_analysis(engine.analyze_resume(resume_text, job_description, filename), filename)
+    analysis['response_time'] = f"{time.time() - start_time:.2f}s"
+    return analysis
+
+def try_local_analysis(resume_text, job_description, filename=None):
+    """Local analysis, or None when the local engine is unavailable or fails"""
+    engine = get_local_engine()
+    if engine is None:
+        return None
+    try:
+        return analyze_resume_locally(engine, resume_text, job_description, filename)
+    except Exception as e:
+        print(f"⚠️ Local analysis failed for {filename}: {str(e)}")
+        return None
+
+def resolve_analysis_engine(value):
+    """Validated engine name from a request value, or None if unknown"""
+    engine = (value or DEFAULT_ANALYSIS_ENGINE).strip().lower()
+    return engine if engine in ANALYSIS_ENGINES else None
+
+def run_analysis_engine(engine, analysis_id, resume_text, job_description, filename, key_hint=None,
+                        tenant=None, lane=LANE_INTERACTIVE):
+    """
+    Analyze one resume with the requested engine:
+      groq   - LLM only (placeholder analysis when the call fails)
+      local  - AIEngine only, no network
+      hybrid - LLM, falling back to AIEngine when no key is free, the circuits are open or the call fails
+    LLM calls are queued fairly per tenant, in the given lane.
+    Returns (analysis, key_label), or (None, error message).
+    """
+    if engine == 'local':
+        analysis = try_local_analysis(resume_text, job_description, filename)
+        if analysis is None:
+            return None, 'Local analysis engine unavailable'
+        return analysis, "None (local)"
+    
+    analysis = find_duplicate_analysis(analysis_id, resume_text, job_description)
+    if analysis is not None:
+        return analysis, "None (duplicate)"
+    
+    # With every key cooling or circuit open (or no key configured) hybrid goes local instead of queueing
+    if len(llm_router) == 0 or (engine == 'hybrid' and (llm_router.next_available_in() > 0 or llm_router.circuit_open())):
+        duplicate_index.discard(analysis_id)
+        analysis = try_local_analysis(resume_text, job_description, filename) if engine == 'hybrid' else None
+        if analysis is None:
+            return None, 'No available API key'
+        print(f"🔁 No Groq key free - analyzed {filename} locally")
+        return analysis, "None (local)"
+    
+    analysis = None
+    try:
+        analysis = analyze_resume_with_ai(resume_text, job_description, filename, analysis_id, key_hint, tenant, lane)
+    finally:
+        finish_duplicate_tracking(analysis_id, analysis)
+    
+    if engine == 'hybrid' and is_fallback_analysis(analysis):
+        local_analysis = try_local_analysis(resume_text, job_description, filename)
+        if local_analysis is not None:
+            print(f"🔁 Groq call failed - analyzed {filename} locally")
+            return local_analysis, "None (local)"
+    
+    return analysis, analysis.get('key_used') or "None (fallback)"
+
+def persist_analysis(analysis_id, analysis, job_description):
+    """Persist a finished single analysis so reports can be built later"""
+    try:
+        analysis_store.save_analysis(analysis_id, analysis, job_description,
+                                     fingerprint=duplicate_index.signature_of(analysis_id))
+        duplicate_index.release([analysis_id])
+    except Exception as e:
+        print(f"⚠️ Could not persist analysis {analysis_id}: {str(e)}")
+    record_skill_trends([analysis], job_description)
+
+def persist_batch(batch_id, analyses, job_description, batch_summary):
+    """Persist a finished batch (and each of its analyses)"""
+    try:
+        summary = {k: v for k, v in batch_summary.items() if k != 'analyses'}
+        analysis_ids = [a['analysis_id'] for a in analyses if a.get('analysis_id')]
+        fingerprints = {}
+        for analysis_id in analysis_ids:
+            fingerprint = duplicate_index.signature_of(analysis_id)
+            if fingerprint:
+                fingerprints[analysis_id] = fingerprint
+        analysis_store.save_batch(batch_id, analyses, job_description, summary, fingerprints)
+        duplicate_index.release(analysis_ids)
+    except Exception as e:
+        print(f"⚠️ Could not persist batch {batch_id}: {str(e)}")
+    record_skill_trends(analyses, job_description)
+
+def find_duplicate_analysis(analysis_id, resume_text, job_description):
+    """
+    Look up an earlier analysis of the same (or a near-identical) resume for
+    the same job description. Returns a copy of it, or None after reserving
+    analysis_id as the original that will be sent to the LLM.
+    """
+    try:
+        fingerprint, signature = duplicate_index.fingerprint(resume_text)
+        jd_hash = job_description_hash(job_description)
+        match = duplicate_index.match_or_reserve(analysis_id, jd_hash, fingerprint, signature)
+        if match is None:
+            return None
+        
+        prior = match.entry.analysis
+        if prior is None:
+            with app.app_context():
+                stored = analysis_store.get_analysis(match.analysis_id)
+            prior = stored['analysis'] if stored else None
+        if not prior:
+            duplicate_index.reserve(analysis_id, jd_hash, fingerprint, signature)
+            return None
+        
+        print(f"♻️ Duplicate of {match.analysis_id} ({match.kind}, similarity {match.similarity:.2f}) - reusing analysis")
+        analysis = {k: v for k, v in prior.items() if k not in ('rank', 'excel_filename', 'resume_preview_filename')}
+        analysis['duplicate_of'] = match.analysis_id
+        analysis['duplicate_match'] = match.kind
+        analysis['duplicate_similarity'] = match.similarity
+        return analysis
+    except Exception as e:
+        print(f"⚠️ Duplicate lookup error: {str(e)}")
+        return None
+
+def finish_duplicate_tracking(analysis_id, analysis):
+    """Publish a finished analysis to waiting duplicates; placeholders are not reused"""
+    if analysis is None or is_fallback_analysis(analysis):
+        duplicate_index.discard(analysis_id)
+    else:
+        duplicate_index.complete(analysis_id, analysis)
+
+def index_resumes(documents):
+    """Add (analysis_id, resume_text) pairs to the candidate search index"""
+    try:
+        search_index.add_many(documents)
+    except Exception as e:
+        print(f"⚠️ Could not index resumes for search: {str(e)}")
+
+def record_skill_trends(analyses, job_description):
+    """
+    Feed the candidates' matched skills into the incremental trend counters.
+    Placeholder analyses, reused duplicates and filled-in default skills are
+    left out so they do not show up as trends.
+    """
+    try:
+        industries = detect_industries(job_description)
+        for analysis in analyses:
+            if is_fallback_analysis(analysis) or analysis.get('duplicate_of'):
+                continue
+            trend_aggregator.record(reported_skills(analysis), industries)
+    except Exception as e:
+        print(f"⚠️ Could not record skill trends: {str(e)}")
+
+def flush_skill_trends():
+    """Write pending skill trend counters (safe to call outside a request)"""
+    try:
+        with app.app_context():
+            trend_aggregator.flush()
+    except Exception as e:
+        print(f"⚠️ Skill trend flush error: {str(e)}")
+
+def prepare_batch_resume(resume_file, index, total, batch_id):
+    """Save an uploaded batch resume, store its preview and extract its text"""
+    print(f"📄 Processing resume {index + 1}/{total}: {resume_file.filename}")
+    
+    file_ext = os.path.splitext(resume_file.filename)[1].lower()
+    file_path = os.path.join(UPLOAD_FOLDER, f"batch_{batch_id}_{index}{file_ext}")
     
     try:
-        print(f"📄 Processing resume {index + 1}/{total}: {resume_file.filename}")
-        
-        api_key, key_index = get_available_key(index)
-        if not api_key:
-            return {
-                'filename': resume_file.filename,
-                'error': 'No available API key',
-                'status': 'failed',
-                'index': index
-            }
-        
-        file_ext = os.path.splitext(resume_file.filename)[1].lower()
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]
-        file_path = os.path.join(UPLOAD_FOLDER, f"batch_{batch_id}_{index}{file_ext}")
-        
         # Save the file first
         resume_file.save(file_path)
         
@@ -1209,8 +1374,6 @@ def process_single_resume(args):
         elif file_ext == '.txt':
             resume_text = extract_text_from_txt(file_path)
         else:
-            if os.path.exists(file_path):
-                os.remove(file_path)
             return {
                 'filename': resume_file.filename,
                 'error': f'Unsupported format: {file_ext}',
@@ -1219,8 +1382,6 @@ def process_single_resume(args):
             }
         
         if resume_text.startswith('Error'):
-            if os.path.exists(file_path):
-                os.remove(file_path)
             return {
                 'filename': resume_file.filename,
                 'error': resume_text,
@@ -1228,74 +1389,210 @@ def process_single_resume(args):
                 'index': index
             }
         
-        # Track key usage for rate limiting
-        if key_index:
-            key_idx = key_index - 1
-            key_usage[key_idx]['count'] += 1
-            key_usage[key_idx]['last_used'] = datetime.now()
-            print(f"🔑 Using Key {key_index} (Total: {key_usage[key_idx]['count']}, This minute: {key_usage[key_idx]['requests_this_minute']})")
-        
-        analysis = analyze_resume_with_ai(
-            resume_text, 
-            job_description, 
-            resume_file.filename, 
-            analysis_id,
-            api_key,
-            key_index
-        )
-        
-        analysis['filename'] = resume_file.filename
-        analysis['original_filename'] = resume_file.filename
-        
         resume_file.seek(0, 2)
         file_size = resume_file.tell()
         resume_file.seek(0)
-        analysis['file_size'] = f"{(file_size / 1024):.1f}KB"
         
-        analysis['analysis_id'] = analysis_id
-        analysis['processing_order'] = index + 1
-        analysis['key_used'] = f"Key {key_index}"
-        
-        # Add resume preview info
-        analysis['resume_stored'] = preview_filename is not None
-        analysis['has_pdf_preview'] = False
-        
-        if preview_filename:
-            analysis['resume_preview_filename'] = preview_filename
-            analysis['resume_original_filename'] = resume_file.filename
-            # Check if PDF preview is available
-            if analysis_id in resume_storage and resume_storage[analysis_id].get('has_pdf_preview'):
-                analysis['has_pdf_preview'] = True
+        return {
+            'status': 'prepared',
+            'index': index,
+            'filename': resume_file.filename,
+            'analysis_id': analysis_id,
+            'resume_text': resume_text,
+            'preview_filename': preview_filename,
+            'file_size': file_size
+        }
         
+    except Exception as e:
+        print(f"❌ Error preparing {resume_file.filename}: {str(e)}")
+        return {
+            'filename': resume_file.filename,
+            'error': f"Processing error: {str(e)[:100]}",
+            'status': 'failed',
+            'index': index
+        }
+    finally:
         # Keep the preview file, remove only the temp upload file
         if os.path.exists(file_path):
             os.remove(file_path)
+
+def finalize_batch_analysis(analysis, prepared, key_label):
+    """Attach file, ordering and preview details to a finished batch analysis"""
+    analysis_id = prepared['analysis_id']
+    
+    analysis['filename'] = prepared['filename']
+    analysis['original_filename'] = prepared['filename']
+    analysis['file_size'] = f"{(prepared['file_size'] / 1024):.1f}KB"
+    analysis['analysis_id'] = analysis_id
+    analysis['processing_order'] = prepared['index'] + 1
+    analysis['key_used'] = key_label
+    
+    # Add resume preview info
+    analysis['resume_stored'] = prepared['preview_filename'] is not None
+    analysis['has_pdf_preview'] = False
+    
+    if prepared['preview_filename']:
+        analysis['resume_preview_filename'] = prepared['preview_filename']
+        analysis['resume_original_filename'] = prepared['filename']
+        # Check if PDF preview is available
+        if analysis_id in resume_storage and resume_storage[analysis_id].get('has_pdf_preview'):
+            analysis['has_pdf_preview'] = True
+    
+    return {
+        'analysis': analysis,
+        'resume_text': prepared['resume_text'],
+        'status': 'success',
+        'index': prepared['index']
+    }
+
+def analyze_prepared_resume(prepared, job_description, engine='groq', tenant=None):
+    """Analyze a prepared batch resume with the requested engine, in the batch lane"""
+    index = prepared['index']
+    
+    try:
+        analysis, key_label = run_analysis_engine(
+            engine, prepared['analysis_id'], prepared['resume_text'], job_description, prepared['filename'], index,
+            tenant=tenant, lane=LANE_BATCH
+        )
+        if analysis is None:
+            return {
+                'filename': prepared['filename'],
+                'error': key_label,
+                'status': 'failed',
+                'index': index
+            }
         
-        print(f"✅ Completed: {analysis.get('candidate_name')} - Score: {analysis.get('overall_score'):.1f} (Key {key_index})")
-        
-        # Check if key needs cooling after this request
-        if key_index:
-            key_idx = key_index - 1
-            if key_usage[key_idx]['requests_this_minute'] >= MAX_REQUESTS_PER_MINUTE_PER_KEY - 5:
-                print(f"⚠️ Key {key_index} near limit ({key_usage[key_idx]['requests_this_minute']}/{MAX_REQUESTS_PER_MINUTE_PER_KEY})")
-        
-        return {
-            'analysis': analysis,
-            'status': 'success',
-            'index': index
-        }
+        result = finalize_batch_analysis(analysis, prepared, key_label)
+        print(f"✅ Completed: {analysis.get('candidate_name')} - Score: {analysis.get('overall_score'):.1f} ({key_label})")
+        return result
         
     except Exception as e:
-        print(f"❌ Error processing {resume_file.filename}: {str(e)}")
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
+        print(f"❌ Error processing {prepared['filename']}: {str(e)}")
         return {
-            'filename': resume_file.filename,
+            'filename': prepared['filename'],
             'error': f"Processing error: {str(e)[:100]}",
             'status': 'failed',
             'index': index
         }
 
+def process_single_resume(args, tenant=None):
+    """Process a single resume with intelligent error handling"""
+    resume_file, job_description, index, total, batch_id, engine = args
+    
+    prepared = prepare_batch_resume(resume_file, index, total, batch_id)
+    if prepared['status'] != 'prepared':
+        return prepared
+    
+    return analyze_prepared_resume(prepared, job_description, engine, tenant)
+
+def run_batch_pipeline(args_list, tenant=None):
+    """Analyze every resume in parallel; yields results as they complete"""
+    # Workers mostly wait on llm_dispatcher, which bounds the actual Groq concurrency
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_BATCH_SIZE, len(args_list))) as executor:
+        futures = [executor.submit(process_single_resume, args, tenant) for args in args_list]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+def prepare_batch_resumes(executor, args_list):
+    """Prepare every batch resume in parallel; returns (prepared, failed results)"""
+    prepared_list, failures = [], []
+    for prepared in executor.map(lambda args: prepare_batch_resume(args[0], args[2], args[3], args[4]), args_list):
+        if prepared['status'] == 'prepared':
+            prepared_list.append(prepared)
+        else:
+            failures.append(prepared)
+    return prepared_list, failures
+
+def analyze_prepared_locally(engine, prepared_list, job_description):
+    """
+    Yield (prepared, analysis) from AIEngine.analyze_batch in completion
+    order; analysis is None when the local engine could not analyze it.
+    """
+    resumes = [{'text': prepared['resume_text'], 'filename': prepared['filename']} for prepared in prepared_list]
+    for local in engine.analyze_batch(resumes, job_description):
+        prepared = prepared_list[local['batch_index']]
+        if local.get('analysis_status') == 'partial':
+            yield prepared, None
+        else:
+            yield prepared, map_local_analysis(local, prepared['filename'])
+
+def run_local_pipeline(args_list, job_description):
+    """Analyze every resume with the local engine across all CPU cores"""
+    engine = get_local_engine()
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_BATCH_SIZE, len(args_list))) as executor:
+        prepared_list, failures = prepare_batch_resumes(executor, args_list)
+    yield from failures
+    
+    for prepared, analysis in analyze_prepared_locally(engine, prepared_list, job_description):
+        if analysis is None:
+            yield {
+                'filename': prepared['filename'],
+                'error': 'Local analysis failed',
+                'status': 'failed',
+                'index': prepared['index']
+            }
+        else:
+            yield finalize_batch_analysis(analysis, prepared, "None (local)")
+
+def run_two_stage_pipeline(args_list, job_description, shortlist_size, shortlist_threshold=None, engine='groq',
+                           tenant=None):
+    """
+    Score every resume locally first and send only the shortlist (top
+    shortlist_size, optionally also at or above shortlist_threshold) to the
+    LLM. The rest keep their local analysis.
+    """
+    local_engine = get_local_engine()
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_BATCH_SIZE, len(args_list))) as executor:
+        prepared_list, failures = prepare_batch_resumes(executor, args_list)
+        yield from failures
+        
+        # Stage 1: local scoring of every resume (no network, all CPU cores)
+        local_analyses = {}
+        try:
+            if local_engine is None:
+                raise RuntimeError('local analysis engine unavailable')
+            for prepared, analysis in analyze_prepared_locally(local_engine, prepared_list, job_description):
+                if analysis is not None:
+                    local_analyses[prepared['analysis_id']] = analysis
+        except Exception as e:
+            print(f"⚠️ Local scoring failed: {str(e)} - unscored resumes go to the LLM")
+        
+        # Resumes the local engine could not score always go to the LLM
+        shortlist = [p for p in prepared_list if p['analysis_id'] not in local_analyses]
+        local_only = []
+        ranked = sorted(
+            (p for p in prepared_list if p['analysis_id'] in local_analyses),
+            key=lambda p: local_analyses[p['analysis_id']]['overall_score'],
+            reverse=True
+        )
+        for position, prepared in enumerate(ranked):
+            local_score = local_analyses[prepared['analysis_id']]['overall_score']
+            if position < shortlist_size and (shortlist_threshold is None or local_score >= shortlist_threshold):
+                shortlist.append(prepared)
+            else:
+                local_only.append(prepared)
+        
+        print(f"🎯 PREFILTER: {len(shortlist)}/{len(prepared_list)} resumes shortlisted for the LLM")
+        
+        for prepared in local_only:
+            analysis = local_analyses[prepared['analysis_id']]
+            analysis['prefilter'] = 'local_only'
+            analysis['local_score'] = analysis['overall_score']
+            yield finalize_batch_analysis(analysis, prepared, "None (local)")
+        
+        # Stage 2: LLM analysis of the shortlist
+        futures = {executor.submit(analyze_prepared_resume, prepared, job_description, engine, tenant): prepared
+                   for prepared in shortlist}
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            if result['status'] == 'success':
+                local = local_analyses.get(futures[future]['analysis_id'])
+                result['analysis']['prefilter'] = 'shortlisted'
+                result['analysis']['local_score'] = local['overall_score'] if local else None
+            yield result
+
 @app.route('/')
 def home():
     """Root route - API landing page"""
@@ -1307,20 +1604,11 @@ def home():
     
     available_keys = sum(1 for key in GROQ_API_KEYS if key)
     
-    # Calculate current minute usage
-    current_time = datetime.now()
-    key_usage_info = []
-    for i in range(5):
-        if GROQ_API_KEYS[i]:
-            if key_usage[i]['minute_window_start']:
-                seconds_in_window = (current_time - key_usage[i]['minute_window_start']).total_seconds()
-                if seconds_in_window > 60:
-                    requests_this_minute = 0
-                else:
-                    requests_this_minute = key_usage[i]['requests_this_minute']
-            else:
-                requests_this_minute = 0
-            key_usage_info.append(f"Key {i+1}: {requests_this_minute}/{MAX_REQUESTS_PER_MINUTE_PER_KEY}")
+    # Current minute usage
+    key_usage_info = [
+        f"{state['key']}: {state['requests_this_minute']}/{MAX_REQUESTS_PER_MINUTE_PER_KEY}"
+        for state in key_pool.snapshot() if state['configured']
+    ]
     
     return '''
     <!DOCTYPE html>
@@ -1366,7 +1654,7 @@ def home():
                 <strong>⚠️ RATE LIMIT PROTECTION ACTIVE:</strong>
                 <ul>
                     <li>Max ''' + str(MAX_REQUESTS_PER_MINUTE_PER_KEY) + ''' requests/minute per key</li>
-                    <li>PARALLEL processing with 5 keys</li>
+                    <li>PARALLEL processing with ''' + str(available_keys) + ''' keys</li>
                     <li>Automatic key rotation</li>
                     <li>60s cooling on rate limits</li>
                     <li>Current usage: ''' + ', '.join(key_usage_info) + '''</li>
@@ -1375,24 +1663,24 @@ def home():
             
             <div class="key-status">
                 <strong>API Keys:</strong>
-                ''' + ''.join([f'<span class="key ' + ('key-active' if key else 'key-inactive') + f'">Key {i+1}: ' + ('✅' if key else '❌') + '</span>' for i, key in enumerate(GROQ_API_KEYS)]) + '''
+                ''' + ''.join([f'<span class="key ' + ('key-active' if state['configured'] else 'key-inactive') + f'">{state["key"]}: ' + ('✅' if state['configured'] else '❌') + '</span>' for state in key_pool.snapshot()]) + '''
             </div>
             
             <p><strong>Model:</strong> ''' + GROQ_MODEL + '''</p>
             <p><strong>API Provider:</strong> Groq (Parallel Processing)</p>
             <p><strong>Max Batch Size:</strong> ''' + str(MAX_BATCH_SIZE) + ''' resumes</p>
-            <p><strong>Processing:</strong> PARALLEL with 5 keys</p>
+            <p><strong>Processing:</strong> PARALLEL with ''' + str(available_keys) + ''' keys</p>
             <p><strong>Scoring:</strong> Granular unique scores with 1 decimal precision</p>
-            <p><strong>Available Keys:</strong> ''' + str(available_keys) + '''/5</p>
+            <p><strong>Available Keys:</strong> ''' + str(available_keys) + '''</p>
             <p><strong>Last Activity:</strong> ''' + str(inactive_minutes) + ''' minutes ago</p>
             <p><strong>Keep-Alive:</strong> Active (ping every 30 seconds)</p>
             
             <h2>📡 Endpoints</h2>
             <div class="endpoint">
-                <strong>POST /analyze</strong> - Analyze single resume
+                <strong>POST /analyze</strong> - Analyze single resume (engine=groq|local|hybrid)
             </div>
             <div class="endpoint">
-                <strong>POST /analyze-batch</strong> - Analyze multiple resumes (up to ''' + str(MAX_BATCH_SIZE) + ''')
+                <strong>POST /analyze-batch</strong> - Analyze multiple resumes (up to ''' + str(MAX_BATCH_SIZE) + '''; engine, prefilter, shortlist_size, shortlist_threshold)
             </div>
             <div class="endpoint">
                 <strong>GET /health</strong> - Health check with key status
@@ -1410,17 +1698,30 @@ def home():
                 <strong>GET /resume-original/&lt;analysis_id&gt;</strong> - Download original resume file
             </div>
             <div class="endpoint">
-                <strong>GET /download/&lt;filename&gt;</strong> - Download batch report
+                <strong>GET /download/&lt;filename&gt;</strong> - Download batch report (?format=csv|ndjson|parquet for lightweight exports)
             </div>
             <div class="endpoint">
                 <strong>GET /download-single/&lt;analysis_id&gt;</strong> - Download single candidate report
             </div>
+            <div class="endpoint">
+                <strong>GET /analyses</strong> - Paginated stored analyses (?page, per_page, min_score, max_score, batch_id, skill, sort=score|created_at, include=analysis_data)
+            </div>
+            <div class="endpoint">
+                <strong>GET /analyses/&lt;analysis_id&gt;</strong> - Fetch a stored analysis
+            </div>
+            <div class="endpoint">
+                <strong>GET /trends</strong> - Top skills per industry (?industry, days, k)
+            </div>
+            <div class="endpoint">
+                <strong>GET|POST /search</strong> - Rank analyzed candidates against a job description (jd, k)
+            </div>
         </div>
     </body>
     </html>
     '''
 
 @app.route('/analyze', methods=['POST'])
+@admission_controlled(lambda: 1, LANE_INTERACTIVE)
 def analyze_resume():
     """Analyze single resume"""
     update_activity()
@@ -1440,8 +1741,11 @@ def analyze_resume():
         
         resume_file = request.files['resume']
         job_description = request.form['jobDescription']
+        engine = resolve_analysis_engine(request.form.get('engine'))
+        if engine is None:
+            return jsonify({'error': f"engine must be one of: {', '.join(ANALYSIS_ENGINES)}"}), 400
         
-        print(f"📄 Resume file: {resume_file.filename}")
+        print(f"📄 Resume file: {resume_file.filename} (engine: {engine})")
         print(f"📋 Job description: {len(job_description)} chars")
         
         if resume_file.filename == '':
@@ -1455,8 +1759,9 @@ def analyze_resume():
             print(f"❌ File too large: {file_size} bytes")
             return jsonify({'error': 'File size too large. Maximum size is 15MB.'}), 400
         
-        api_key, key_index = get_available_key()
-        if not api_key:
+        if engine == 'local' and get_local_engine() is None:
+            return jsonify({'error': 'Local analysis engine unavailable'}), 503
+        if engine != 'local' and len(llm_router) == 0 and (engine == 'groq' or get_local_engine() is None):
             return jsonify({'error': 'No available Groq API key'}), 500
         
         file_ext = os.path.splitext(resume_file.filename)[1].lower()
@@ -1480,23 +1785,27 @@ def analyze_resume():
         if resume_text.startswith('Error'):
             return jsonify({'error': resume_text}), 500
         
-        analysis = analyze_resume_with_ai(resume_text, job_description, resume_file.filename, analysis_id, api_key, key_index)
-        
-        # Create single Excel report
-        excel_filename = f"single_analysis_{analysis_id}.xlsx"
-        excel_path = create_single_report(analysis, job_description, excel_filename)
+        analysis, key_label = run_analysis_engine(engine, analysis_id, resume_text, job_description, resume_file.filename,
+                                                  tenant=request_tenant(), lane=LANE_INTERACTIVE)
         
         # Keep the preview file, remove only the temp upload file
         if os.path.exists(file_path):
             os.remove(file_path)
         
-        analysis['excel_filename'] = os.path.basename(excel_path)
-        analysis['ai_model'] = GROQ_MODEL
-        analysis['ai_provider'] = "groq"
-        analysis['ai_status'] = "Warmed up" if warmup_complete else "Warming up"
+        if analysis is None:
+            return jsonify({'error': key_label}), 503
+        
+        if analysis.get('duplicate_of'):
+            analysis['filename'] = resume_file.filename
+        
+        # The Excel report is built on the first download, not here
+        analysis['excel_filename'] = f"single_analysis_{analysis_id}.xlsx"
+        if analysis.get('ai_provider') != 'local':
+            analysis['ai_status'] = "Warmed up" if warmup_complete else "Warming up"
+        analysis['analysis_engine'] = engine
         analysis['response_time'] = analysis.get('response_time', 'N/A')
         analysis['analysis_id'] = analysis_id
-        analysis['key_used'] = f"Key {key_index}"
+        analysis['key_used'] = key_label
         
         # Add resume preview info
         analysis['resume_stored'] = preview_filename is not None
@@ -1509,6 +1818,10 @@ def analyze_resume():
             if analysis_id in resume_storage and resume_storage[analysis_id].get('has_pdf_preview'):
                 analysis['has_pdf_preview'] = True
         
+        persist_analysis(analysis_id, analysis, job_description)
+        if not analysis.get('duplicate_of'):
+            index_resumes([(analysis_id, search_document(analysis))])
+        
         total_time = time.time() - start_time
         print(f"✅ Request completed in {total_time:.2f} seconds")
         print("="*50 + "\n")
@@ -1520,6 +1833,7 @@ def analyze_resume():
         return jsonify({'error': f'Server error: {str(e)[:200]}'}), 500
 
 @app.route('/analyze-batch', methods=['POST'])
+@admission_controlled(lambda: len(request.files.getlist('resumes')))
 def analyze_resume_batch():
     """Analyze multiple resumes with PARALLEL processing and rate limit protection"""
     update_activity()
@@ -1529,11 +1843,6 @@ def analyze_resume_batch():
         print("📦 New batch analysis request received")
         start_time = time.time()
         
-        # Clear used scores at start of each batch
-        global used_scores
-        with score_lock:
-            used_scores.clear()
-        
         if 'resumes' not in request.files:
             print("❌ No 'resumes' key in request.files")
             return jsonify({'error': 'No resume files provided'}), 400
@@ -1545,36 +1854,39 @@ def analyze_resume_batch():
             return jsonify({'error': 'No job description provided'}), 400
         
         job_description = request.form['jobDescription']
+        engine = resolve_analysis_engine(request.form.get('engine'))
+        if engine is None:
+            return jsonify({'error': f"engine must be one of: {', '.join(ANALYSIS_ENGINES)}"}), 400
+        prefilter = request.form.get('prefilter', '').lower() in ('1', 'true', 'yes', 'on')
+        shortlist_size = max(1, request.form.get('shortlist_size', PREFILTER_SHORTLIST_SIZE, type=int))
+        shortlist_threshold = request.form.get('shortlist_threshold', type=float)
         
         if len(resume_files) == 0:
             print("❌ No files selected")
             return jsonify({'error': 'No files selected'}), 400
         
         print(f"📦 Batch size: {len(resume_files)} resumes")
+        tenant = request_tenant()  # read here; the pipeline threads have no request context
         
         if len(resume_files) > MAX_BATCH_SIZE:
             print(f"❌ Too many files: {len(resume_files)} (max: {MAX_BATCH_SIZE})")
             return jsonify({'error': f'Maximum {MAX_BATCH_SIZE} resumes allowed per batch'}), 400
         
-        available_keys = sum(1 for key in GROQ_API_KEYS if key)
-        if available_keys == 0:
+        if engine == 'local' and get_local_engine() is None:
+            print("❌ Local analysis engine unavailable")
+            return jsonify({'error': 'Local analysis engine unavailable'}), 503
+        if engine != 'local' and len(llm_router) == 0 and (engine == 'groq' or get_local_engine() is None):
             print("❌ No Groq API keys configured")
             return jsonify({'error': 'No Groq API keys configured'}), 500
         
         batch_id = datetime.now().strftime('%Y%m%d_%H%M%S_%f')[:-3]
-        
-        # Reset tracking
-        for i in range(5):
-            key_usage[i]['count'] = 0
-            key_usage[i]['last_used'] = None
-            key_usage[i]['errors'] = 0
-            key_usage[i]['requests_this_minute'] = 0
-            key_usage[i]['minute_window_start'] = datetime.now()
+        available_keys = len(llm_router)
         
         all_analyses = []
         errors = []
+        search_documents = []
         
-        print(f"🔄 PARALLEL Processing {len(resume_files)} resumes with {available_keys} keys...")
+        print(f"🔄 PARALLEL Processing {len(resume_files)} resumes with {available_keys} keys (engine: {engine})...")
         print(f"⚠️ RATE LIMIT PROTECTION: Max {MAX_REQUESTS_PER_MINUTE_PER_KEY} requests/minute/key")
         print(f"🎯 SCORING: Granular unique scores with 1 decimal precision")
         
@@ -1589,54 +1901,52 @@ def analyze_resume_batch():
                 })
                 continue
             
-            args_list.append((resume_file, job_description, index, len(resume_files), batch_id))
+            args_list.append((resume_file, job_description, index, len(resume_files), batch_id, engine))
+        
+        if prefilter and engine == 'local':
+            prefilter = False  # every resume is analyzed locally anyway
+        elif prefilter and get_local_engine() is None:
+            print("⚠️ Local engine unavailable - prefilter disabled, every resume goes to the LLM")
+            prefilter = False
         
-        # Process in PARALLEL with ThreadPoolExecutor
+        # Process in PARALLEL, optionally behind the local prefilter
         if args_list:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REQUESTS, len(args_list))) as executor:
-                # Submit all tasks
-                future_to_args = {executor.submit(process_single_resume, args): args for args in args_list}
-                
-                # Collect results as they complete
-                for future in concurrent.futures.as_completed(future_to_args):
-                    result = future.result()
-                    if result['status'] == 'success':
-                        all_analyses.append(result['analysis'])
-                    else:
-                        errors.append({
-                            'filename': result.get('filename', 'Unknown'),
-                            'error': result.get('error', 'Unknown error'),
-                            'index': result.get('index')
-                        })
+            if engine == 'local':
+                results = run_local_pipeline(args_list, job_description)
+            elif prefilter:
+                results = run_two_stage_pipeline(args_list, job_description, shortlist_size, shortlist_threshold, engine,
+                                                 tenant)
+            else:
+                results = run_batch_pipeline(args_list, tenant)
+            
+            for result in results:
+                if result['status'] == 'success':
+                    all_analyses.append(result['analysis'])
+                    if not result['analysis'].get('duplicate_of'):
+                        search_documents.append((result['analysis']['analysis_id'], search_document(result['analysis'])))
+                else:
+                    errors.append({
+                        'filename': result.get('filename', 'Unknown'),
+                        'error': result.get('error', 'Unknown error'),
+                        'index': result.get('index')
+                    })
         
-        all_analyses.sort(key=lambda x: x.get('overall_score', 0), reverse=True)
+        rank_analyses(all_analyses)
         
-        for rank, analysis in enumerate(all_analyses, 1):
-            analysis['rank'] = rank
+        # The batch workbook is built lazily on the first /download hit
+        batch_excel_filename = f"batch_analysis_{batch_id}.xlsx" if all_analyses else None
         
-        batch_excel_path = None
-        if all_analyses:
-            try:
-                print("📊 Creating batch Excel report...")
-                excel_filename = f"batch_analysis_{batch_id}.xlsx"
-                batch_excel_path = create_comprehensive_batch_report(all_analyses, job_description, excel_filename)
-                print(f"✅ Excel report created: {batch_excel_path}")
-            except Exception as e:
-                print(f"❌ Failed to create Excel report: {str(e)}")
-                traceback.print_exc()
-                # Create a minimal report
-                batch_excel_path = create_minimal_batch_report(all_analyses, job_description, excel_filename)
-        
-        key_stats = []
-        for i in range(5):
-            if GROQ_API_KEYS[i]:
-                key_stats.append({
-                    'key': f'Key {i+1}',
-                    'used': key_usage[i]['count'],
-                    'requests_this_minute': key_usage[i]['requests_this_minute'],
-                    'errors': key_usage[i]['errors'],
-                    'status': 'cooling' if key_usage[i]['cooling'] else 'available'
-                })
+        # Process-wide key usage; other requests share the same keys
+        key_stats = [
+            {
+                'key': state['key'],
+                'used': state['total_usage'],
+                'requests_this_minute': state['requests_this_minute'],
+                'errors': state['errors'],
+                'status': 'cooling' if state['cooling'] else 'available'
+            }
+            for state in key_pool.snapshot() if state['configured']
+        ]
         
         total_time = time.time() - start_time
         
@@ -1651,20 +1961,32 @@ def analyze_resume_batch():
             unique_scores = 0
             score_range = "N/A"
         
+        duplicates = [
+            {'filename': a.get('filename'), 'analysis_id': a.get('analysis_id'),
+             'duplicate_of': a.get('duplicate_of'), 'match': a.get('duplicate_match')}
+            for a in all_analyses if a.get('duplicate_of')
+        ]
+        
         batch_summary = {
             'success': True,
             'total_files': len(resume_files),
             'successfully_analyzed': len(all_analyses),
+            'duplicates_reused': len(duplicates),
+            'duplicates': duplicates,
             'failed_files': len(errors),
             'errors': errors,
-            'batch_excel_filename': os.path.basename(batch_excel_path) if batch_excel_path else None,
+            'batch_excel_filename': batch_excel_filename,
             'batch_id': batch_id,
             'analyses': all_analyses,
             'model_used': GROQ_MODEL,
-            'ai_provider': "groq",
+            'ai_provider': engine,
+            'analysis_engine': engine,
+            'locally_analyzed': sum(1 for a in all_analyses if a.get('ai_provider') == 'local'),
             'ai_status': "Warmed up" if warmup_complete else "Warming up",
             'processing_time': f"{total_time:.2f}s",
             'processing_method': 'PARALLEL',
+            'pipeline': 'two_stage' if prefilter else 'single_stage',
+            'shortlisted': sum(1 for a in all_analyses if a.get('prefilter') == 'shortlisted') if prefilter else len(all_analyses),
             'key_statistics': key_stats,
             'available_keys': available_keys,
             'rate_limit_protection': f"Active (max {MAX_REQUESTS_PER_MINUTE_PER_KEY}/min/key)",
@@ -1680,6 +2002,10 @@ def analyze_resume_batch():
             }
         }
         
+        if all_analyses:
+            persist_batch(batch_id, all_analyses, job_description, batch_summary)
+            index_resumes(search_documents)
+        
         print(f"✅ Batch analysis completed in {total_time:.2f}s (PARALLEL MODE)")
         print(f"📊 Key usage summary:")
         for stat in key_stats:
@@ -1763,49 +2089,6 @@ def get_resume_original(analysis_id):
         print(f"❌ Original resume download error: {traceback.format_exc()}")
         return jsonify({'error': f'Failed to download resume: {str(e)}'}), 500
 
-def convert_experience_to_bullet_points(experience_summary):
-    """Convert experience summary paragraph to bullet points"""
-    if not experience_summary:
-        return "• No experience summary available."
-    
-    # Clean the text
-    text = experience_summary.strip()
-    
-    # Remove any trailing ellipsis or incomplete sentences
-    if '...' in text:
-        # Find the last complete sentence before ellipsis
-        sentences = text.split('. ')
-        complete_sentences = []
-        for sentence in sentences:
-            if '...' in sentence:
-                # Remove the incomplete part
-                sentence = sentence.split('...')[0]
-                if sentence.strip():
-                    complete_sentences.append(sentence.strip() + '.')
-                break
-            elif sentence.strip():
-                complete_sentences.append(sentence.strip() + '.')
-        text = ' '.join(complete_sentences)
-    
-    # Split into sentences
-    sentences = text.replace('\n', ' ').split('. ')
-    
-    # Filter out empty sentences
-    sentences = [s.strip() for s in sentences if s.strip()]
-    
-    # Ensure proper sentence endings
-    for i, sentence in enumerate(sentences):
-        if not sentence.endswith('.') and not sentence.endswith('!') and not sentence.endswith('?'):
-            sentences[i] = sentence + '.'
-    
-    # Limit to 5 bullet points max
-    sentences = sentences[:5]
-    
-    # Convert to bullet points
-    bullet_points = '\n'.join([f'• {sentence}' for sentence in sentences])
-    
-    return bullet_points
-
 def create_single_report(analysis, job_description, filename="single_analysis.xlsx"):
     """Create a single candidate Excel report"""
     try:
@@ -2039,398 +2322,11 @@ def create_single_report(analysis, job_description, filename="single_analysis.xl
         return filepath
 
 def create_comprehensive_batch_report(analyses, job_description, filename="batch_resume_analysis.xlsx"):
-    """Create a comprehensive batch Excel report with professional formatting"""
+    """Create a comprehensive batch Excel report with professional formatting (streamed, write-only)"""
     try:
-        wb = Workbook()
-        
-        # ================== CANDIDATE COMPARISON SHEET ==================
-        ws_comparison = wb.active
-        ws_comparison.title = "Candidate Comparison"
-        
-        # Define styles
-        title_font = Font(bold=True, size=16, color="FFFFFF")
-        header_font = Font(bold=True, color="FFFFFF", size=11)
-        subheader_font = Font(bold=True, color="000000", size=10)
-        normal_font = Font(size=10)
-        bold_font = Font(bold=True, size=10)
-        
-        # Color scheme
-        header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")  # Blue
-        subheader_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")  # Light Blue
-        even_row_fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-        odd_row_fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-        
-        # Border styles
-        thin_border = Border(
-            left=Side(style='thin', color='000000'),
-            right=Side(style='thin', color='000000'),
-            top=Side(style='thin', color='000000'),
-            bottom=Side(style='thin', color='000000')
-        )
-        
-        thick_border = Border(
-            left=Side(style='medium', color='000000'),
-            right=Side(style='medium', color='000000'),
-            top=Side(style='medium', color='000000'),
-            bottom=Side(style='medium', color='000000')
-        )
-        
-        # Title Section
-        ws_comparison.merge_cells('A1:L1')
-        title_cell = ws_comparison['A1']
-        title_cell.value = "RESUME ANALYSIS REPORT - BATCH COMPARISON"
-        title_cell.font = title_font
-        title_cell.fill = header_fill
-        title_cell.alignment = Alignment(horizontal='center', vertical='center')
-        title_cell.border = thick_border
-        
-        # Report Info Section
-        info_row = 3
-        info_data = [
-            ("Report Date:", datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
-            ("Total Candidates:", len(analyses)),
-            ("AI Model:", f"Groq {GROQ_MODEL}"),
-            ("Job Description:", job_description[:100] + "..." if len(job_description) > 100 else job_description),
-        ]
-        
-        for i, (label, value) in enumerate(info_data):
-            ws_comparison.cell(row=info_row, column=1 + i*3, value=label).font = bold_font
-            ws_comparison.cell(row=info_row, column=2 + i*3, value=value).font = normal_font
-        
-        # Candidate Comparison Table Headers - NOW INCLUDES CANDIDATE NAME AT COLUMN 2
-        start_row = 5
-        headers = [
-            ("Rank", 8),
-            ("Candidate Name", 25),  # ADDED: Candidate Name column at position 2
-            ("File Name", 25),
-            ("Years of Experience", 15),
-            ("ATS Score", 12),
-            ("Recommendation", 20),
-            ("Experience Summary", 40),
-            ("Skills Matched", 30),
-            ("Skills Missing", 30),
-            ("Key Strengths", 25),
-            ("Areas for Improvement", 25)
-        ]
-        
-        # Write headers
-        for col, (header, width) in enumerate(headers, start=1):
-            cell = ws_comparison.cell(row=start_row, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            cell.border = thin_border
-            ws_comparison.column_dimensions[get_column_letter(col)].width = width
-        
-        # Write candidate data
-        for idx, analysis in enumerate(analyses):
-            row = start_row + idx + 1
-            row_fill = even_row_fill if idx % 2 == 0 else odd_row_fill
-            
-            # Rank
-            cell = ws_comparison.cell(row=row, column=1, value=analysis.get('rank', '-'))
-            cell.font = bold_font
-            cell.alignment = Alignment(horizontal='center')
-            cell.fill = row_fill
-            cell.border = thin_border
-            
-            # Candidate Name (Column 2 - ADDED)
-            cell = ws_comparison.cell(row=row, column=2, value=analysis.get('candidate_name', 'Unknown'))
-            cell.font = normal_font
-            cell.fill = row_fill
-            cell.border = thin_border
-            
-            # File Name (Now column 3)
-            cell = ws_comparison.cell(row=row, column=3, value=analysis.get('filename', 'Unknown'))
-            cell.font = normal_font
-            cell.fill = row_fill
-            cell.border = thin_border
-            
-            # Years of Experience (Now column 4)
-            cell = ws_comparison.cell(row=row, column=4, value=analysis.get('years_of_experience', 'Not specified'))
-            cell.font = normal_font
-            cell.alignment = Alignment(horizontal='center')
-            cell.fill = row_fill
-            cell.border = thin_border
-            
-            # ATS Score with color coding (Now column 5)
-            score = analysis.get('overall_score', 0)
-            cell = ws_comparison.cell(row=row, column=5, value=f"{score:.1f}")
-            cell.alignment = Alignment(horizontal='center')
-            cell.fill = row_fill
-            cell.border = thin_border
-            if score >= 80:
-                cell.font = Font(bold=True, color="00B050", size=10)  # Green
-            elif score >= 60:
-                cell.font = Font(bold=True, color="FFC000", size=10)  # Orange
-            else:
-                cell.font = Font(bold=True, color="FF0000", size=10)  # Red
-            
-            # Recommendation (Now column 6)
-            cell = ws_comparison.cell(row=row, column=6, value=analysis.get('recommendation', 'N/A'))
-            cell.font = normal_font
-            cell.fill = row_fill
-            cell.border = thin_border
-            
-            # Experience Summary - Now in bullet points (Now column 7)
-            exp_summary = analysis.get('experience_summary', 'No summary available.')
-            # Convert to bullet points
-            experience_bullets = convert_experience_to_bullet_points(exp_summary)
-            cell = ws_comparison.cell(row=row, column=7, value=experience_bullets)
-            cell.font = Font(size=9)
-            cell.alignment = Alignment(wrap_text=True, vertical='top')
-            cell.fill = row_fill
-            cell.border = thin_border
-            
-            # Skills Matched (5-8 skills) (Now column 8)
-            skills_matched = analysis.get('skills_matched', [])
-            cell = ws_comparison.cell(row=row, column=8, value="\n".join([f"• {skill}" for skill in skills_matched[:8]]))
-            cell.font = Font(size=9)
-            cell.alignment = Alignment(wrap_text=True, vertical='top')
-            cell.fill = row_fill
-            cell.border = thin_border
-            
-            # Skills Missing (5-8 skills) (Now column 9)
-            skills_missing = analysis.get('skills_missing', [])
-            cell = ws_comparison.cell(row=row, column=9, value="\n".join([f"• {skill}" for skill in skills_missing[:8]]))
-            cell.font = Font(size=9, color="FF0000")
-            cell.alignment = Alignment(wrap_text=True, vertical='top')
-            cell.fill = row_fill
-            cell.border = thin_border
-            
-            # Key Strengths (3 items) (Now column 10)
-            strengths = analysis.get('key_strengths', [])
-            cell = ws_comparison.cell(row=row, column=10, value="\n".join([f"• {strength}" for strength in strengths[:3]]))
-            cell.font = Font(size=9, color="00B050")
-            cell.alignment = Alignment(wrap_text=True, vertical='top')
-            cell.fill = row_fill
-            cell.border = thin_border
-            
-            # Areas for Improvement (3 items) (Now column 11)
-            improvements = analysis.get('areas_for_improvement', [])
-            cell = ws_comparison.cell(row=row, column=11, value="\n".join([f"• {area}" for area in improvements[:3]]))
-            cell.font = Font(size=9, color="FF6600")
-            cell.alignment = Alignment(wrap_text=True, vertical='top')
-            cell.fill = row_fill
-            cell.border = thin_border
-        
-        # Add summary statistics at the bottom
-        summary_row = start_row + len(analyses) + 2
-        scores = [a.get('overall_score', 0) for a in analyses]
-        avg_score = round(sum(scores) / len(scores), 2) if scores else 0
-        top_score = max(scores, default=0)
-        bottom_score = min(scores, default=0)
-        
-        # Calculate average years of experience
-        years_list = []
-        for a in analyses:
-            years_text = a.get('years_of_experience', 'Not specified')
-            # Extract numeric values from years text
-            years_match = re.search(r'(\d+[\+\-]?)', str(years_text))
-            if years_match:
-                years_list.append(years_match.group(1))
-        
-        avg_years = "N/A"
-        if years_list:
-            try:
-                # Calculate average of numeric years
-                numeric_years = []
-                for y in years_list:
-                    if '+' in y:
-                        numeric_years.append(int(y.replace('+', '')) + 2)  # Approximate for +
-                    elif '-' in y:
-                        parts = y.split('-')
-                        if len(parts) == 2:
-                            numeric_years.append((int(parts[0]) + int(parts[1])) / 2)
-                    else:
-                        numeric_years.append(int(y))
-                if numeric_years:
-                    avg_years = f"{sum(numeric_years)/len(numeric_years):.1f} years"
-            except:
-                avg_years = "Various"
-        
-        # Unique scores count
-        unique_scores = len(set(round(s, 1) for s in scores))
-        
-        summary_data = [
-            ("Average Score:", f"{avg_score:.2f}/100"),
-            ("Highest Score:", f"{top_score:.1f}/100"),
-            ("Lowest Score:", f"{bottom_score:.1f}/100"),
-            ("Average Experience:", avg_years),
-            ("Unique Scores:", f"{unique_scores}/{len(analyses)}"),
-            ("Analysis Date:", datetime.now().strftime("%Y-%m-%d"))
-        ]
-        
-        for i, (label, value) in enumerate(summary_data):
-            ws_comparison.cell(row=summary_row, column=1 + i*2, value=label).font = bold_font
-            ws_comparison.cell(row=summary_row, column=2 + i*2, value=value).font = bold_font
-            ws_comparison.cell(row=summary_row, column=2 + i*2).alignment = Alignment(horizontal='center')
-        
-        # ================== INDIVIDUAL CANDIDATE SHEETS ==================
-        for analysis in analyses:
-            candidate_name = analysis.get('candidate_name', f"Candidate_{analysis.get('rank', 'Unknown')}")
-            # Clean sheet name (remove invalid characters)
-            sheet_name = re.sub(r'[\\/*?:[\]]', '_', candidate_name[:31])
-            
-            # Create individual sheet for each candidate
-            ws_candidate = wb.create_sheet(title=sheet_name)
-            
-            # Define professional styles for candidate sheet
-            candidate_title_font = Font(bold=True, size=14, color="FFFFFF")
-            candidate_header_font = Font(bold=True, size=11, color="000000")
-            candidate_label_font = Font(bold=True, size=10, color="000000")
-            candidate_value_font = Font(size=10, color="000000")
-            
-            candidate_title_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            candidate_section_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-            
-            # Title Section
-            ws_candidate.merge_cells('A1:H1')
-            title_cell = ws_candidate['A1']
-            title_cell.value = f"CANDIDATE ANALYSIS REPORT - {candidate_name.upper()}"
-            title_cell.font = candidate_title_font
-            title_cell.fill = candidate_title_fill
-            title_cell.alignment = Alignment(horizontal='center', vertical='center')
-            title_cell.border = thick_border
-            
-            # Report Info Section
-            ws_candidate['A3'] = "Report Date:"
-            ws_candidate['B3'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            ws_candidate['A3'].font = candidate_label_font
-            ws_candidate['B3'].font = candidate_value_font
-            
-            ws_candidate['A4'] = "AI Model:"
-            ws_candidate['B4'] = f"Groq {GROQ_MODEL}"
-            ws_candidate['A4'].font = candidate_label_font
-            ws_candidate['B4'].font = candidate_value_font
-            
-            ws_candidate['A5'] = "Rank:"
-            ws_candidate['B5'] = f"#{analysis.get('rank', 'N/A')}"
-            ws_candidate['A5'].font = candidate_label_font
-            ws_candidate['B5'].font = candidate_value_font
-            
-            # ===== COLUMNAR FORMAT FOR CANDIDATE INFORMATION =====
-            # Set headers in row 7 (column names)
-            header_row = 7
-            headers = [
-                "Candidate Name",
-                "File Name", 
-                "Years of Experience",
-                "ATS Score",
-                "Recommendation",
-                "Experience Summary",
-                "Skills Matched",
-                "Skills Missing",
-                "Key Strengths",
-                "Areas for Improvement"
-            ]
-            
-            # Write headers
-            for col, header in enumerate(headers, start=1):
-                cell = ws_candidate.cell(row=header_row, column=col, value=header)
-                cell.font = candidate_header_font
-                cell.fill = candidate_section_fill
-                cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-                cell.border = thin_border
-            
-            # Write values in row 8
-            value_row = header_row + 1
-            
-            # Candidate Name
-            cell = ws_candidate.cell(row=value_row, column=1, value=analysis.get('candidate_name', 'N/A'))
-            cell.font = candidate_value_font
-            cell.border = thin_border
-            
-            # File Name
-            cell = ws_candidate.cell(row=value_row, column=2, value=analysis.get('filename', 'N/A'))
-            cell.font = candidate_value_font
-            cell.border = thin_border
-            
-            # Years of Experience
-            cell = ws_candidate.cell(row=value_row, column=3, value=analysis.get('years_of_experience', 'Not specified'))
-            cell.font = candidate_value_font
-            cell.border = thin_border
-            
-            # ATS Score
-            score = analysis.get('overall_score', 0)
-            cell = ws_candidate.cell(row=value_row, column=4, value=f"{score:.1f}/100")
-            cell.font = candidate_value_font
-            cell.border = thin_border
-            if score >= 80:
-                cell.font = Font(bold=True, color="00B050", size=10)
-            elif score >= 60:
-                cell.font = Font(bold=True, color="FFC000", size=10)
-            else:
-                cell.font = Font(bold=True, color="FF0000", size=10)
-            
-            # Recommendation
-            cell = ws_candidate.cell(row=value_row, column=5, value=analysis.get('recommendation', 'N/A'))
-            cell.font = candidate_value_font
-            cell.border = thin_border
-            
-            # Experience Summary (as bullet points)
-            exp_summary = analysis.get('experience_summary', 'No summary available.')
-            experience_bullets = convert_experience_to_bullet_points(exp_summary)
-            cell = ws_candidate.cell(row=value_row, column=6, value=experience_bullets)
-            cell.font = Font(size=9)
-            cell.alignment = Alignment(wrap_text=True, vertical='top')
-            cell.border = thin_border
-            
-            # Skills Matched
-            skills_matched = analysis.get('skills_matched', [])
-            skills_matched_text = "\n".join([f"• {skill}" for skill in skills_matched[:8]])
-            cell = ws_candidate.cell(row=value_row, column=7, value=skills_matched_text)
-            cell.font = Font(size=9)
-            cell.alignment = Alignment(wrap_text=True, vertical='top')
-            cell.border = thin_border
-            
-            # Skills Missing
-            skills_missing = analysis.get('skills_missing', [])
-            skills_missing_text = "\n".join([f"• {skill}" for skill in skills_missing[:8]])
-            cell = ws_candidate.cell(row=value_row, column=8, value=skills_missing_text)
-            cell.font = Font(size=9, color="FF0000")
-            cell.alignment = Alignment(wrap_text=True, vertical='top')
-            cell.border = thin_border
-            
-            # Key Strengths
-            strengths = analysis.get('key_strengths', [])
-            strengths_text = "\n".join([f"• {strength}" for strength in strengths[:3]])
-            cell = ws_candidate.cell(row=value_row, column=9, value=strengths_text)
-            cell.font = Font(size=9, color="00B050")
-            cell.alignment = Alignment(wrap_text=True, vertical='top')
-            cell.border = thin_border
-            
-            # Areas for Improvement
-            improvements = analysis.get('areas_for_improvement', [])
-            improvements_text = "\n".join([f"• {area}" for area in improvements[:3]])
-            cell = ws_candidate.cell(row=value_row, column=10, value=improvements_text)
-            cell.font = Font(size=9, color="FF6600")
-            cell.alignment = Alignment(wrap_text=True, vertical='top')
-            cell.border = thin_border
-            
-            # Set column widths for better readability
-            column_widths = {
-                1: 25,  # Candidate Name
-                2: 25,  # File Name
-                3: 20,  # Years of Experience
-                4: 15,  # ATS Score
-                5: 20,  # Recommendation
-                6: 40,  # Experience Summary
-                7: 30,  # Skills Matched
-                8: 30,  # Skills Missing
-                9: 25,  # Key Strengths
-                10: 25  # Areas for Improvement
-            }
-            
-            for col, width in column_widths.items():
-                ws_candidate.column_dimensions[get_column_letter(col)].width = width
-            
-            # Add row height for better readability
-            ws_candidate.row_dimensions[value_row].height = 120
-        
-        # Save the file
         filepath = os.path.join(REPORTS_FOLDER, filename)
-        wb.save(filepath)
+        writer = StreamingBatchReportWriter(model_label=f"Groq {GROQ_MODEL}")
+        writer.write(analyses, job_description, filepath, total=len(analyses))
         print(f"📊 Professional batch Excel report saved to: {filepath}")
         return filepath
         
@@ -2497,18 +2393,9 @@ def create_minimal_batch_report(analyses, job_description, filename):
             areas_for_improvement = analysis.get('areas_for_improvement', [])
             ws.cell(row=row, column=11, value=", ".join(areas_for_improvement[:3]))
         
-        # Auto-size columns
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
+        # Column widths come from the comparison layout instead of scanning every cell
+        for col, (_, width, _, _) in enumerate(COMPARISON_COLUMNS, start=1):
+            ws.column_dimensions[get_column_letter(col)].width = width
         
         filepath = os.path.join(REPORTS_FOLDER, filename)
         wb.save(filepath)
@@ -2532,9 +2419,72 @@ def get_score_grade_text(score):
     else:
         return "Needs Improvement 📈"
 
+def get_report_lock(cache_filename):
+    """Get the build lock for one cached report file"""
+    digest = hashlib.sha1(cache_filename.encode('utf-8')).digest()
+    return report_build_locks[int.from_bytes(digest[:4], 'big') % REPORT_LOCK_STRIPES]
+
+def build_report_on_demand(kind, key):
+    """
+    Build (or reuse) the Excel report for a persisted single analysis or batch.
+    Reports are cached on disk keyed by the content hash of the stored analysis,
+    so repeat downloads are served straight from the file.
+    """
+    if kind == 'batch':
+        payload = analysis_store.get_batch(key)
+    else:
+        payload = analysis_store.get_analysis(key)
+    
+    if not payload:
+        return None
+    
+    digest = content_hash(payload)
+    cache_filename = re.sub(r'[^a-zA-Z0-9._-]', '', f"{kind}_analysis_{key}_{digest}.xlsx")
+    cache_path = os.path.join(REPORTS_FOLDER, cache_filename)
+    
+    if os.path.exists(cache_path):
+        return cache_path
+    
+    with get_report_lock(cache_filename):
+        if os.path.exists(cache_path):
+            return cache_path
+        
+        print(f"📊 Building {kind} report on demand: {cache_filename}")
+        if kind == 'batch':
+            return create_comprehensive_batch_report(payload['analyses'], payload['job_description'], cache_filename)
+        return create_single_report(payload['analysis'], payload['job_description'], cache_filename)
+
+def export_batch(batch_ref, export_format):
+    """Stream a stored batch as CSV / NDJSON, or return it as Parquet"""
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unsupported format '{export_format}'. Use xlsx, csv, ndjson or parquet"}), 400
+    
+    # Accept either a bare batch id or the batch report filename
+    batch_id = re.sub(r'^batch_analysis_', '', batch_ref)
+    batch_id = re.sub(r'\.(xlsx|csv|ndjson|jsonl|parquet)$', '', batch_id)
+    
+    analyses = analysis_store.iter_batch_analyses(batch_id)
+    if analyses is None:
+        print(f"❌ Batch not found for export: {batch_id}")
+        return jsonify({'error': 'Batch not found'}), 404
+    
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    headers = {'Content-Disposition': f'attachment; filename=batch_analysis_{batch_id}.{extension}'}
+    print(f"📤 Exporting batch {batch_id} as {export_format}")
+    
+    if export_format == 'parquet':
+        try:
+            data = build_parquet(analyses)
+        except ImportError:
+            return jsonify({'error': 'Parquet export requires pyarrow. Install with: pip install pyarrow'}), 501
+        return Response(data, mimetype=mimetype, headers=headers)
+    
+    rows = iter_csv(analyses) if export_format == 'csv' else iter_ndjson(analyses)
+    return Response(stream_with_context(rows), mimetype=mimetype, headers=headers)
+
 @app.route('/download/<filename>', methods=['GET'])
 def download_report(filename):
-    """Download the Excel report"""
+    """Download the Excel report (built on first request) or a lightweight export via ?format="""
     update_activity()
     
     try:
@@ -2542,10 +2492,25 @@ def download_report(filename):
         
         safe_filename = re.sub(r'[^a-zA-Z0-9._-]', '', filename)
         
+        export_format = request.args.get('format', 'xlsx').lower()
+        if export_format != 'xlsx':
+            return export_batch(safe_filename, export_format)
+        
         file_path = os.path.join(REPORTS_FOLDER, safe_filename)
         
         if not os.path.exists(file_path):
-            print(f"❌ File not found: {file_path}")
+            batch_match = re.match(r'^batch_analysis_(.+)\.xlsx$', safe_filename)
+            single_match = re.match(r'^single_analysis_(.+)\.xlsx$', safe_filename)
+            
+            if batch_match:
+                file_path = build_report_on_demand('batch', batch_match.group(1))
+            elif single_match:
+                file_path = build_report_on_demand('single', single_match.group(1))
+            else:
+                file_path = None
+        
+        if not file_path or not os.path.exists(file_path):
+            print(f"❌ File not found: {safe_filename}")
             return jsonify({'error': 'File not found'}), 404
         
         return send_file(
@@ -2561,22 +2526,20 @@ def download_report(filename):
 
 @app.route('/download-single/<analysis_id>', methods=['GET'])
 def download_single_report(analysis_id):
-    """Download single candidate report"""
+    """Download single candidate report, building it on first request"""
     update_activity()
     
     try:
         print(f"📥 Download single request for analysis ID: {analysis_id}")
         
-        filename = f"single_analysis_{analysis_id}.xlsx"
-        safe_filename = re.sub(r'[^a-zA-Z0-9._-]', '', filename)
-        
-        file_path = os.path.join(REPORTS_FOLDER, safe_filename)
+        safe_analysis_id = re.sub(r'[^a-zA-Z0-9._-]', '', analysis_id)
+        file_path = build_report_on_demand('single', safe_analysis_id)
         
-        if not os.path.exists(file_path):
-            print(f"❌ Single report not found: {file_path}")
+        if not file_path or not os.path.exists(file_path):
+            print(f"❌ Single report not found for: {safe_analysis_id}")
             return jsonify({'error': 'Single report not found'}), 404
         
-        download_name = f"candidate_report_{analysis_id}.xlsx"
+        download_name = f"candidate_report_{safe_analysis_id}.xlsx"
         
         return send_file(
             file_path,
@@ -2589,6 +2552,125 @@ def download_single_report(analysis_id):
         print(f"❌ Single download error: {traceback.format_exc()}")
         return jsonify({'error': f'Download failed: {str(e)}'}), 500
 
+@app.route('/analyses', methods=['GET'])
+def list_analyses():
+    """Paginated lookup of stored analyses"""
+    update_activity()
+    
+    try:
+        page = max(1, request.args.get('page', 1, type=int))
+        per_page = min(100, max(1, request.args.get('per_page', 20, type=int)))
+        sort = request.args.get('sort', 'created_at')
+        order = request.args.get('order', 'desc')
+        
+        if sort not in ('created_at', 'score'):
+            return jsonify({'error': "sort must be 'created_at' or 'score'"}), 400
+        if order not in ('asc', 'desc'):
+            return jsonify({'error': "order must be 'asc' or 'desc'"}), 400
+        
+        result = analysis_store.query_analyses(
+            page=page,
+            per_page=per_page,
+            min_score=request.args.get('min_score', type=float),
+            max_score=request.args.get('max_score', type=float),
+            batch_id=request.args.get('batch_id'),
+            skill=request.args.get('skill'),
+            sort=sort,
+            order=order,
+            include_data=request.args.get('include') == 'analysis_data'
+        )
+        
+        return jsonify({
+            'analyses': result['items'],
+            'page': result['page'],
+            'per_page': result['per_page'],
+            'total': result['total'],
+            'pages': result['pages'],
+            'has_next': result['has_next'],
+            'has_prev': result['has_prev']
+        })
+        
+    except Exception as e:
+        print(f"❌ Analyses query error: {traceback.format_exc()}")
+        return jsonify({'error': f'Query failed: {str(e)[:200]}'}), 500
+
+@app.route('/analyses/<analysis_id>', methods=['GET'])
+def get_stored_analysis(analysis_id):
+    """Fetch one stored analysis without re-running the LLM"""
+    update_activity()
+    
+    try:
+        stored = analysis_store.get_analysis(analysis_id)
+        if not stored:
+            return jsonify({'error': 'Analysis not found'}), 404
+        return jsonify(stored['analysis'])
+        
+    except Exception as e:
+        print(f"❌ Analysis lookup error: {traceback.format_exc()}")
+        return jsonify({'error': f'Lookup failed: {str(e)[:200]}'}), 500
+
+@app.route('/search', methods=['GET', 'POST'])
+def search_candidates():
+    """Rank previously analyzed candidates against a job description without the LLM"""
+    update_activity()
+    
+    try:
+        payload = request.get_json(silent=True) or {}
+        job_description = (request.values.get('jd') or payload.get('jd') or '').strip()
+        k = request.values.get('k') or payload.get('k') or 50
+        try:
+            k = min(500, max(1, int(k)))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'k must be an integer'}), 400
+        
+        if not job_description:
+            return jsonify({'error': 'No job description provided (jd)'}), 400
+        
+        start_time = time.time()
+        matches = search_index.search(job_description, k)
+        summaries = analysis_store.get_summaries([analysis_id for analysis_id, _ in matches])
+        
+        results = []
+        for analysis_id, similarity in matches:
+            summary = summaries.get(analysis_id)
+            if summary:
+                summary['similarity'] = similarity
+                results.append(summary)
+        
+        return jsonify({
+            'results': results,
+            'k': k,
+            'indexed_resumes': len(search_index),
+            'search_time': f"{(time.time() - start_time) * 1000:.1f}ms"
+        })
+        
+    except Exception as e:
+        print(f"❌ Search error: {traceback.format_exc()}")
+        return jsonify({'error': f'Search failed: {str(e)[:200]}'}), 500
+
+@app.route('/trends', methods=['GET'])
+def get_skill_trends():
+    """Top skills per industry over a recent window, from pre-aggregated counters"""
+    update_activity()
+    
+    try:
+        industry = request.args.get('industry')
+        days = request.args.get('days', 30, type=int)
+        k = min(100, max(1, request.args.get('k', 20, type=int)))
+        
+        trend_aggregator.flush()
+        
+        return jsonify({
+            'industry': industry or 'all',
+            'days': max(1, min(days, SkillTrendAggregator.MAX_WINDOW_DAYS)),
+            'skills': trend_aggregator.top_skills(industry=industry, days=days, k=k),
+            'industries': trend_aggregator.industries()
+        })
+        
+    except Exception as e:
+        print(f"❌ Trends query error: {traceback.format_exc()}")
+        return jsonify({'error': f'Trends query failed: {str(e)[:200]}'}), 500
+
 @app.route('/warmup', methods=['GET'])
 def force_warmup():
     """Force warm-up Groq API"""
@@ -2647,8 +2729,11 @@ def quick_check():
                 'model': GROQ_MODEL
             })
         
-        for i, api_key in enumerate(GROQ_API_KEYS):
-            if api_key and not key_usage[i]['cooling']:
+        for i, api_key in key_pool.configured():
+            if api_key and not key_pool.is_cooling(i + 1):
+                api_key, key_number = key_pool.acquire(i, strict=True)
+                if not api_key:
+                    continue
                 try:
                     start_time = time.time()
                     
@@ -2657,7 +2742,7 @@ def quick_check():
                         api_key=api_key,
                         max_tokens=10,
                         timeout=15,
-                        key_index=i+1
+                        key_index=key_number
                     )
                     
                     response_time = time.time() - start_time
@@ -2681,6 +2766,8 @@ def quick_check():
                         })
                 except:
                     continue
+                finally:
+                    key_pool.release(key_number)
         
         return jsonify({
             'available': False,
@@ -2735,27 +2822,7 @@ def health_check():
     inactive_time = datetime.now() - last_activity_time
     inactive_minutes = int(inactive_time.total_seconds() / 60)
     
-    current_time = datetime.now()
-    key_status = []
-    for i, api_key in enumerate(GROQ_API_KEYS):
-        if key_usage[i]['minute_window_start']:
-            seconds_in_window = (current_time - key_usage[i]['minute_window_start']).total_seconds()
-            if seconds_in_window > 60:
-                requests_this_minute = 0
-            else:
-                requests_this_minute = key_usage[i]['requests_this_minute']
-        else:
-            requests_this_minute = 0
-        
-        key_status.append({
-            'key': f'Key {i+1}',
-            'configured': bool(api_key),
-            'total_usage': key_usage[i]['count'],
-            'requests_this_minute': requests_this_minute,
-            'errors': key_usage[i]['errors'],
-            'cooling': key_usage[i]['cooling'],
-            'last_used': key_usage[i]['last_used'].isoformat() if key_usage[i]['last_used'] else None
-        })
+    key_status = key_pool.snapshot()
     
     available_keys = sum(1 for key in GROQ_API_KEYS if key)
     
@@ -2774,10 +2841,15 @@ def health_check():
         'version': '3.1.0',
         'key_status': key_status,
         'available_keys': available_keys,
+        'llm_queue': llm_dispatcher.stats(),
+        'llm_concurrency': llm_limiter.stats(),
+        'llm_providers': llm_router.stats(),
+        'prompt_cache': RESUME_ANALYSIS_PROMPT.stats(),
+        'admission': admission.stats(),
         'configuration': {
             'max_batch_size': MAX_BATCH_SIZE,
             'max_requests_per_minute_per_key': MAX_REQUESTS_PER_MINUTE_PER_KEY,
-            'max_retries': MAX_RETRIES,
+            'max_retries': {error: policy[0] for error, policy in RETRY_POLICY.items()},
             'min_skills_to_show': MIN_SKILLS_TO_SHOW,
             'max_skills_to_show': MAX_SKILLS_TO_SHOW,
             'years_experience_analysis': True
@@ -2792,7 +2864,7 @@ def health_check():
         'scoring_enhancements': {
             'method': 'Granular unique scoring',
             'precision': '1 decimal place',
-            'unique_scores': 'Ensured for each candidate',
+            'unique_scores': 'Deterministic, ties broken by content hash at ranking',
             'range': '0-100 with weighted factors',
             'weighting': 'Skills (40%), Experience (30%), Education (20%), Years (10%)'
         },
@@ -2807,6 +2879,13 @@ def cleanup_on_exit():
     service_running = False
     print("\n🛑 Shutting down service...")
     
+    llm_dispatcher.shutdown()
+    scheduler.stop()
+    if _local_engine is not None:
+        _local_engine.shutdown()  # stop its process pool
+    
+    flush_skill_trends()
+    
     try:
         # Clean up temporary files
         for folder in [UPLOAD_FOLDER, RESUME_PREVIEW_FOLDER]:
@@ -2820,15 +2899,15 @@ def cleanup_on_exit():
 
 # Periodic cleanup
 def periodic_cleanup():
-    """Periodically clean up old resume previews"""
-    while service_running:
-        try:
-            time.sleep(300)  # Run every 5 minutes
-            cleanup_resume_previews()
-        except Exception as e:
-            print(f"⚠️ Periodic cleanup error: {str(e)}")
+    """Clean up old resume previews and flush trend counters (runs every CLEANUP_INTERVAL)"""
+    try:
+        cleanup_resume_previews()
+        flush_skill_trends()
+    except Exception as e:
+        print(f"⚠️ Periodic cleanup error: {str(e)}")
 
-atexit.register(cleanup_on_exit)
+if not POOL_CHILD:
+    atexit.register(cleanup_on_exit)
 
 if __name__ == '__main__':
     # Initialize service
@@ -0,0 +1,101 @@
+import threading
+import time
+from typing import Dict
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Closed: calls go through and failures are counted; FAILURE_THRESHOLD in
+    a row open the circuit. Open: available() is False until reset_timeout
+    has passed. Half-open: one probe call at a time is let through; its
+    success closes the circuit, its failure opens it again.
+
+    available() only looks; begin() must be called when a call is actually
+    made so a half-open circuit hands out a single probe.
+    """
+
+    FAILURE_THRESHOLD = 5
+    RESET_TIMEOUT = 30.0  # seconds the circuit stays open before a probe
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None,
+                 clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold or self.FAILURE_THRESHOLD
+        self.reset_timeout = self.RESET_TIMEOUT if reset_timeout is None else reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._opens = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def available(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and not self._probing)
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through (0 when available)"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - self._clock())
+
+    def begin(self):
+        """A call is being made; in half-open state it becomes the probe"""
+        with self._lock:
+            if self._current_state() == HALF_OPEN:
+                self._state = HALF_OPEN
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                print(f"🟢 Circuit {self.name} closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._open()
+            self._probing = False
+
+    def record_neutral(self):
+        """The call says nothing about this circuit's health; just end its probe"""
+        with self._lock:
+            self._probing = False
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._opens += 1
+        print(f"🔴 Circuit {self.name} open after {self._failures} consecutive failures, "
+              f"probing again in {self.reset_timeout:.0f}s")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self._current_state(),
+                'consecutive_failures': self._failures,
+                'opens': self._opens
+            }
@@ -0,0 +1,219 @@
+import hashlib
+import random
+import re
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize_text(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens, so PDF/DOCX/TXT copies of one resume agree"""
+    return _TOKEN_PATTERN.findall((text or '').lower())
+
+
+def text_fingerprint(tokens: List[str]) -> str:
+    """Exact-duplicate key: SHA-256 of the normalized token stream"""
+    return hashlib.sha256(' '.join(tokens).encode('utf-8')).hexdigest()
+
+
+class MinHasher:
+    """MinHash signatures over word shingles"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+
+    def shingles(self, tokens: List[str]) -> set:
+        size = self.shingle_size
+        if len(tokens) <= size:
+            return {zlib.crc32(' '.join(tokens).encode('utf-8'))}
+        return {zlib.crc32(' '.join(tokens[i:i + size]).encode('utf-8'))
+                for i in range(len(tokens) - size + 1)}
+
+    def signature(self, tokens: List[str]) -> List[int]:
+        shingles = self.shingles(tokens)
+        return [min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles)
+                for a, b in self._perms]
+
+    @staticmethod
+    def similarity(left: List[int], right: List[int]) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        if not left or len(left) != len(right):
+            return 0.0
+        return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+
+class _Entry:
+    __slots__ = ('analysis_id', 'jd_hash', 'fingerprint', 'signature', 'ready', 'discarded', 'analysis')
+
+    def __init__(self, analysis_id, jd_hash, fingerprint, signature, ready=False):
+        self.analysis_id = analysis_id
+        self.jd_hash = jd_hash
+        self.fingerprint = fingerprint
+        self.signature = signature
+        self.ready = threading.Event()
+        self.discarded = False
+        self.analysis = None
+        if ready:
+            self.ready.set()
+
+
+class DuplicateMatch:
+    __slots__ = ('entry', 'kind', 'similarity')
+
+    def __init__(self, entry: _Entry, kind: str, similarity: float):
+        self.entry = entry
+        self.kind = kind
+        self.similarity = similarity
+
+    @property
+    def analysis_id(self) -> str:
+        return self.entry.analysis_id
+
+
+class DuplicateIndex:
+    """
+    Exact and near-duplicate lookup of resume texts against earlier analyses.
+
+    Exact copies are found by the normalized-text SHA; near copies (the same
+    resume exported to another format, small edits) by MinHash signatures in
+    an LSH band index. Matches only count for the same job description, since
+    the analysis being reused was scored against it.
+
+    Analyses are reserved when they start, so a second copy arriving while
+    the first is still with the LLM waits for it instead of calling again.
+    """
+
+    NUM_PERM = 64
+    BANDS = 16
+    SIMILARITY_THRESHOLD = 0.9
+    WAIT_TIMEOUT = 180  # seconds to wait for an in-flight original
+
+    def __init__(self, num_perm: int = None, bands: int = None, threshold: float = None):
+        self.hasher = MinHasher(num_perm or self.NUM_PERM)
+        self.bands = bands or self.BANDS
+        self.rows = self.hasher.num_perm // self.bands
+        self.threshold = threshold or self.SIMILARITY_THRESHOLD
+        self._exact: Dict[Tuple[str, str], _Entry] = {}
+        self._buckets: Dict[tuple, List[_Entry]] = {}
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+
+    def fingerprint(self, text: str) -> Tuple[str, List[int]]:
+        tokens = normalize_text(text)
+        return text_fingerprint(tokens), self.hasher.signature(tokens)
+
+    def _band_keys(self, jd_hash: str, signature: List[int]):
+        rows = self.rows
+        for band in range(self.bands):
+            yield (jd_hash, band, tuple(signature[band * rows:(band + 1) * rows]))
+
+    def _find(self, jd_hash: str, fingerprint: str, signature: List[int]) -> Optional[DuplicateMatch]:
+        entry = self._exact.get((jd_hash, fingerprint))
+        if entry is not None:
+            return DuplicateMatch(entry, 'exact', 1.0)
+
+        best, best_similarity = None, 0.0
+        seen = set()
+        for key in self._band_keys(jd_hash, signature):
+            for candidate in self._buckets.get(key, ()):
+                if candidate.analysis_id in seen:
+                    continue
+                seen.add(candidate.analysis_id)
+                similarity = MinHasher.similarity(signature, candidate.signature)
+                if similarity > best_similarity:
+                    best, best_similarity = candidate, similarity
+        if best is not None and best_similarity >= self.threshold:
+            return DuplicateMatch(best, 'near', round(best_similarity, 3))
+        return None
+
+    def _insert(self, entry: _Entry):
+        self._entries[entry.analysis_id] = entry
+        self._exact.setdefault((entry.jd_hash, entry.fingerprint), entry)
+        if entry.signature:
+            for key in self._band_keys(entry.jd_hash, entry.signature):
+                self._buckets.setdefault(key, []).append(entry)
+
+    def _remove(self, entry: _Entry):
+        self._entries.pop(entry.analysis_id, None)
+        if self._exact.get((entry.jd_hash, entry.fingerprint)) is entry:
+            del self._exact[(entry.jd_hash, entry.fingerprint)]
+        if entry.signature:
+            for key in self._band_keys(entry.jd_hash, entry.signature):
+                bucket = self._buckets.get(key)
+                if bucket and entry in bucket:
+                    bucket.remove(entry)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def match_or_reserve(self, analysis_id: str, jd_hash: str, fingerprint: str,
+                         signature: List[int]) -> Optional[DuplicateMatch]:
+        """
+        Return a finished prior analysis of the same text, or reserve
+        analysis_id as the original and return None.
+        """
+        while True:
+            with self._lock:
+                match = self._find(jd_hash, fingerprint, signature)
+                if match is None:
+                    self._insert(_Entry(analysis_id, jd_hash, fingerprint, signature))
+                    return None
+
+            if not match.entry.ready.wait(self.WAIT_TIMEOUT):
+                return self.reserve(analysis_id, jd_hash, fingerprint, signature)
+            if not match.entry.discarded:
+                return match
+            # The original failed; look again (and most likely become the original)
+
+    def reserve(self, analysis_id: str, jd_hash: str, fingerprint: str, signature: List[int]):
+        with self._lock:
+            self._insert(_Entry(analysis_id, jd_hash, fingerprint, signature))
+
+    def complete(self, analysis_id: str, analysis: Dict = None):
+        """Mark an analysis finished; its payload is kept until release()"""
+        with self._lock:
+            entry = self._entries.get(analysis_id)
+        if entry is not None:
+            entry.analysis = analysis
+            entry.ready.set()
+
+    def discard(self, analysis_id: str):
+        """Drop a reservation whose analysis failed and wake anyone waiting on it"""
+        with self._lock:
+            entry = self._entries.get(analysis_id)
+            if entry is None:
+                return
+            self._remove(entry)
+        entry.discarded = True
+        entry.ready.set()
+
+    def release(self, analysis_ids):
+        """Drop cached payloads once the analyses are persisted"""
+        with self._lock:
+            for analysis_id in analysis_ids:
+                entry = self._entries.get(analysis_id)
+                if entry is not None:
+                    entry.analysis = None
+
+    def signature_of(self, analysis_id: str) -> Optional[Tuple[str, List[int]]]:
+        entry = self._entries.get(analysis_id)
+        return (entry.fingerprint, entry.signature) if entry is not None else None
+
+    def load(self, rows):
+        """Index persisted analyses: iterable of (analysis_id, jd_hash, fingerprint, signature)"""
+        with self._lock:
+            for analysis_id, jd_hash, fingerprint, signature in rows:
+                if analysis_id in self._entries or not fingerprint:
+                    continue
+                if signature and len(signature) != self.hasher.num_perm:
+                    signature = None
+                self._insert(_Entry(analysis_id, jd_hash, fingerprint, signature, ready=True))
+
+    def __len__(self):
+        return len(self._entries)
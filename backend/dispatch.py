@@ -0,0 +1,327 @@
+import concurrent.futures
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from fair_queue import LANE_INTERACTIVE, FairQueue
+from limiter import AIMDLimiter
+from llm_router import LLMProvider, LLMRouter
+from scheduler import Scheduler
+
+# Errors worth another attempt, with (max retries, base delay, jitter) each
+RETRY_POLICY: Dict[str, Tuple[int, float, float]] = {
+    'rate_limit': (2, 1.0, 1.0),
+    'service_unavailable': (2, 15.0, 5.0),
+    'timeout': (2, 10.0, 5.0),
+}
+
+
+class LLMJob:
+    __slots__ = ('prompt', 'max_tokens', 'temperature', 'timeout', 'key_hint', 'attempts', 'future',
+                 'active', 'hedged', 'keys_used', 'lock', 'usage',
+                 'json_output', 'tenant', 'lane', 'started')
+
+    def __init__(self, prompt, max_tokens: int, temperature: float, timeout: float, key_hint: Optional[int],
+                 usage: Optional[Dict] = None, json_output: bool = False, tenant: str = None,
+                 lane: str = LANE_INTERACTIVE):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.timeout = timeout
+        self.key_hint = key_hint
+        self.attempts = 0
+        self.future = concurrent.futures.Future()
+        self.active = 0  # calls in flight: the primary and at most one hedge
+        self.hedged = False
+        self.keys_used = set()  # (provider name, key number) pairs already tried
+        self.lock = threading.Lock()
+        self.usage = usage  # filled with the winning call's token usage
+        self.json_output = json_output
+        self.tenant = tenant
+        self.lane = lane
+        self.started = None  # when the current primary call was sent
+
+
+class LLMDispatcher:
+    """
+    Process-wide queue of LLM calls served by one worker per concurrent slot.
+
+    A worker takes the next ready job, lets the router pick a provider and
+    one of its free keys, and makes a single call. Retryable failures (429,
+    503, timeouts) are not slept on in the worker: the job is handed to the
+    scheduler with a not-before delay and re-enters the queue afterwards,
+    to be picked up by the first worker with a free key. When every key of
+    every provider is cooling the job waits for the earliest cooldown to end;
+    when every circuit is open it fails at once with 'circuit_open' instead
+    of retrying, so callers can fall back right away.
+
+    Workers are the hard ceiling on concurrent calls; within it an AIMD
+    limiter decides how many actually run, growing while calls are fast
+    and backing off on 429s, 503s and timeouts.
+
+    Ready jobs wait in a weighted fair queue keyed by (lane, tenant), so
+    one client's batch cannot starve another client, and interactive
+    single analyses are weighted above bulk batch work. A worker only
+    takes a job once it holds a limiter slot, so jobs never queue up on
+    the limiter out of fair-queue order.
+
+    With a hedge budget, a call still running after its provider's p90
+    latency gets a duplicate on another idle key and the first answer wins.
+    Hedges are only sent while a worker is idle and never exceed
+    hedge_budget extra calls per call made. Hedging is best-effort: a
+    blocking HTTP call cannot be aborted, so the losing call runs on (its
+    answer is discarded) until it returns or times out; the hedge's timeout
+    ends with the primary's, so the pair never holds a slot and a key longer
+    than the primary alone would.
+    """
+
+    NO_KEY_RETRY_DELAY = 0.5  # seconds, when no key is configured or free
+    MIN_HEDGE_DELAY = 1.0  # seconds; calls faster than this are never hedged
+    MIN_HEDGE_TIMEOUT = 2.0  # seconds; a primary closer than this to its timeout is not hedged
+
+    def __init__(self, router: LLMRouter, scheduler: Scheduler, workers: int, hedge_budget: float = 0.0,
+                 limiter: AIMDLimiter = None, lane_weights: Dict[str, float] = None):
+        self.router = router
+        self.scheduler = scheduler
+        self.hedge_budget = hedge_budget
+        self.limiter = limiter or AIMDLimiter(workers, workers)
+        self._workers = workers
+        self._queue = FairQueue(lane_weights)
+        self._live = 0
+        self._busy = 0
+        self._spawned = 0
+        self._lock = threading.Lock()
+        self._waiting = 0  # jobs parked with the scheduler
+        self._calls = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._closed = False
+
+    def _ensure_workers(self):
+        if self._live >= self._workers:
+            return
+        with self._lock:
+            while self._live < self._workers and not self._closed:
+                self._spawned += 1
+                self._live += 1
+                threading.Thread(target=self._work, name=f'llm-dispatch-{self._spawned}', daemon=True).start()
+
+    def resize(self, workers: int, initial_limit: int = None):
+        """Change the ceiling on concurrent calls; extra workers exit after their current call"""
+        workers = max(1, workers)
+        self.limiter.set_max(workers, initial_limit)
+        self._queue.wake()
+        with self._lock:
+            surplus = max(0, self._live - workers)
+            self._workers = workers
+            self._live -= surplus
+        for _ in range(surplus):
+            self._queue.put(None)
+        self._ensure_workers()
+
+    def submit(self, prompt, max_tokens: int = 1500, temperature: float = 0.1, timeout: float = 45,
+               key_hint: int = None, usage: Dict = None, json_output: bool = False, tenant: str = None,
+               lane: str = LANE_INTERACTIVE) -> concurrent.futures.Future:
+        """
+        Queue one completion; the future resolves to (response, key_number, provider).
+        `prompt` is a string or a list of chat messages; `usage`, when given, receives the token counts.
+        json_output requests the provider's JSON mode; tenant and lane place the job in the fair queue.
+        """
+        job = LLMJob(prompt, max_tokens, temperature, timeout, key_hint, usage, json_output, tenant, lane)
+        if self._closed:
+            job.future.set_result(({'error': 'shutting_down', 'status': 503}, None, None))
+            return job.future
+        self._ensure_workers()
+        self._enqueue(job, False)
+        return job.future
+
+    def complete(self, prompt, **kwargs) -> Tuple[object, Optional[int], object]:
+        """submit() and wait; returns (text or error dict, key_number, provider)"""
+        return self.submit(prompt, **kwargs).result()
+
+    def stats(self) -> Dict:
+        return {
+            'workers': self._workers,
+            'busy': self._busy,
+            'limit': self.limiter.limit,
+            'queued': self._queue.qsize(),
+            'queued_by_lane': self._queue.lanes(),
+            'waiting_retry': self._waiting,
+            'calls': self._calls,
+            'hedges': self._hedges,
+            'hedge_wins': self._hedge_wins,
+            'hedge_budget': self.hedge_budget
+        }
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            stopping, self._live = self._live, 0
+        self.limiter.close()
+        for _ in range(stopping):
+            self._queue.put(None)
+        for job, _ in self._queue.drain():
+            if not job.future.done():
+                job.future.set_result(({'error': 'shutting_down', 'status': 503}, None, None))
+
+    def _enqueue(self, job: LLMJob, hedge: bool):
+        self._queue.put((job, hedge), tenant=job.tenant, lane=job.lane)
+
+    def _requeue(self, job: LLMJob, delay: float):
+        if self._closed:
+            job.future.set_result(({'error': 'shutting_down', 'status': 503}, None, None))
+            return
+        with self._lock:
+            self._waiting += 1
+        self.scheduler.call_later_inline(delay, self._release_waiting, job)
+
+    def _release_waiting(self, job: LLMJob):
+        with self._lock:
+            self._waiting -= 1
+        if self._closed:
+            job.future.set_result(({'error': 'shutting_down', 'status': 503}, None, None))
+            return
+        self._enqueue(job, False)
+
+    def _work(self):
+        while True:
+            item = self._queue.get(self.limiter.try_acquire)  # holds a limiter slot for every job
+            if item is None:
+                return
+            job, hedge = item
+            with self._lock:
+                self._busy += 1
+            try:
+                self._run(job, hedge)
+            except Exception as e:
+                with job.lock:
+                    if not job.future.done() and job.active == 0:
+                        job.future.set_result(({'error': str(e), 'status': 500}, None, None))
+            finally:
+                with self._lock:
+                    self._busy -= 1
+
+    def _run(self, job: LLMJob, hedge: bool):
+        if job.future.done():
+            self._release_slot()
+            return  # a hedge whose primary answered before it started
+
+        if hedge:
+            provider, api_key, key_number = self._acquire_key(exclude=job.keys_used, idle_only=True)
+            if provider is None:
+                return  # no idle key left
+            with job.lock:
+                # The primary must still be in flight: once it has answered or been
+                # requeued for a retry, this hedge would be a second copy of the job
+                claimed = not job.future.done() and job.hedged and job.active == 1
+                if claimed:
+                    job.active += 1
+                    job.keys_used.add((provider.name, key_number))
+                    timeout = max(self.MIN_HEDGE_TIMEOUT, job.timeout - (time.monotonic() - job.started))
+            if not claimed:
+                self.router.unreserve(provider, key_number)
+                self._release_slot()
+                return
+        else:
+            provider, api_key, key_number = self._acquire_key(job.key_hint)
+            if provider is None:
+                if len(self.router) == 0:
+                    job.future.set_result(({'error': 'no_api_key', 'status': 500}, None, None))
+                    return
+                if self.router.circuit_open():
+                    job.future.set_result(({'error': 'circuit_open', 'status': 503}, None, None))
+                    return
+                self._requeue(job, max(self.NO_KEY_RETRY_DELAY, self.router.next_available_in()))
+                return
+
+            with job.lock:
+                job.active += 1
+                job.keys_used.add((provider.name, key_number))
+                job.started = time.monotonic()
+                timeout = job.timeout
+            self._schedule_hedge(job, provider)
+
+        with self._lock:
+            self._calls += 1
+
+        start = time.monotonic()
+        response = {'error': 'dispatch_error', 'status': 500}
+        usage = {}
+        try:
+            response = provider.call(job.prompt, api_key, max_tokens=job.max_tokens, temperature=job.temperature,
+                                     timeout=timeout, key_index=key_number, usage=usage,
+                                     json_output=job.json_output)
+        finally:
+            error = response.get('error') if isinstance(response, dict) else None
+            latency = time.monotonic() - start
+            self.router.release(provider, key_number, latency, error)
+            self._release_slot(latency if error is None else None, overloaded=error in RETRY_POLICY)
+            self._finish_attempt(job, response, error, key_number, provider, hedge, usage)
+
+    def _release_slot(self, latency: float = None, overloaded: bool = False):
+        self.limiter.release(latency, overloaded=overloaded)
+        self._queue.wake()  # a waiting worker may take the next job
+
+    def _acquire_key(self, key_hint: int = None, **kwargs):
+        """router.acquire() for a caller holding a limiter slot; the slot is given back if no key is free"""
+        try:
+            provider, api_key, key_number = self.router.acquire(key_hint, **kwargs)
+        except Exception:
+            self._release_slot()
+            raise
+        if provider is None:
+            self._release_slot()
+        return provider, api_key, key_number
+
+    def _finish_attempt(self, job: LLMJob, response, error: Optional[str], key_number: int,
+                        provider: LLMProvider, hedge: bool, usage: Dict):
+        with job.lock:
+            job.active -= 1
+            if job.future.done():
+                return  # lost the race; the other call already answered
+            if error is not None and job.active > 0:
+                return  # the call still in flight answers instead
+
+            policy = RETRY_POLICY.get(error)
+            if policy is None or job.attempts >= policy[0] or self.router.circuit_open():
+                if hedge and error is None:
+                    with self._lock:
+                        self._hedge_wins += 1
+                if job.usage is not None:
+                    job.usage.update(usage)
+                job.future.set_result((response, key_number, provider))
+                return
+
+            _, base_delay, jitter = policy
+            delay = base_delay * (2 ** job.attempts) + random.uniform(0, jitter)
+            job.attempts += 1
+            job.hedged = False
+            job.key_hint = None  # any key that frees up first
+        print(f"⏳ {error} on {provider.name} Key {key_number}, requeued for {delay:.1f}s (attempt {job.attempts}/{policy[0]})")
+        self._requeue(job, delay)
+
+    def _schedule_hedge(self, job: LLMJob, provider: LLMProvider):
+        if self.hedge_budget <= 0:
+            return
+        p90 = provider.latency_percentile(0.9)
+        if p90 is None:
+            return  # too few samples to tell a slow call from a normal one
+        delay = max(self.MIN_HEDGE_DELAY, p90)
+        if job.timeout - delay < self.MIN_HEDGE_TIMEOUT:
+            return  # the primary times out before a hedge could help
+        self.scheduler.call_later_inline(delay, self._maybe_hedge, job, job.attempts)
+
+    def _maybe_hedge(self, job: LLMJob, attempt: int):
+        with job.lock:
+            if job.future.done() or job.hedged or job.active != 1 or job.attempts != attempt:
+                return
+            with self._lock:
+                idle = (self._live > self._busy and self._queue.empty()
+                        and self.limiter.in_flight < self.limiter.limit)
+                within_budget = self._hedges < self.hedge_budget * self._calls
+                if self._closed or not idle or not within_budget:
+                    return
+                self._hedges += 1
+            job.hedged = True
+        self._enqueue(job, True)
@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from report_writer import COMPARISON_COLUMNS, HIGHLIGHT_LIST_LIMIT, SKILL_LIST_LIMIT
+
+# Stored analysis fields behind each comparison sheet column, with list limits
+_EXPORT_SPEC = [
+    ('rank', None),
+    ('candidate_name', None),
+    ('filename', None),
+    ('years_of_experience', None),
+    ('overall_score', None),
+    ('recommendation', None),
+    ('experience_summary', None),
+    ('skills_matched', SKILL_LIST_LIMIT),
+    ('skills_missing', SKILL_LIST_LIMIT),
+    ('key_strengths', HIGHLIGHT_LIST_LIMIT),
+    ('areas_for_improvement', HIGHLIGHT_LIST_LIMIT),
+]
+
+if len(_EXPORT_SPEC) != len(COMPARISON_COLUMNS):
+    raise RuntimeError('exporters._EXPORT_SPEC must have one entry per report_writer.COMPARISON_COLUMNS column')
+
+# Export columns mirror the Excel comparison sheet: (field, header, list limit)
+EXPORT_FIELDS: List[Tuple[str, str, Optional[int]]] = [
+    (field, header, limit)
+    for (field, limit), (header, _, _, _) in zip(_EXPORT_SPEC, COMPARISON_COLUMNS)
+]
+
+LIST_FIELDS = {field for field, _, limit in EXPORT_FIELDS if limit}
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+PARQUET_ROW_GROUP_SIZE = 1000
+
+
+def export_row(analysis: Dict) -> Dict:
+    """Project one stored analysis onto the export columns"""
+    row = {}
+    for field, _, limit in EXPORT_FIELDS:
+        value = analysis.get(field)
+        if limit:
+            value = [str(item) for item in (value or [])[:limit]]
+        elif field == 'overall_score':
+            value = round(float(value or 0), 1)
+        elif field == 'rank':
+            value = value if isinstance(value, int) else None
+        elif value is not None:
+            value = str(value)
+        row[field] = value
+    return row
+
+
+def iter_csv(analyses: Iterable[Dict]) -> Iterator[str]:
+    """Yield CSV text one row at a time"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow([header for _, header, _ in EXPORT_FIELDS])
+    yield buffer.getvalue()
+
+    for analysis in analyses:
+        buffer.seek(0)
+        buffer.truncate(0)
+        row = export_row(analysis)
+        writer.writerow(['; '.join(row[field]) if field in LIST_FIELDS else row[field]
+                         for field, _, _ in EXPORT_FIELDS])
+        yield buffer.getvalue()
+
+
+def iter_ndjson(analyses: Iterable[Dict]) -> Iterator[str]:
+    """Yield one JSON document per line"""
+    for analysis in analyses:
+        yield json.dumps(export_row(analysis), ensure_ascii=False) + '\n'
+
+
+def build_parquet(analyses: Iterable[Dict]) -> bytes:
+    """Write analyses to an in-memory Parquet file in fixed-size row groups"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (field, pa.list_(pa.string()) if field in LIST_FIELDS
+         else pa.float64() if field == 'overall_score'
+         else pa.int32() if field == 'rank'
+         else pa.string())
+        for field, _, _ in EXPORT_FIELDS
+    ])
+
+    sink = io.BytesIO()
+    with pq.ParquetWriter(sink, schema, compression='snappy') as writer:
+        columns = {field: [] for field, _, _ in EXPORT_FIELDS}
+        pending = 0
+        for analysis in analyses:
+            row = export_row(analysis)
+            for field in columns:
+                columns[field].append(row[field])
+            pending += 1
+            if pending >= PARQUET_ROW_GROUP_SIZE:
+                writer.write_table(pa.table(columns, schema=schema))
+                columns = {field: [] for field in columns}
+                pending = 0
+        if pending:
+            writer.write_table(pa.table(columns, schema=schema))
+
+    return sink.getvalue()
@@ -0,0 +1,94 @@
+import collections
+import heapq
+import itertools
+import threading
+from typing import Callable, Dict, Hashable, List, Mapping
+
+LANE_INTERACTIVE = 'interactive'
+LANE_BATCH = 'batch'
+
+DEFAULT_LANE_WEIGHTS: Dict[str, float] = {
+    LANE_INTERACTIVE: 4.0,
+    LANE_BATCH: 1.0
+}
+
+
+class FairQueue:
+    """
+    Weighted fair queue (start-time fair queueing) over (lane, tenant) flows.
+
+    Each flow gets a share of dequeues proportional to its lane's weight,
+    regardless of how much it has queued: an item's tag is the later of
+    the current virtual time and the finish tag of its flow's previous
+    item, and the lowest tag is served first. Different clients' batches
+    are therefore interleaved, and a single interactive item is served
+    after at most one item per busy flow. None is a control item (worker
+    stop) and always goes first. put/get/qsize/empty mirror queue.Queue.
+
+    get(admit) only takes an item once admit() grants it a slot, so
+    consumers that wait for capacity still leave the order to the queue;
+    call wake() when capacity frees up.
+    """
+
+    PRUNE_AT = 1024  # flows remembered before idle ones are dropped
+
+    def __init__(self, lane_weights: Mapping[str, float] = None):
+        self.lane_weights = dict(lane_weights or DEFAULT_LANE_WEIGHTS)
+        self._cond = threading.Condition()
+        self._heap = []
+        self._control = collections.deque()
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._finish: Dict[Hashable, float] = {}
+        self._queued_by_lane = collections.Counter()
+
+    def put(self, item, tenant: Hashable = None, lane: str = LANE_BATCH):
+        with self._cond:
+            if item is None:
+                self._control.append(None)
+            else:
+                flow = (lane, tenant)
+                start = max(self._virtual_time, self._finish.get(flow, 0.0))
+                self._finish[flow] = start + 1.0 / self.lane_weights.get(lane, 1.0)
+                heapq.heappush(self._heap, (start, next(self._seq), lane, item))
+                self._queued_by_lane[lane] += 1
+            self._cond.notify()
+
+    def get(self, admit: Callable[[], bool] = None):
+        """Next item; control items are returned without calling admit()"""
+        with self._cond:
+            while not self._control and not (self._heap and (admit is None or admit())):
+                self._cond.wait()
+            if self._control:
+                return self._control.popleft()
+            start, _, lane, item = heapq.heappop(self._heap)
+            self._virtual_time = start
+            self._queued_by_lane[lane] -= 1
+            if len(self._finish) > self.PRUNE_AT:
+                self._finish = {flow: finish for flow, finish in self._finish.items() if finish > start}
+            return item
+
+    def wake(self):
+        """Re-check admit() in every waiting get()"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def drain(self) -> List:
+        """Remove and return every queued item (control items excluded)"""
+        with self._cond:
+            items = [item for _, _, _, item in sorted(self._heap)]
+            self._heap.clear()
+            self._queued_by_lane.clear()
+            return items
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._heap) + len(self._control)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def lanes(self) -> Dict[str, int]:
+        """Queued items per lane"""
+        with self._cond:
+            return {lane: self._queued_by_lane[lane] for lane in self.lane_weights}
@@ -0,0 +1,51 @@
+from typing import Dict, List
+
+# Industry-specific keywords database
+INDUSTRY_KEYWORDS: Dict[str, List[str]] = {
+    'software_engineering': [
+        'software development', 'backend', 'frontend', 'full stack', 'api', 'microservices',
+        'agile', 'scrum', 'devops', 'ci/cd', 'testing', 'debugging', 'code review',
+        'version control', 'git', 'architecture', 'design patterns', 'algorithms',
+        'data structures', 'optimization', 'performance', 'scalability', 'security'
+    ],
+    'data_science': [
+        'machine learning', 'deep learning', 'ai', 'data analysis', 'statistics',
+        'python', 'r', 'sql', 'pandas', 'numpy', 'tensorflow', 'pytorch', 'scikit-learn',
+        'data visualization', 'tableau', 'power bi', 'big data', 'hadoop', 'spark',
+        'etl', 'data mining', 'predictive modeling', 'natural language processing'
+    ],
+    'cloud_devops': [
+        'aws', 'azure', 'google cloud', 'docker', 'kubernetes', 'terraform',
+        'ansible', 'jenkins', 'github actions', 'ci/cd', 'infrastructure as code',
+        'monitoring', 'logging', 'security', 'networking', 'load balancing',
+        'auto-scaling', 'containerization', 'orchestration', 'serverless'
+    ],
+    'product_management': [
+        'product strategy', 'roadmap', 'user stories', 'agile', 'scrum',
+        'market research', 'competitive analysis', 'user experience', 'ui/ux',
+        'metrics', 'kpis', 'a/b testing', 'customer development', 'prioritization',
+        'stakeholder management', 'requirements gathering', 'product launch'
+    ],
+    'marketing': [
+        'digital marketing', 'seo', 'sem', 'social media', 'content marketing',
+        'email marketing', 'analytics', 'google analytics', 'campaign management',
+        'brand management', 'market research', 'crm', 'salesforce', 'hubspot',
+        'conversion optimization', 'lead generation', 'customer acquisition'
+    ]
+}
+
+# Keywords that must appear before an industry is attributed to a text
+INDUSTRY_KEYWORD_THRESHOLD = 3
+
+
+def detect_industries(text: str) -> List[str]:
+    """Detect industries from a job description (or any free text)"""
+    industries = []
+    text_lower = (text or '').lower()
+
+    for industry, keywords in INDUSTRY_KEYWORDS.items():
+        keyword_count = sum(1 for keyword in keywords if keyword in text_lower)
+        if keyword_count >= INDUSTRY_KEYWORD_THRESHOLD:
+            industries.append(industry)
+
+    return industries if industries else ['general']
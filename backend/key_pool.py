@@ -0,0 +1,240 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Collection, Dict, List, Mapping, Optional, Sequence, Tuple
+
+_NUMBERED_KEY = re.compile(r'^GROQ_API_KEY_(\d+)$')
+
+
+def load_api_keys(environ: Mapping[str, str] = None) -> List[str]:
+    """
+    Every configured Groq key, in order and without duplicates:
+    GROQ_API_KEY_1..N (any N), then the comma/whitespace separated
+    GROQ_API_KEYS, then one key per line of the file named by
+    GROQ_API_KEYS_FILE (blank lines and # comments ignored).
+    """
+    environ = os.environ if environ is None else environ
+    numbered = sorted(
+        (int(match.group(1)), value.strip())
+        for name, value in environ.items()
+        for match in [_NUMBERED_KEY.match(name)] if match
+    )
+    keys = [value for _, value in numbered]
+    keys.extend(re.split(r'[\s,]+', environ.get('GROQ_API_KEYS', '')))
+
+    keys_file = environ.get('GROQ_API_KEYS_FILE', '').strip()
+    if keys_file:
+        try:
+            with open(keys_file) as handle:
+                keys.extend(line.split('#', 1)[0].strip() for line in handle)
+        except OSError as e:
+            print(f"⚠️ Could not read GROQ_API_KEYS_FILE {keys_file}: {e}")
+
+    seen = set()
+    return [key for key in keys if key and not (key in seen or seen.add(key))]
+
+
+class KeyState:
+    """Usage of one API key; only touched while the pool lock is held"""
+    __slots__ = ('number', 'api_key', 'count', 'errors', 'in_flight', 'window_start',
+                 'requests_this_window', 'cooling_until', 'last_used')
+
+    def __init__(self, number: int, api_key: str):
+        self.number = number  # 1-based, as shown in logs and responses
+        self.api_key = api_key
+        self.count = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.window_start = None
+        self.requests_this_window = 0
+        self.cooling_until = 0.0
+        self.last_used = None
+
+
+class KeyPool:
+    """
+    Process-wide API key selection and rate accounting.
+
+    acquire() picks a key and counts the request in one step, so concurrent
+    batches and single analyses share the per-minute budget of each key
+    instead of keeping their own counters. Windows and cooldowns run on the
+    monotonic clock; a cooling key simply becomes eligible again once its
+    deadline passes, without a timer thread.
+    """
+
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, api_keys: Sequence[Optional[str]], max_requests_per_window: int, clock=time.monotonic):
+        self.max_requests_per_window = max_requests_per_window
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._states: List[KeyState] = [KeyState(i + 1, key) for i, key in enumerate(api_keys)]
+
+    def reload(self, api_keys: Sequence[Optional[str]]) -> Tuple[int, int]:
+        """
+        Swap in a new key list; returns (added, removed). Keys that stay keep
+        their slot number, usage and cooldown. Removed keys leave an empty
+        slot behind and new keys are appended with fresh numbers, so a number
+        still held by an in-flight request never points at a different key.
+        """
+        wanted = [key for key in dict.fromkeys(api_keys) if key]
+        with self._lock:
+            kept = {state.api_key for state in self._states if state.api_key in wanted}
+            removed = 0
+            states = []
+            for state in self._states:
+                if state.api_key in kept:
+                    states.append(state)
+                    continue
+                removed += 1 if state.api_key else 0
+                states.append(KeyState(state.number, None))
+            for key in wanted:
+                if key not in kept:
+                    states.append(KeyState(len(states) + 1, key))
+            added = len(wanted) - len(kept)
+            self._states = states
+            return added, removed
+
+    def configured(self) -> List[Tuple[int, str]]:
+        """(0-based slot, api_key) of every configured key, for acquire(slot, strict=True)"""
+        with self._lock:
+            return [(state.number - 1, state.api_key) for state in self._states if state.api_key]
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return [state.api_key for state in self._states if state.api_key]
+
+    def __len__(self):
+        return sum(1 for state in self._states if state.api_key)
+
+    def _roll_window(self, state: KeyState, now: float):
+        if state.window_start is None or now - state.window_start >= self.WINDOW_SECONDS:
+            state.window_start = now
+            state.requests_this_window = 0
+
+    def _usable(self, state: KeyState, now: float, exclude: Collection[int] = (), idle_only: bool = False) -> bool:
+        return (bool(state.api_key) and state.cooling_until <= now and state.number not in exclude
+                and not (idle_only and state.in_flight))
+
+    def _take(self, state: KeyState) -> Tuple[str, int]:
+        state.count += 1
+        state.requests_this_window += 1
+        state.in_flight += 1
+        state.last_used = datetime.now()
+        return state.api_key, state.number
+
+    def acquire(self, preferred: int = None, strict: bool = False, exclude: Collection[int] = (),
+                idle_only: bool = False) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Reserve a key for one request; returns (api_key, key_number) or (None, None).
+        `preferred` is a 0-based hint tried first; with strict=True only that key is considered.
+        Key numbers in `exclude` are skipped, and so are keys with a call in flight when idle_only is set.
+        """
+        with self._lock:
+            now = self._clock()
+            for state in self._states:
+                self._roll_window(state, now)
+
+            if preferred is not None and self._states:
+                state = self._states[preferred % len(self._states)]
+                if self._usable(state, now, exclude, idle_only) and (strict or state.requests_this_window < self.max_requests_per_window):
+                    return self._take(state)
+                if strict:
+                    return None, None
+
+            usable = [state for state in self._states if self._usable(state, now, exclude, idle_only)]
+            if not usable:
+                return None, None
+
+            # Least loaded key under its limit; errors weigh against a key
+            under_limit = [state for state in usable if state.requests_this_window < self.max_requests_per_window]
+            if under_limit:
+                best = min(under_limit, key=lambda s: (s.requests_this_window * 10 + s.errors * 5, s.in_flight))
+            else:
+                best = min(usable, key=lambda s: (s.requests_this_window, s.in_flight))
+                print(f"⚠️ Using key {best.number} even though it's near limit: "
+                      f"{best.requests_this_window}/{self.max_requests_per_window}")
+            return self._take(best)
+
+    def release(self, key_number: int):
+        """Mark the request started by acquire() as finished"""
+        with self._lock:
+            state = self._state(key_number)
+            if state is not None and state.in_flight > 0:
+                state.in_flight -= 1
+
+    def record_error(self, key_number: int, cool_for: float = None):
+        """Count a failed call, optionally cooling the key for `cool_for` seconds"""
+        with self._lock:
+            state = self._state(key_number)
+            if state is None:
+                return
+            state.errors += 1
+            if cool_for:
+                state.cooling_until = max(state.cooling_until, self._clock() + cool_for)
+
+    def cool(self, key_number: int, duration: float):
+        with self._lock:
+            state = self._state(key_number)
+            if state is not None:
+                state.cooling_until = max(state.cooling_until, self._clock() + duration)
+
+    def is_cooling(self, key_number: int) -> bool:
+        state = self._state(key_number)
+        return state is not None and state.cooling_until > self._clock()
+
+    def next_available_in(self) -> float:
+        """Seconds until the earliest cooling key can be used again (0 if one already can)"""
+        with self._lock:
+            now = self._clock()
+            waits = [max(0.0, state.cooling_until - now) for state in self._states if state.api_key]
+            return min(waits) if waits else 0.0
+
+    def remaining_budget(self) -> float:
+        """Share of this window's request budget left on usable keys, 0.0-1.0"""
+        with self._lock:
+            now = self._clock()
+            configured = [state for state in self._states if state.api_key]
+            if not configured or self.max_requests_per_window <= 0:
+                return 0.0
+            remaining = 0
+            for state in configured:
+                self._roll_window(state, now)
+                if state.cooling_until <= now:
+                    remaining += max(0, self.max_requests_per_window - state.requests_this_window)
+            return remaining / (self.max_requests_per_window * len(configured))
+
+    def requests_this_window(self, key_number: int) -> int:
+        with self._lock:
+            state = self._state(key_number)
+            if state is None:
+                return 0
+            self._roll_window(state, self._clock())
+            return state.requests_this_window
+
+    def _state(self, key_number: int) -> Optional[KeyState]:
+        if key_number is None or not 1 <= key_number <= len(self._states):
+            return None
+        return self._states[key_number - 1]
+
+    def snapshot(self) -> List[Dict]:
+        """Per-key usage for status endpoints"""
+        with self._lock:
+            now = self._clock()
+            rows = []
+            for state in self._states:
+                self._roll_window(state, now)
+                rows.append({
+                    'key': f'Key {state.number}',
+                    'configured': bool(state.api_key),
+                    'total_usage': state.count,
+                    'requests_this_minute': state.requests_this_window,
+                    'in_flight': state.in_flight,
+                    'errors': state.errors,
+                    'cooling': state.cooling_until > now,
+                    'cooling_remaining': round(max(0.0, state.cooling_until - now), 1),
+                    'last_used': state.last_used.isoformat() if state.last_used else None
+                })
+            return rows
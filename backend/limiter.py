@@ -0,0 +1,119 @@
+import threading
+import time
+from typing import Dict, Optional
+
+
+class AIMDLimiter:
+    """
+    Adaptive cap on concurrent LLM calls (additive increase, multiplicative
+    decrease).
+
+    While calls succeed within LATENCY_TOLERANCE times the long-run latency
+    and the current limit is actually in use, the limit grows by about one
+    slot per limit's worth of successes. A 429, 503 or timeout halves it,
+    at most once per baseline latency so a burst of failures from the same
+    moment counts as one congestion signal. Calls above the latency
+    tolerance hold the limit where it is.
+    """
+
+    DECREASE = 0.5
+    LATENCY_TOLERANCE = 2.0
+    BASELINE_ALPHA = 0.05
+    MIN_BACKOFF_INTERVAL = 1.0  # seconds between two decreases
+
+    def __init__(self, initial: int, max_limit: int, min_limit: int = 1, clock=time.monotonic):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._baseline: Optional[float] = None
+        self._last_decrease = 0.0
+        self._increases = 0
+        self._decreases = 0
+        self._closed = False
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> bool:
+        """Wait for a free slot; False once the limiter is closed"""
+        with self._cond:
+            while self._in_flight >= self.limit and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                return False
+            self._in_flight += 1
+            return True
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without waiting"""
+        with self._cond:
+            if self._closed or self._in_flight >= self.limit:
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self, latency: float = None, overloaded: bool = False):
+        """
+        Free a slot and feed back how the call went: the latency of a
+        successful call, overloaded=True for a 429/503/timeout, or neither
+        when the call failed for an unrelated reason.
+        """
+        with self._cond:
+            saturated = self._in_flight >= self.limit
+            self._in_flight = max(0, self._in_flight - 1)
+            if overloaded:
+                self._decrease()
+            elif latency is not None:
+                self._on_success(latency, saturated)
+            self._cond.notify_all()
+
+    def _on_success(self, latency: float, saturated: bool):
+        baseline = self._baseline
+        self._baseline = latency if baseline is None else (1 - self.BASELINE_ALPHA) * baseline + self.BASELINE_ALPHA * latency
+        if baseline is not None and latency > self.LATENCY_TOLERANCE * baseline:
+            return  # slower than usual: hold
+        if saturated and self._limit < self.max_limit:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._increases += 1
+
+    def _decrease(self):
+        now = self._clock()
+        if now - self._last_decrease < max(self.MIN_BACKOFF_INTERVAL, self._baseline or 0.0):
+            return
+        self._last_decrease = now
+        self._limit = max(self.min_limit, self._limit * self.DECREASE)
+        self._decreases += 1
+
+    def set_max(self, max_limit: int, initial: int = None):
+        """New ceiling, e.g. after keys were added or removed"""
+        with self._cond:
+            self.max_limit = max(self.min_limit, max_limit)
+            if initial is not None:
+                self._limit = max(self._limit, float(initial))
+            self._limit = min(self._limit, float(self.max_limit))
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        return {
+            'limit': self.limit,
+            'limit_exact': round(self._limit, 2),
+            'min_limit': self.min_limit,
+            'max_limit': self.max_limit,
+            'in_flight': self._in_flight,
+            'baseline_latency': round(self._baseline, 3) if self._baseline is not None else None,
+            'increases': self._increases,
+            'decreases': self._decreases
+        }
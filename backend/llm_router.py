@@ -0,0 +1,362 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Collection, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import requests
+
+from circuit_breaker import CLOSED, CircuitBreaker
+from key_pool import KeyPool
+
+# Key used for OpenAI-compatible servers that need none (llama.cpp, vLLM)
+NO_AUTH_KEY = 'no-auth'
+
+
+def parse_usage(data: Dict) -> Dict[str, int]:
+    """Token counts of an OpenAI-style response, including prompt tokens served from the provider's cache"""
+    usage = data.get('usage') or {}
+    details = usage.get('prompt_tokens_details') or {}
+    return {
+        'prompt_tokens': usage.get('prompt_tokens') or 0,
+        'cached_tokens': details.get('cached_tokens') or 0,
+        'completion_tokens': usage.get('completion_tokens') or 0
+    }
+
+
+def is_provider_failure(error: str) -> bool:
+    """Errors that say the provider is unhealthy, not just this key (429s and other 4xx are the key's)"""
+    return error != 'rate_limit' and not error.startswith('api_error_4')
+
+
+class LLMProvider:
+    """
+    One OpenAI-compatible chat completions endpoint with its own key pool
+    and live latency/error statistics.
+    """
+
+    EWMA_ALPHA = 0.2
+    PROBE_AFTER = 60.0  # seconds without a sample before a provider is tried again
+    LATENCY_WINDOW = 200  # recent successful calls kept for percentiles
+    MIN_PERCENTILE_SAMPLES = 20
+    KEY_FAILURE_THRESHOLD = 3
+
+    def __init__(self, name: str, url: str, model: str, key_pool: KeyPool, concurrency_per_key: int = 1,
+                 concurrency: int = None, extra_payload: Dict = None, json_mode: bool = True):
+        self.name = name
+        self.url = url
+        self.model = model
+        self.key_pool = key_pool
+        self.concurrency_per_key = concurrency_per_key
+        self._concurrency = concurrency
+        self.extra_payload = extra_payload or {}
+        self.json_mode = json_mode  # honours response_format {"type": "json_object"}
+        self.latency_ewma: Optional[float] = None
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.last_sample = None
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self.breaker = CircuitBreaker(name)
+        self._key_breakers: Dict[int, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+
+    @property
+    def concurrency(self) -> int:
+        """Concurrent calls this provider can take; grows with its key count unless fixed"""
+        return self._concurrency or max(1, len(self.key_pool)) * self.concurrency_per_key
+
+    def key_breaker(self, key_number: int) -> CircuitBreaker:
+        breaker = self._key_breakers.get(key_number)
+        if breaker is None:
+            breaker = self._key_breakers.setdefault(
+                key_number, CircuitBreaker(f'{self.name} Key {key_number}', self.KEY_FAILURE_THRESHOLD))
+        return breaker
+
+    def blocked_keys(self) -> List[int]:
+        """Key numbers whose circuit is open (or half-open with its probe in flight)"""
+        return [number for number, breaker in list(self._key_breakers.items()) if not breaker.available()]
+
+    def available(self) -> bool:
+        """Provider circuit lets calls through and at least one configured key's circuit does too"""
+        if not len(self.key_pool) or not self.breaker.available():
+            return False
+        blocked = set(self.blocked_keys())
+        return any(slot + 1 not in blocked for slot, _ in self.key_pool.configured())
+
+    def next_available_in(self) -> float:
+        """Seconds until a key is out of cooldown and both its circuit and the provider's admit a call"""
+        wait = self.key_pool.next_available_in()
+        key_waits = [self.key_breaker(slot + 1).retry_in() for slot, _ in self.key_pool.configured()]
+        if key_waits:
+            wait = max(wait, min(key_waits))
+        return max(wait, self.breaker.retry_in())
+
+    def record_outcome(self, key_number: int, error: Optional[str]):
+        """
+        Feed one call's result to the key and provider circuits. A 429 still
+        proves both are up, as does output rejected by JSON mode; other 4xx
+        errors count against the key only.
+        """
+        key_breaker = self.key_breaker(key_number)
+        if error is None or error in ('rate_limit', 'invalid_json'):
+            key_breaker.record_success()
+            self.breaker.record_success()
+            return
+        key_breaker.record_failure()
+        if is_provider_failure(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_neutral()
+
+    def record(self, latency: float, failed: bool):
+        with self._lock:
+            alpha = self.EWMA_ALPHA
+            self.latency_ewma = latency if self.latency_ewma is None else (1 - alpha) * self.latency_ewma + alpha * latency
+            self.error_rate = (1 - alpha) * self.error_rate + alpha * (1.0 if failed else 0.0)
+            self.requests += 1
+            self.failures += 1 if failed else 0
+            self.last_sample = time.monotonic()
+            if not failed:
+                self._latencies.append(latency)
+
+    def record_usage(self, usage: Dict[str, int]):
+        with self._lock:
+            self.prompt_tokens += usage['prompt_tokens']
+            self.cached_tokens += usage['cached_tokens']
+
+    def latency_percentile(self, fraction: float) -> Optional[float]:
+        """Latency of recent successful calls at `fraction` (0.9 = p90); None until enough samples"""
+        with self._lock:
+            if len(self._latencies) < self.MIN_PERCENTILE_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def route_cost(self) -> float:
+        """Expected cost of sending one more call here; lower is better"""
+        if self.last_sample is None or time.monotonic() - self.last_sample > self.PROBE_AFTER:
+            return 0.0  # untried or stale: send one call to measure it
+        latency = self.latency_ewma
+        load = max(1.0, (self.in_flight + 1) / self.concurrency)
+        reliability = max(0.05, 1.0 - self.error_rate)
+        budget = self.key_pool.remaining_budget()
+        return latency * load / reliability * (2.0 - budget)
+
+    def call(self, prompt, api_key: str, max_tokens: int = 1500, temperature: float = 0.1,
+             timeout: float = 45, key_index: int = None, usage: Dict = None, json_output: bool = False):
+        """
+        Single chat completion; returns the text or {'error': ..., 'status': ...}.
+        `prompt` is a string (sent as one user message) or a list of chat messages;
+        token usage of a successful call is written into `usage` when given.
+        json_output asks for JSON mode where the provider supports it.
+        """
+        headers = {'Content-Type': 'application/json'}
+        if api_key and api_key != NO_AUTH_KEY:
+            headers['Authorization'] = f'Bearer {api_key}'
+
+        payload = {
+            'model': self.model,
+            'messages': [{'role': 'user', 'content': prompt}] if isinstance(prompt, str) else prompt,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'top_p': 0.9,
+            'stream': False,
+            **self.extra_payload
+        }
+        if json_output and self.json_mode:
+            payload['response_format'] = {'type': 'json_object'}
+
+        try:
+            start_time = time.time()
+            response = self._session.post(self.url, headers=headers, json=payload, timeout=timeout)
+            response_time = time.time() - start_time
+
+            if response.status_code == 200:
+                data = response.json()
+                if data.get('choices'):
+                    call_usage = parse_usage(data)
+                    self.record_usage(call_usage)
+                    if usage is not None:
+                        usage.update(call_usage)
+                    cached = f", {call_usage['cached_tokens']}/{call_usage['prompt_tokens']} prompt tokens cached" if call_usage['cached_tokens'] else ''
+                    print(f"✅ {self.name} response in {response_time:.2f}s{cached}")
+                    return data['choices'][0]['message']['content']
+                print(f"❌ Unexpected {self.name} response format")
+                return {'error': 'invalid_response', 'status': response.status_code}
+
+            if response.status_code == 429:
+                print(f"❌ Rate limit exceeded for {self.name} (Key {key_index})")
+                # Track this error for the key and cool it for 60 seconds
+                self.key_pool.record_error(key_index, cool_for=60)
+                return {'error': 'rate_limit', 'status': 429}
+
+            if response.status_code == 400 and 'json_validate_failed' in response.text:
+                # JSON mode rejected the model's output; hand it back for repair
+                print(f"❌ {self.name} output failed JSON validation")
+                try:
+                    failed_generation = response.json().get('error', {}).get('failed_generation', '')
+                except ValueError:
+                    failed_generation = ''
+                return {'error': 'invalid_json', 'status': 400, 'failed_generation': failed_generation}
+
+            if response.status_code == 503:
+                print(f"❌ Service unavailable for {self.name}")
+                return {'error': 'service_unavailable', 'status': 503}
+
+            print(f"❌ {self.name} error {response.status_code}: {response.text[:100]}")
+            self.key_pool.record_error(key_index)
+            return {'error': f'api_error_{response.status_code}', 'status': response.status_code}
+
+        except requests.exceptions.Timeout:
+            print(f"❌ {self.name} timeout after {timeout}s")
+            return {'error': 'timeout', 'status': 408}
+
+        except Exception as e:
+            print(f"❌ {self.name} exception: {str(e)}")
+            return {'error': str(e), 'status': 500}
+
+    def stats(self) -> Dict:
+        p90 = self.latency_percentile(0.9)
+        return {
+            'name': self.name,
+            'model': self.model,
+            'keys': len(self.key_pool),
+            'concurrency': self.concurrency,
+            'in_flight': self.in_flight,
+            'latency_ewma': round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            'latency_p90': round(p90, 3) if p90 is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'remaining_budget': round(self.key_pool.remaining_budget(), 3),
+            'requests': self.requests,
+            'failures': self.failures,
+            'prompt_tokens': self.prompt_tokens,
+            'cached_tokens': self.cached_tokens,
+            'circuit': self.breaker.stats(),
+            'key_circuits': {f'Key {number}': breaker.state for number, breaker in sorted(self._key_breakers.items())
+                             if breaker.state != CLOSED}
+        }
+
+
+class LLMRouter:
+    """
+    Picks the provider for each call from live statistics: EWMA latency,
+    EWMA error rate, current load against its concurrency and the share of
+    its per-minute budget left. Providers without a usable key, or whose
+    circuit is open, are skipped, so a slow, failing or rate-limited
+    provider stops receiving work while the others absorb it.
+    """
+
+    def __init__(self, providers: Sequence[LLMProvider]):
+        self.providers: List[LLMProvider] = list(providers)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(provider.key_pool) for provider in self.providers)
+
+    @property
+    def concurrency(self) -> int:
+        return sum(provider.concurrency for provider in self.providers if len(provider.key_pool))
+
+    def get(self, name: str) -> Optional[LLMProvider]:
+        return next((provider for provider in self.providers if provider.name == name), None)
+
+    def acquire(self, key_hint: int = None, exclude: Collection[Tuple[str, int]] = (),
+                idle_only: bool = False) -> Tuple[Optional[LLMProvider], Optional[str], Optional[int]]:
+        """
+        Choose a provider and reserve one of its keys; (None, None, None) when none is usable.
+        `exclude` holds (provider name, key number) pairs to skip; idle_only skips keys with a call in flight.
+        """
+        with self._lock:
+            candidates = sorted(
+                (provider for provider in self.providers
+                 if provider.key_pool.next_available_in() == 0 and provider.available()),
+                key=lambda provider: provider.route_cost()
+            )
+            for provider in candidates:
+                skip = [number for name, number in exclude if name == provider.name] + provider.blocked_keys()
+                api_key, key_number = provider.key_pool.acquire(key_hint, exclude=skip, idle_only=idle_only)
+                if api_key:
+                    provider.in_flight += 1
+                    provider.breaker.begin()
+                    provider.key_breaker(key_number).begin()
+                    return provider, api_key, key_number
+        return None, None, None
+
+    def release(self, provider: LLMProvider, key_number: int, latency: float, error: Optional[str] = None):
+        provider.key_pool.release(key_number)
+        with self._lock:
+            provider.in_flight = max(0, provider.in_flight - 1)
+        provider.record(latency, failed=error is not None)
+        provider.record_outcome(key_number, error)
+
+    def unreserve(self, provider: LLMProvider, key_number: int):
+        """Give back a key reserved by acquire() without calling it"""
+        provider.key_pool.release(key_number)
+        with self._lock:
+            provider.in_flight = max(0, provider.in_flight - 1)
+        provider.breaker.record_neutral()
+        provider.key_breaker(key_number).record_neutral()
+
+    def next_available_in(self) -> float:
+        waits = [provider.next_available_in() for provider in self.providers if len(provider.key_pool)]
+        return min(waits) if waits else 0.0
+
+    def circuit_open(self) -> bool:
+        """True when keys are configured but every provider's circuits refuse calls right now"""
+        configured = [provider for provider in self.providers if len(provider.key_pool)]
+        return bool(configured) and not any(provider.available() for provider in configured)
+
+    def stats(self) -> List[Dict]:
+        return [provider.stats() for provider in self.providers]
+
+
+def chat_completions_url(base_url: str) -> str:
+    base_url = base_url.rstrip('/')
+    return base_url if base_url.endswith('/chat/completions') else f'{base_url}/chat/completions'
+
+
+def load_providers(max_requests_per_minute: int, environ: Mapping[str, str] = None) -> List[LLMProvider]:
+    """
+    Extra OpenAI-compatible providers from LLM_PROVIDERS (a JSON list) or
+    the JSON file named by LLM_PROVIDERS_FILE. Each entry takes name,
+    base_url and model, plus optional api_keys (list), api_key_env (name of
+    an env var with comma separated keys), max_requests_per_minute,
+    concurrency, extra (merged into the request payload) and json_mode
+    (false for servers without response_format support). A provider
+    without keys is called without authentication, e.g. a local llama.cpp
+    or vLLM server.
+    """
+    environ = os.environ if environ is None else environ
+    raw = environ.get('LLM_PROVIDERS', '').strip()
+    providers_file = environ.get('LLM_PROVIDERS_FILE', '').strip()
+    try:
+        if not raw and providers_file:
+            with open(providers_file) as handle:
+                raw = handle.read()
+        entries = json.loads(raw) if raw else []
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not load LLM providers: {e}")
+        return []
+
+    providers = []
+    for entry in entries:
+        try:
+            keys = list(entry.get('api_keys') or [])
+            if entry.get('api_key_env'):
+                keys.extend(key.strip() for key in environ.get(entry['api_key_env'], '').split(','))
+            keys = [key for key in keys if key] or [NO_AUTH_KEY]
+            pool = KeyPool(keys, int(entry.get('max_requests_per_minute', max_requests_per_minute)))
+            providers.append(LLMProvider(
+                entry['name'], chat_completions_url(entry['base_url']), entry['model'], pool,
+                concurrency=entry.get('concurrency'), extra_payload=entry.get('extra'),
+                json_mode=entry.get('json_mode', True)
+            ))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"⚠️ Skipping invalid LLM provider entry {entry!r}: {e}")
+    return providers
@@ -1,55 +1,116 @@
+import json
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 db = SQLAlchemy()
 
+# Native JSON column; JSONB on PostgreSQL
+JSONType = db.JSON().with_variant(JSONB(), 'postgresql')
+
+def json_serializer(value):
+    """Serializer for JSON columns (orjson when available)"""
+    if orjson:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(value, default=str)
+
+def json_deserializer(value):
+    """Deserializer for JSON columns (orjson when available)"""
+    if orjson:
+        return orjson.loads(value)
+    return json.loads(value)
+
 class Analysis(db.Model):
     """Model for storing analysis results"""
     __tablename__ = 'analyses'
     
     id = db.Column(db.String(64), primary_key=True)
+    batch_id = db.Column(db.String(64))
+    rank = db.Column(db.Integer)
     candidate_name = db.Column(db.String(200))
     filename = db.Column(db.String(500))
     job_description_hash = db.Column(db.String(64))
-    overall_score = db.Column(db.Integer)
+    overall_score = db.Column(db.Float)
     grade = db.Column(db.String(10))
     recommendation = db.Column(db.String(500))
-    analysis_data = db.Column(db.Text)  # JSON data
+    years_of_experience = db.Column(db.String(50))
+    analysis_data = db.Column(JSONType)
+    text_fingerprint = db.Column(db.String(64))  # SHA-256 of the normalized resume text
+    minhash = db.Column(JSONType)  # MinHash signature for near-duplicate lookup
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    skills = db.relationship('AnalysisSkill', backref='analysis', lazy='select', cascade='all, delete-orphan')
+    
     # Indexes
     __table_args__ = (
         db.Index('idx_created_at', 'created_at'),
         db.Index('idx_score', 'overall_score'),
         db.Index('idx_filename', 'filename'),
+        db.Index('idx_analysis_batch', 'batch_id', 'rank'),
+        db.Index('idx_analysis_fingerprint', 'job_description_hash', 'text_fingerprint'),
     )
     
+    @classmethod
+    def summary_columns(cls):
+        """Columns needed for list views (everything except the JSON payload)"""
+        return (cls.id, cls.batch_id, cls.rank, cls.candidate_name, cls.filename, cls.overall_score,
+                cls.grade, cls.recommendation, cls.years_of_experience, cls.created_at)
+    
+    @staticmethod
+    def summary_dict(row):
+        """Convert a projected summary row to a dictionary"""
+        data = dict(row)
+        data['created_at'] = data['created_at'].isoformat() if data.get('created_at') else None
+        return data
+    
     def to_dict(self):
         """Convert to dictionary"""
-        import json
         return {
             'id': self.id,
+            'batch_id': self.batch_id,
+            'rank': self.rank,
             'candidate_name': self.candidate_name,
             'filename': self.filename,
             'overall_score': self.overall_score,
             'grade': self.grade,
             'recommendation': self.recommendation,
-            'analysis_data': json.loads(self.analysis_data) if self.analysis_data else {},
+            'years_of_experience': self.years_of_experience,
+            'analysis_data': self.analysis_data or {},
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+class AnalysisSkill(db.Model):
+    """Matched / missing skills of an analysis, one row per skill"""
+    __tablename__ = 'analysis_skills'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    analysis_id = db.Column(db.String(64), db.ForeignKey('analyses.id', ondelete='CASCADE'), nullable=False)
+    skill_name = db.Column(db.String(200), nullable=False)
+    matched = db.Column(db.Boolean, default=True)
+    
+    __table_args__ = (
+        db.Index('idx_analysis_skill_analysis', 'analysis_id'),
+        db.Index('idx_analysis_skill_name', 'skill_name', 'matched'),
+    )
+
 class BatchAnalysis(db.Model):
     """Model for storing batch analysis results"""
     __tablename__ = 'batch_analyses'
     
     id = db.Column(db.String(64), primary_key=True)
     batch_id = db.Column(db.String(64), unique=True)
+    job_description_hash = db.Column(db.String(64))
     total_files = db.Column(db.Integer)
     successfully_analyzed = db.Column(db.Integer)
     failed_files = db.Column(db.Integer)
-    analysis_data = db.Column(db.Text)  # JSON data
+    analysis_data = db.Column(JSONType)
     excel_report_path = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -60,18 +121,25 @@ class BatchAnalysis(db.Model):
     
     def to_dict(self):
         """Convert to dictionary"""
-        import json
         return {
             'id': self.id,
             'batch_id': self.batch_id,
             'total_files': self.total_files,
             'successfully_analyzed': self.successfully_analyzed,
             'failed_files': self.failed_files,
-            'analysis_data': json.loads(self.analysis_data) if self.analysis_data else {},
+            'analysis_data': self.analysis_data or {},
             'excel_report_path': self.excel_report_path,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class JobDescription(db.Model):
+    """Job descriptions, stored once and referenced by hash"""
+    __tablename__ = 'job_descriptions'
+    
+    hash = db.Column(db.String(64), primary_key=True)
+    text = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class SkillTrend(db.Model):
     """Model for tracking skill trends"""
     __tablename__ = 'skill_trends'
@@ -80,9 +148,12 @@ class SkillTrend(db.Model):
     skill_name = db.Column(db.String(200))
     frequency = db.Column(db.Integer, default=0)
     industry = db.Column(db.String(100))
+    period_start = db.Column(db.Date)  # daily bucket the counter belongs to
     last_seen = db.Column(db.DateTime, default=datetime.utcnow)
     
     __table_args__ = (
+        db.UniqueConstraint('skill_name', 'industry', 'period_start', name='uq_skill_trend_bucket'),
+        db.Index('idx_skill_trend_window', 'industry', 'period_start'),
         db.Index('idx_skill_name', 'skill_name'),
         db.Index('idx_industry', 'industry'),
         db.Index('idx_frequency', 'frequency'),
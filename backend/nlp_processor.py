@@ -12,6 +12,8 @@ import os
 from typing import List, Dict, Tuple, Set, Optional
 import numpy as np
 
+from .resume_sections import extract_sections
+
 # Download required NLTK data
 try:
     nltk.data.find('tokenizers/punkt')
@@ -93,12 +95,27 @@ class NLPProcessor:
         return skills
     
     @classmethod
-    def extract_entities(cls, text: str) -> Dict:
-        """Extract named entities from text using SpaCy"""
+    def pipe_documents(cls, texts: List[str], batch_size: int = 16) -> Tuple[List, List]:
+        """
+        Run SpaCy over many texts in batches. Returns the docs of the original
+        texts (for entities) and of the lowercased texts (for skills), ready to
+        pass to extract_entities / extract_skills.
+        """
         if not cls._nlp:
             cls.initialize_model()
         
-        doc = cls._nlp(text)
+        entity_docs = list(cls._nlp.pipe(texts, batch_size=batch_size))
+        skill_docs = list(cls._nlp.pipe((text.lower() for text in texts), batch_size=batch_size))
+        return entity_docs, skill_docs
+    
+    @classmethod
+    def extract_entities(cls, text: str, doc=None, skills: Optional[List[str]] = None) -> Dict:
+        """Extract named entities from text using SpaCy (doc/skills may be precomputed)"""
+        if not cls._nlp:
+            cls.initialize_model()
+        
+        if doc is None:
+            doc = cls._nlp(text)
         
         entities = {
             'persons': [],
@@ -163,13 +180,13 @@ class NLPProcessor:
                 entities['experience'].append(match.group())
         
         # Extract skills
-        entities['skills'] = cls.extract_skills(text)
+        entities['skills'] = skills if skills is not None else cls.extract_skills(text)
         
         return entities
     
     @classmethod
-    def extract_skills(cls, text: str) -> List[str]:
-        """Extract technical and soft skills from text"""
+    def extract_skills(cls, text: str, doc=None) -> List[str]:
+        """Extract technical and soft skills from text (doc: SpaCy doc of the lowercased text)"""
         if not cls._nlp:
             cls.initialize_model()
         
@@ -184,7 +201,8 @@ class NLPProcessor:
                     found_skills.add(skill)
         
         # Use SpaCy for additional skill extraction
-        doc = cls._nlp(text_lower)
+        if doc is None:
+            doc = cls._nlp(text_lower)
         
         # Extract noun chunks that might be skills
         for chunk in doc.noun_chunks:
@@ -307,44 +325,7 @@ class NLPProcessor:
     @classmethod
     def extract_sections(cls, text: str) -> Dict[str, str]:
         """Extract resume sections"""
-        sections = {
-            'contact': '',
-            'summary': '',
-            'experience': '',
-            'education': '',
-            'skills': '',
-            'projects': '',
-            'certifications': ''
-        }
-        
-        # Common section headers
-        section_patterns = {
-            'contact': r'(?:contact|personal)\s*(?:information|details)?',
-            'summary': r'(?:summary|profile|objective|about)\s*(?:me)?',
-            'experience': r'(?:experience|work\s*experience|employment\s*history)',
-            'education': r'(?:education|academic\s*background|qualifications)',
-            'skills': r'(?:skills|technical\s*skills|competencies)',
-            'projects': r'(?:projects|portfolio|work\s*portfolio)',
-            'certifications': r'(?:certifications|certificates|licenses)'
-        }
-        
-        lines = text.split('\n')
-        current_section = None
-        
-        for line in lines:
-            line_lower = line.strip().lower()
-            
-            # Check if this line starts a new section
-            for section, pattern in section_patterns.items():
-                if re.match(pattern, line_lower, re.IGNORECASE):
-                    current_section = section
-                    break
-            
-            # Add line to current section
-            if current_section and line.strip():
-                sections[current_section] += line + '\n'
-        
-        return sections
+        return extract_sections(text)
     
     @classmethod
     def calculate_text_quality(cls, text: str) -> Dict:
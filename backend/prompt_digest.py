@@ -0,0 +1,156 @@
+import math
+import re
+from typing import Dict, List, Set, Tuple
+
+from resume_sections import split_heading
+
+# tiktoken is in requirements.txt; without it (or when its encoding file cannot be
+# fetched) token counts fall back to a heuristic, so budgets are approximate
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding('cl100k_base')
+except Exception:
+    _ENCODING = None
+    print("⚠️ tiktoken unavailable - prompt token budgets use an approximate count")
+
+_WORD = re.compile(r"[A-Za-z0-9][A-Za-z0-9+#.\-/]*")
+_TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+_BLANK_RUN = re.compile(r'\n\s*\n+')
+_SPACE_RUN = re.compile(r'[ \t ]+')
+
+_STOP_WORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could do does
+for from had has have he her his how i if in into is it its may me more most must my no not of
+on or our out over own shall she should so some such than that the their them then there these
+they this those through to too under up very was we were what when where which while who will
+with within would you your years year work working team teams role strong ability experience
+""".split())
+
+# Sections in the order they matter to the analysis; earlier sections win ties for the budget
+SECTION_WEIGHTS: Dict[str, float] = {
+    'summary': 3.0,
+    'skills': 3.0,
+    'experience': 2.5,
+    'education': 2.0,
+    'certifications': 1.5,
+    'projects': 1.0,
+    'contact': 0.2
+}
+REPEAT_MIN_LENGTH = 30
+HEADER_LINES = 4  # lines before the first section header (name, title) are always kept
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in `text`: tiktoken's cl100k_base, or a heuristic estimate (about 4 characters per token) without it"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_PIECE.findall(text))
+
+
+def keywords(text: str) -> Set[str]:
+    """Lowercased content words, without stop words"""
+    return {word for word in (w.lower().rstrip('.') for w in _WORD.findall(text))
+            if len(word) > 1 and word not in _STOP_WORDS}
+
+
+def _clean_lines(text: str) -> List[str]:
+    lines, seen = [], set()
+    for line in text.split('\n'):
+        line = _SPACE_RUN.sub(' ', line).strip()
+        key = line.lower()
+        if not any(ch.isalnum() for ch in line) or key in seen:
+            continue
+        if len(line) > REPEAT_MIN_LENGTH:
+            seen.add(key)  # repeated page headers/footers; short lines like job titles may repeat
+        lines.append(line)
+    return lines
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Whitespace-normalized text cut at the last whole line (or word) within `budget` tokens"""
+    text = _BLANK_RUN.sub('\n', _SPACE_RUN.sub(' ', text)).strip()
+    if count_tokens(text) <= budget:
+        return text
+    kept, used = [], 0
+    for line in text.split('\n'):
+        cost = count_tokens(line) + 1
+        if used + cost > budget:
+            remaining = budget - used
+            words = line.split(' ')
+            while words and count_tokens(' '.join(words)) > remaining:
+                words.pop()
+            if words:
+                kept.append(' '.join(words))
+            break
+        kept.append(line)
+        used += cost
+    return '\n'.join(kept)
+
+
+def build_resume_digest(resume_text: str, job_description: str, budget: int) -> Tuple[str, int, int]:
+    """
+    Compact resume for the LLM prompt, at most `budget` tokens.
+
+    Lines are grouped by resume section; each line is scored by its
+    section's weight plus the job description keywords it contains,
+    relative to its length. The best lines are kept until the budget is spent and
+    emitted in their original order, with the header lines (name, title)
+    and every kept section's heading always included. Resumes without
+    recognizable sections are cut at the budget instead.
+
+    Returns (digest, tokens of the original text, tokens of the digest).
+    """
+    original_tokens = count_tokens(resume_text)
+    lines = _clean_lines(resume_text)
+    compact = '\n'.join(lines)
+    compact_tokens = count_tokens(compact)
+    if compact_tokens <= budget:
+        return compact, original_tokens, compact_tokens
+
+    # Header-only lines are headings; "Skills: Python, Go" starts its section but is content too
+    current, heading, assigned, headings, contents = None, None, [], [], []
+    for index, line in enumerate(lines):
+        section, rest = split_heading(line)
+        if section:
+            current, heading = section, (None if rest else index)
+        assigned.append(current)
+        headings.append(heading)
+        contents.append(rest if section else line)
+    if not any(assigned):
+        digest = truncate_to_tokens(compact, budget)
+        return digest, original_tokens, count_tokens(digest)
+
+    wanted = keywords(job_description)
+    costs = [count_tokens(line) + 1 for line in lines]
+    keep = set()
+    used = 0
+
+    # Name and title come before the first section header
+    for index, section in enumerate(assigned[:HEADER_LINES]):
+        if section is None and used + costs[index] <= budget:
+            keep.add(index)
+            used += costs[index]
+
+    candidates = []
+    for index, (content, section) in enumerate(zip(contents, assigned)):
+        if section is None or index in keep or headings[index] == index:
+            continue  # headings only come in with a line of their section
+        hits = len(keywords(content) & wanted)
+        value = SECTION_WEIGHTS.get(section, 1.0) + 2.0 * hits
+        candidates.append((value / math.sqrt(costs[index]), -index, index))
+
+    for _, _, index in sorted(candidates, reverse=True):
+        heading = headings[index]
+        extra = costs[heading] if heading is not None and heading not in keep and heading != index else 0
+        if used + costs[index] + extra > budget:
+            continue
+        keep.add(index)
+        used += costs[index]
+        if extra:
+            keep.add(heading)
+            used += extra
+
+    digest = '\n'.join(lines[index] for index in sorted(keep))
+    return digest, original_tokens, count_tokens(digest)
@@ -0,0 +1,100 @@
+import threading
+from typing import Dict, List
+
+
+class PromptTemplate:
+    """
+    Versioned chat prompt laid out for provider prefix caching.
+
+    The system message (instructions and output format) never changes and
+    the user message starts with the job description, so every prompt of a
+    batch shares the same prefix up to the resume, which comes last.
+    record_usage() collects the prompt and cached token counts providers
+    report, per template version.
+    """
+
+    def __init__(self, version: str, system: str, context: str, suffix: str):
+        self.version = version
+        self.system = system
+        self.context = context
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._prompt_tokens = 0
+        self._cached_tokens = 0
+
+    def render(self, job_description: str, resume_text: str) -> List[Dict[str, str]]:
+        return [
+            {'role': 'system', 'content': self.system},
+            {'role': 'user', 'content': self.context.format(job_description=job_description)
+                                        + self.suffix.format(resume_text=resume_text)}
+        ]
+
+    def record_usage(self, usage: Dict):
+        if not usage:
+            return
+        with self._lock:
+            self._calls += 1
+            self._prompt_tokens += usage.get('prompt_tokens', 0)
+            self._cached_tokens += usage.get('cached_tokens', 0)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'version': self.version,
+                'calls': self._calls,
+                'prompt_tokens': self._prompt_tokens,
+                'cached_tokens': self._cached_tokens,
+                'cache_hit_rate': round(self._cached_tokens / self._prompt_tokens, 3) if self._prompt_tokens else 0.0
+            }
+
+
+def prompt_text(messages) -> str:
+    """All message contents of a chat prompt (or the prompt itself when it is a plain string)"""
+    if isinstance(messages, str):
+        return messages
+    return '\n'.join(message['content'] for message in messages)
+
+
+RESUME_ANALYSIS_PROMPT = PromptTemplate(
+    version='resume-analysis/2',
+    system="""Analyze the resume against the job description and provide precise scoring.
+
+Provide analysis in this JSON format:
+{
+    "candidate_name": "Extracted name or filename",
+    "skills_matched": ["skill1", "skill2", "skill3", "skill4", "skill5", "skill6", "skill7", "skill8"],
+    "skills_missing": ["skill1", "skill2", "skill3", "skill4", "skill5", "skill6", "skill7", "skill8"],
+    "experience_summary": "Provide a concise 4-5 sentence summary of candidate's experience. Focus on key roles, achievements, and relevance. Make sure each sentence is complete and not truncated. Write full sentences.",
+    "education_summary": "Provide a concise 4-5 sentence summary of education. Include degrees, institutions, and relevance. Make sure each sentence is complete and not truncated. Write full sentences.",
+    "years_of_experience": "X years",
+    "overall_score": 82.5,
+    "recommendation": "Strongly Recommended/Recommended/Consider/Not Recommended",
+    "key_strengths": ["strength1", "strength2", "strength3"],
+    "areas_for_improvement": ["area1", "area2", "area3"]
+}
+
+IMPORTANT SCORING GUIDELINES:
+1. Use granular scores (e.g., 82.5, 76.3, 88.7, 91.2) - NOT just multiples of 5
+2. Consider these factors for scoring:
+   - Skills match percentage (weight: 40%)
+   - Experience relevance (weight: 30%)
+   - Education alignment (weight: 20%)
+   - Years of experience (weight: 10%)
+3. Provide EXACTLY 3 key_strengths and 3 areas_for_improvement
+4. Write full, complete sentences. Do not cut off sentences mid-way.
+5. Ensure proper sentence endings with periods.
+
+SCORING RANGES:
+- 90-100: Exceptional match (Strongly Recommended)
+- 80-89: Very good match (Recommended)
+- 70-79: Good match (Consider)
+- 60-69: Fair match (Consider with reservations)
+- Below 60: Needs improvement (Not Recommended)""",
+    context="""JOB DESCRIPTION:
+{job_description}
+
+""",
+    suffix="""RESUME:
+{resume_text}"""
+)
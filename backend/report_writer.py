@@ -0,0 +1,341 @@
+import re
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, Font, PatternFill, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
+
+# Colours shared by every report style
+HEADER_BLUE = "4472C4"
+SECTION_BLUE = "D9E1F2"
+EVEN_ROW_GREY = "F2F2F2"
+ODD_ROW_WHITE = "FFFFFF"
+SCORE_GREEN = "00B050"
+SCORE_ORANGE = "FFC000"
+SCORE_RED = "FF0000"
+IMPROVEMENT_ORANGE = "FF6600"
+
+# Title row spans A..L on the comparison sheet and A..H on candidate sheets
+COMPARISON_TITLE_SPAN = 'A1:L1'
+CANDIDATE_TITLE_SPAN = 'A1:H1'
+COMPARISON_HEADER_ROW = 5
+CANDIDATE_HEADER_ROW = 7
+
+
+def convert_experience_to_bullet_points(experience_summary):
+    """Convert experience summary paragraph to bullet points"""
+    if not experience_summary:
+        return "• No experience summary available."
+
+    # Clean the text
+    text = experience_summary.strip()
+
+    # Remove any trailing ellipsis or incomplete sentences
+    if '...' in text:
+        # Find the last complete sentence before ellipsis
+        sentences = text.split('. ')
+        complete_sentences = []
+        for sentence in sentences:
+            if '...' in sentence:
+                # Remove the incomplete part
+                sentence = sentence.split('...')[0]
+                if sentence.strip():
+                    complete_sentences.append(sentence.strip() + '.')
+                break
+            elif sentence.strip():
+                complete_sentences.append(sentence.strip() + '.')
+        text = ' '.join(complete_sentences)
+
+    # Split into sentences
+    sentences = text.replace('\n', ' ').split('. ')
+
+    # Filter out empty sentences
+    sentences = [s.strip() for s in sentences if s.strip()]
+
+    # Ensure proper sentence endings
+    for i, sentence in enumerate(sentences):
+        if not sentence.endswith('.') and not sentence.endswith('!') and not sentence.endswith('?'):
+            sentences[i] = sentence + '.'
+
+    # Limit to 5 bullet points max
+    sentences = sentences[:5]
+
+    # Convert to bullet points
+    bullet_points = '\n'.join([f'• {sentence}' for sentence in sentences])
+
+    return bullet_points
+
+
+def bullet_list(items, limit):
+    """Render the first `limit` items as a bulleted multi-line string"""
+    return "\n".join([f"• {item}" for item in (items or [])[:limit]])
+
+
+def score_band(score) -> str:
+    """Map a score to the high/mid/low colour band used across reports"""
+    if score >= 80:
+        return 'high'
+    elif score >= 60:
+        return 'mid'
+    return 'low'
+
+
+def _thin_border():
+    side = Side(style='thin', color='000000')
+    return Border(left=side, right=side, top=side, bottom=side)
+
+
+def _thick_border():
+    side = Side(style='medium', color='000000')
+    return Border(left=side, right=side, top=side, bottom=side)
+
+
+def _solid(color):
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+# Items shown per list column (skills; strengths and improvements)
+SKILL_LIST_LIMIT = 8
+HIGHLIGHT_LIST_LIMIT = 3
+
+# Columns of the comparison sheet: (header, width, value extractor, style base)
+# The same field order is reused by the lightweight exporters.
+COMPARISON_COLUMNS: List[Tuple[str, int, Callable[[Dict], object], str]] = [
+    ("Rank", 8, lambda a: a.get('rank', '-'), 'rank'),
+    ("Candidate Name", 25, lambda a: a.get('candidate_name', 'Unknown'), 'text'),
+    ("File Name", 25, lambda a: a.get('filename', 'Unknown'), 'text'),
+    ("Years of Experience", 15, lambda a: a.get('years_of_experience', 'Not specified'), 'centered'),
+    ("ATS Score", 12, lambda a: f"{a.get('overall_score', 0):.1f}", 'score'),
+    ("Recommendation", 20, lambda a: a.get('recommendation', 'N/A'), 'text'),
+    ("Experience Summary", 40,
+     lambda a: convert_experience_to_bullet_points(a.get('experience_summary', 'No summary available.')), 'wrapped'),
+    ("Skills Matched", 30, lambda a: bullet_list(a.get('skills_matched'), SKILL_LIST_LIMIT), 'wrapped'),
+    ("Skills Missing", 30, lambda a: bullet_list(a.get('skills_missing'), SKILL_LIST_LIMIT), 'missing'),
+    ("Key Strengths", 25, lambda a: bullet_list(a.get('key_strengths'), HIGHLIGHT_LIST_LIMIT), 'strength'),
+    ("Areas for Improvement", 25, lambda a: bullet_list(a.get('areas_for_improvement'), HIGHLIGHT_LIST_LIMIT), 'improvement'),
+]
+
+# Candidate sheets drop the rank column and use slightly different widths
+CANDIDATE_COLUMNS: List[Tuple[str, int, Callable[[Dict], object], str]] = [
+    ("Candidate Name", 25, lambda a: a.get('candidate_name', 'N/A'), 'plain'),
+    ("File Name", 25, lambda a: a.get('filename', 'N/A'), 'plain'),
+    ("Years of Experience", 20, lambda a: a.get('years_of_experience', 'Not specified'), 'plain'),
+    ("ATS Score", 15, lambda a: f"{a.get('overall_score', 0):.1f}/100", 'score'),
+    ("Recommendation", 20, lambda a: a.get('recommendation', 'N/A'), 'plain'),
+    ("Experience Summary", 40,
+     lambda a: convert_experience_to_bullet_points(a.get('experience_summary', 'No summary available.')), 'wrapped'),
+    ("Skills Matched", 30, lambda a: bullet_list(a.get('skills_matched'), SKILL_LIST_LIMIT), 'wrapped'),
+    ("Skills Missing", 30, lambda a: bullet_list(a.get('skills_missing'), SKILL_LIST_LIMIT), 'missing'),
+    ("Key Strengths", 25, lambda a: bullet_list(a.get('key_strengths'), HIGHLIGHT_LIST_LIMIT), 'strength'),
+    ("Areas for Improvement", 25, lambda a: bullet_list(a.get('areas_for_improvement'), HIGHLIGHT_LIST_LIMIT), 'improvement'),
+]
+
+
+def _build_named_styles() -> List[NamedStyle]:
+    """Create one NamedStyle per visual style used in batch reports"""
+    thin = _thin_border()
+    top_wrap = Alignment(wrap_text=True, vertical='top')
+    center = Alignment(horizontal='center')
+
+    styles = [
+        NamedStyle(name='rpt_title', font=Font(bold=True, size=16, color="FFFFFF"), fill=_solid(HEADER_BLUE),
+                   alignment=Alignment(horizontal='center', vertical='center'), border=_thick_border()),
+        NamedStyle(name='rpt_candidate_title', font=Font(bold=True, size=14, color="FFFFFF"), fill=_solid(HEADER_BLUE),
+                   alignment=Alignment(horizontal='center', vertical='center'), border=_thick_border()),
+        NamedStyle(name='rpt_header', font=Font(bold=True, color="FFFFFF", size=11), fill=_solid(HEADER_BLUE),
+                   alignment=Alignment(horizontal='center', vertical='center', wrap_text=True), border=thin),
+        NamedStyle(name='rpt_section', font=Font(bold=True, size=11, color="000000"), fill=_solid(SECTION_BLUE),
+                   alignment=Alignment(horizontal='center', vertical='center', wrap_text=True), border=thin),
+        NamedStyle(name='rpt_label', font=Font(bold=True, size=10)),
+        NamedStyle(name='rpt_value', font=Font(size=10)),
+        NamedStyle(name='rpt_summary_value', font=Font(bold=True, size=10), alignment=center),
+        NamedStyle(name='rpt_plain', font=Font(size=10, color="000000"), border=thin),
+        NamedStyle(name='rpt_wrapped', font=Font(size=9), alignment=top_wrap, border=thin),
+        NamedStyle(name='rpt_missing', font=Font(size=9, color=SCORE_RED), alignment=top_wrap, border=thin),
+        NamedStyle(name='rpt_strength', font=Font(size=9, color=SCORE_GREEN), alignment=top_wrap, border=thin),
+        NamedStyle(name='rpt_improvement', font=Font(size=9, color=IMPROVEMENT_ORANGE), alignment=top_wrap, border=thin),
+    ]
+    for band, color in (('high', SCORE_GREEN), ('mid', SCORE_ORANGE), ('low', SCORE_RED)):
+        styles.append(NamedStyle(name=f'rpt_score_{band}', font=Font(bold=True, color=color, size=10), border=thin))
+
+    # Comparison rows alternate fills, so every cell style exists in an even and odd variant
+    row_bases = {
+        'rank': dict(font=Font(bold=True, size=10), alignment=center),
+        'text': dict(font=Font(size=10)),
+        'centered': dict(font=Font(size=10), alignment=center),
+        'wrapped': dict(font=Font(size=9), alignment=top_wrap),
+        'missing': dict(font=Font(size=9, color=SCORE_RED), alignment=top_wrap),
+        'strength': dict(font=Font(size=9, color=SCORE_GREEN), alignment=top_wrap),
+        'improvement': dict(font=Font(size=9, color=IMPROVEMENT_ORANGE), alignment=top_wrap),
+    }
+    for band, color in (('high', SCORE_GREEN), ('mid', SCORE_ORANGE), ('low', SCORE_RED)):
+        row_bases[f'score_{band}'] = dict(font=Font(bold=True, color=color, size=10), alignment=center)
+
+    for parity, fill_color in (('even', EVEN_ROW_GREY), ('odd', ODD_ROW_WHITE)):
+        for base, attrs in row_bases.items():
+            styles.append(NamedStyle(name=f'rpt_row_{base}_{parity}', fill=_solid(fill_color), border=thin, **attrs))
+
+    return styles
+
+
+class BatchSummary:
+    """Running statistics accumulated while rows are streamed"""
+
+    __slots__ = ('count', 'score_total', 'top_score', 'bottom_score', 'unique_scores', 'years')
+
+    def __init__(self):
+        self.count = 0
+        self.score_total = 0.0
+        self.top_score = None
+        self.bottom_score = None
+        self.unique_scores = set()
+        self.years = []
+
+    def add(self, analysis: Dict):
+        score = analysis.get('overall_score', 0)
+        self.count += 1
+        self.score_total += score
+        self.top_score = score if self.top_score is None else max(self.top_score, score)
+        self.bottom_score = score if self.bottom_score is None else min(self.bottom_score, score)
+        self.unique_scores.add(round(score, 1))
+
+        # Extract numeric values from years text
+        years_match = re.search(r'(\d+[\+\-]?)', str(analysis.get('years_of_experience', 'Not specified')))
+        if years_match:
+            self.years.append(years_match.group(1))
+
+    def average_years(self) -> str:
+        if not self.years:
+            return "N/A"
+        try:
+            numeric_years = []
+            for y in self.years:
+                if '+' in y:
+                    numeric_years.append(int(y.replace('+', '')) + 2)  # Approximate for +
+                elif '-' in y:
+                    parts = y.split('-')
+                    if len(parts) == 2 and parts[1]:
+                        numeric_years.append((int(parts[0]) + int(parts[1])) / 2)
+                else:
+                    numeric_years.append(int(y))
+            if numeric_years:
+                return f"{sum(numeric_years)/len(numeric_years):.1f} years"
+        except ValueError:
+            return "Various"
+        return "N/A"
+
+    def rows(self) -> List[Tuple[str, str]]:
+        avg_score = round(self.score_total / self.count, 2) if self.count else 0
+        return [
+            ("Average Score:", f"{avg_score:.2f}/100"),
+            ("Highest Score:", f"{(self.top_score or 0):.1f}/100"),
+            ("Lowest Score:", f"{(self.bottom_score or 0):.1f}/100"),
+            ("Average Experience:", self.average_years()),
+            ("Unique Scores:", f"{len(self.unique_scores)}/{self.count}"),
+            ("Analysis Date:", datetime.now().strftime("%Y-%m-%d"))
+        ]
+
+
+class StreamingBatchReportWriter:
+    """
+    Write batch Excel reports with openpyxl's write-only workbook.
+
+    Rows are streamed straight to disk, every cell references a shared
+    NamedStyle and column widths are fixed up front, so memory stays
+    constant per candidate instead of growing with the batch.
+    """
+
+    def __init__(self, model_label: str, include_candidate_sheets: bool = True):
+        self.model_label = model_label
+        self.include_candidate_sheets = include_candidate_sheets
+
+    def _cell(self, ws, value, style: Optional[str] = None):
+        cell = WriteOnlyCell(ws, value=value)
+        if style:
+            cell.style = style
+        return cell
+
+    def write(self, analyses: Iterable[Dict], job_description: str, filepath: str, total: Optional[int] = None) -> str:
+        """Stream `analyses` (already ranked) into a workbook saved at `filepath`"""
+        wb = Workbook(write_only=True)
+        for style in _build_named_styles():
+            wb.add_named_style(style)
+
+        ws = wb.create_sheet("Candidate Comparison")
+        for col, (_, width, _, _) in enumerate(COMPARISON_COLUMNS, start=1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+
+        report_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        jd_preview = job_description[:100] + "..." if len(job_description) > 100 else job_description
+
+        # Title and report info rows
+        ws.merged_cells.add(COMPARISON_TITLE_SPAN)
+        ws.append([self._cell(ws, "RESUME ANALYSIS REPORT - BATCH COMPARISON", 'rpt_title')])
+        ws.append([])
+        info_data = [
+            ("Report Date:", report_date),
+            ("Total Candidates:", total if total is not None else '-'),
+            ("AI Model:", self.model_label),
+            ("Job Description:", jd_preview),
+        ]
+        info_row = []
+        for label, value in info_data:
+            info_row.extend([self._cell(ws, label, 'rpt_label'), self._cell(ws, value, 'rpt_value'), None])
+        ws.append(info_row[:-1])
+        ws.append([])
+
+        ws.append([self._cell(ws, header, 'rpt_header') for header, _, _, _ in COMPARISON_COLUMNS])
+
+        summary = BatchSummary()
+        for idx, analysis in enumerate(analyses):
+            parity = 'even' if idx % 2 == 0 else 'odd'
+            band = score_band(analysis.get('overall_score', 0))
+            row = []
+            for _, _, extract, base in COMPARISON_COLUMNS:
+                style_base = f'score_{band}' if base == 'score' else base
+                row.append(self._cell(ws, extract(analysis), f'rpt_row_{style_base}_{parity}'))
+            ws.append(row)
+            summary.add(analysis)
+
+            if self.include_candidate_sheets:
+                self._write_candidate_sheet(wb, analysis, report_date)
+
+        # Summary statistics below the table
+        ws.append([])
+        summary_row = []
+        for label, value in summary.rows():
+            summary_row.extend([self._cell(ws, label, 'rpt_label'), self._cell(ws, value, 'rpt_summary_value')])
+        ws.append(summary_row)
+
+        wb.save(filepath)
+        return filepath
+
+    def _write_candidate_sheet(self, wb, analysis: Dict, report_date: str):
+        """Write and immediately close one candidate sheet"""
+        candidate_name = analysis.get('candidate_name', f"Candidate_{analysis.get('rank', 'Unknown')}")
+        # Clean sheet name (remove invalid characters)
+        sheet_name = re.sub(r'[\\/*?:[\]]', '_', str(candidate_name)[:31]) or f"Candidate_{analysis.get('rank', '')}"
+
+        ws = wb.create_sheet(title=sheet_name)
+        for col, (_, width, _, _) in enumerate(CANDIDATE_COLUMNS, start=1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        ws.row_dimensions[CANDIDATE_HEADER_ROW + 1].height = 120
+
+        ws.merged_cells.add(CANDIDATE_TITLE_SPAN)
+        ws.append([self._cell(ws, f"CANDIDATE ANALYSIS REPORT - {str(candidate_name).upper()}", 'rpt_candidate_title')])
+        ws.append([])
+        ws.append([self._cell(ws, "Report Date:", 'rpt_label'), self._cell(ws, report_date, 'rpt_value')])
+        ws.append([self._cell(ws, "AI Model:", 'rpt_label'), self._cell(ws, self.model_label, 'rpt_value')])
+        ws.append([self._cell(ws, "Rank:", 'rpt_label'), self._cell(ws, f"#{analysis.get('rank', 'N/A')}", 'rpt_value')])
+        ws.append([])
+
+        ws.append([self._cell(ws, header, 'rpt_section') for header, _, _, _ in CANDIDATE_COLUMNS])
+        band = score_band(analysis.get('overall_score', 0))
+        ws.append([
+            self._cell(ws, extract(analysis), f'rpt_score_{band}' if base == 'score' else f'rpt_{base}')
+            for _, _, extract, base in CANDIDATE_COLUMNS
+        ])
+
+        # Flush the sheet to its temp file now so open handles stay bounded
+        ws.close()
@@ -96,19 +96,20 @@ class ResumeParser:
             print(f"❌ TXT parsing error: {e}")
             return f"Error reading TXT: {str(e)}"
     
-    def analyze_resume(self, text: str) -> Dict:
-        """Comprehensive resume analysis"""
+    def analyze_resume(self, text: str, entity_doc=None, skill_doc=None, cleaned: bool = False) -> Dict:
+        """Comprehensive resume analysis (SpaCy docs may be precomputed by analyze_resumes)"""
         # Basic cleaning
-        text = self.clean_text(text)
+        if not cleaned:
+            text = self.clean_text(text)
         
         # Extract sections
         sections = self.nlp.extract_sections(text)
         
-        # Extract entities
-        entities = self.nlp.extract_entities(text)
-        
         # Extract skills
-        skills = self.nlp.extract_skills(text)
+        skills = self.nlp.extract_skills(text, doc=skill_doc)
+        
+        # Extract entities
+        entities = self.nlp.extract_entities(text, doc=entity_doc, skills=skills)
         
         # Calculate quality metrics
         quality_metrics = self.nlp.calculate_text_quality(text)
@@ -142,6 +143,16 @@ class ResumeParser:
             'analysis_timestamp': datetime.now().isoformat()
         }
     
+    def analyze_resumes(self, texts: List[str], batch_size: int = 16) -> List[Dict]:
+        """Analyze many resumes, running SpaCy over them in batches"""
+        cleaned = [self.clean_text(text) for text in texts]
+        entity_docs, skill_docs = self.nlp.pipe_documents(cleaned, batch_size=batch_size)
+        
+        return [
+            self.analyze_resume(text, entity_doc, skill_doc, cleaned=True)
+            for text, entity_doc, skill_doc in zip(cleaned, entity_docs, skill_docs)
+        ]
+    
     def clean_text(self, text: str) -> str:
         """Clean and normalize text"""
         # Remove extra whitespace
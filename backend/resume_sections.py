@@ -0,0 +1,59 @@
+import re
+from typing import Dict, Optional, Tuple
+
+# Common section headers
+SECTION_PATTERNS: Dict[str, str] = {
+    'contact': r'(?:contact|personal)\s*(?:information|details)?',
+    'summary': r'(?:summary|profile|objective|about)\s*(?:me)?',
+    'experience': r'(?:experience|work\s*experience|employment\s*history)',
+    'education': r'(?:education|academic\s*background|qualifications)',
+    'skills': r'(?:skills|technical\s*skills|competencies)',
+    'projects': r'(?:projects|portfolio|work\s*portfolio)',
+    'certifications': r'(?:certifications|certificates|licenses)'
+}
+
+_COMPILED_PATTERNS = [(section, re.compile(pattern, re.IGNORECASE)) for section, pattern in SECTION_PATTERNS.items()]
+
+# Stricter form for the prompt digest: the header is the whole line ("EXPERIENCE", "## Skills:"),
+# or a label followed by content ("Skills: Python, Go")
+_HEADING_PATTERNS = [
+    (section, re.compile(r'^[#*•\-\s]*' + pattern + r'\s*(?::\s*(?P<rest>.*?))?\s*$', re.IGNORECASE))
+    for section, pattern in SECTION_PATTERNS.items()
+]
+
+
+def section_of(line: str):
+    """
+    Section started by this line if it starts with a section header, else None.
+    Prefix match, as local scoring has always split sections: "Experienced in ..." counts.
+    """
+    line_lower = line.strip().lower()
+    for section, pattern in _COMPILED_PATTERNS:
+        if pattern.match(line_lower):
+            return section
+    return None
+
+
+def split_heading(line: str) -> Tuple[Optional[str], str]:
+    """(section started by this line, text after the header's colon); (None, line) for other lines"""
+    for section, pattern in _HEADING_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            return section, match.group('rest') or ''
+    return None, line
+
+
+def extract_sections(text: str) -> Dict[str, str]:
+    """Extract resume sections; lines before the first header are not assigned to any section"""
+    sections = {section: '' for section in SECTION_PATTERNS}
+    current_section = None
+
+    for line in text.split('\n'):
+        # Check if this line starts a new section
+        current_section = section_of(line) or current_section
+
+        # Add line to current section
+        if current_section and line.strip():
+            sections[current_section] += line + '\n'
+
+    return sections
@@ -0,0 +1,154 @@
+import concurrent.futures
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from typing import Callable, Optional
+
+
+class ScheduledTask:
+    """Handle for a scheduled callback; cancel() stops it (and any repeats)"""
+    __slots__ = ('when', 'seq', 'fn', 'args', 'kwargs', 'interval', 'name', 'cancelled', 'inline')
+
+    def __init__(self, when: float, seq: int, fn: Callable, args: tuple, kwargs: dict,
+                 interval: Optional[float], name: str, inline: bool = False):
+        self.when = when
+        self.seq = seq
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.interval = interval
+        self.name = name
+        self.cancelled = False
+        self.inline = inline
+
+    def __lt__(self, other: 'ScheduledTask'):
+        return (self.when, self.seq) < (other.when, other.seq)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    Heap-based timer queue for all delayed and periodic background work.
+
+    One thread waits for the earliest deadline and hands due callbacks to a
+    small fixed worker pool, so the number of threads stays the same no
+    matter how many timers are pending. Periodic tasks are rescheduled only
+    after a run finishes, so a slow run never overlaps the next one. The
+    thread starts with the first scheduled task; after stop() new tasks are
+    ignored.
+
+    call_later_inline() runs a callback on the timer thread itself, for
+    quick non-blocking work (re-queueing a job) whose timing must not
+    depend on slow jobs occupying the pool.
+    """
+
+    WORKERS = 2
+
+    def __init__(self, workers: int = None, clock=time.monotonic):
+        self._clock = clock
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._workers = workers or self.WORKERS
+        self._executor = None
+        self._thread = None
+        self._running = False
+        self._closed = False
+
+    def start(self):
+        with self._cond:
+            if self._running or self._closed:
+                return
+            self._running = True
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._workers, thread_name_prefix='scheduler-worker'
+            )
+            self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._closed = True
+            if not self._running:
+                return
+            self._running = False
+            self._heap.clear()
+            self._cond.notify_all()
+        self._executor.shutdown(wait=False)
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(1 for task in self._heap if not task.cancelled)
+
+    def call_later(self, delay: float, fn: Callable, *args, **kwargs) -> ScheduledTask:
+        """Run fn(*args, **kwargs) once, `delay` seconds from now"""
+        return self._push(max(0.0, delay), fn, args, kwargs, None)
+
+    def call_later_inline(self, delay: float, fn: Callable, *args, **kwargs) -> ScheduledTask:
+        """Like call_later(), but fn runs on the timer thread; it must return quickly and never block"""
+        return self._push(max(0.0, delay), fn, args, kwargs, None, inline=True)
+
+    def call_at(self, when: float, fn: Callable, *args, **kwargs) -> ScheduledTask:
+        """Run fn once at the scheduler clock time `when`"""
+        return self._push(max(0.0, when - self._clock()), fn, args, kwargs, None)
+
+    def call_every(self, interval: float, fn: Callable, *args, initial_delay: float = None, **kwargs) -> ScheduledTask:
+        """Run fn every `interval` seconds, first after `initial_delay` (default: one interval)"""
+        delay = interval if initial_delay is None else initial_delay
+        return self._push(max(0.0, delay), fn, args, kwargs, interval)
+
+    def _push(self, delay: float, fn: Callable, args: tuple, kwargs: dict, interval: Optional[float],
+              inline: bool = False) -> ScheduledTask:
+        task = ScheduledTask(self._clock() + delay, next(self._seq), fn, args, kwargs, interval,
+                             getattr(fn, '__name__', repr(fn)), inline)
+        self._schedule(task)
+        return task
+
+    def _schedule(self, task: ScheduledTask):
+        self.start()
+        with self._cond:
+            if not self._running:
+                return
+            heapq.heappush(self._heap, task)
+            if self._heap[0] is task:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0].when - self._clock()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if not self._running:
+                    return
+                task = heapq.heappop(self._heap)
+
+            if task.cancelled:
+                continue
+            if task.inline:
+                self._execute(task)
+                continue
+            try:
+                self._executor.submit(self._execute, task)
+            except RuntimeError:
+                return  # executor shut down
+
+    def _execute(self, task: ScheduledTask):
+        try:
+            task.fn(*task.args, **task.kwargs)
+        except Exception:
+            print(f"⚠️ Scheduled task {task.name} failed: {traceback.format_exc()}")
+        finally:
+            if task.interval is not None and not task.cancelled and self._running:
+                task.when = self._clock() + task.interval
+                task.seq = next(self._seq)
+                self._schedule(task)
@@ -8,6 +8,7 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import jellyfish
 from .nlp_processor import NLPProcessor
+from .industries import INDUSTRY_KEYWORDS, detect_industries
 
 class ScoringEngine:
     """Advanced scoring engine for resume-job matching"""
@@ -32,44 +33,14 @@ class ScoringEngine:
     
     def _load_industry_keywords(self) -> Dict[str, List[str]]:
         """Load industry-specific keywords"""
-        return {
-            'software_engineering': [
-                'software development', 'backend', 'frontend', 'full stack', 'api', 'microservices',
-                'agile', 'scrum', 'devops', 'ci/cd', 'testing', 'debugging', 'code review',
-                'version control', 'git', 'architecture', 'design patterns', 'algorithms',
-                'data structures', 'optimization', 'performance', 'scalability', 'security'
-            ],
-            'data_science': [
-                'machine learning', 'deep learning', 'ai', 'data analysis', 'statistics',
-                'python', 'r', 'sql', 'pandas', 'numpy', 'tensorflow', 'pytorch', 'scikit-learn',
-                'data visualization', 'tableau', 'power bi', 'big data', 'hadoop', 'spark',
-                'etl', 'data mining', 'predictive modeling', 'natural language processing'
-            ],
-            'cloud_devops': [
-                'aws', 'azure', 'google cloud', 'docker', 'kubernetes', 'terraform',
-                'ansible', 'jenkins', 'github actions', 'ci/cd', 'infrastructure as code',
-                'monitoring', 'logging', 'security', 'networking', 'load balancing',
-                'auto-scaling', 'containerization', 'orchestration', 'serverless'
-            ],
-            'product_management': [
-                'product strategy', 'roadmap', 'user stories', 'agile', 'scrum',
-                'market research', 'competitive analysis', 'user experience', 'ui/ux',
-                'metrics', 'kpis', 'a/b testing', 'customer development', 'prioritization',
-                'stakeholder management', 'requirements gathering', 'product launch'
-            ],
-            'marketing': [
-                'digital marketing', 'seo', 'sem', 'social media', 'content marketing',
-                'email marketing', 'analytics', 'google analytics', 'campaign management',
-                'brand management', 'market research', 'crm', 'salesforce', 'hubspot',
-                'conversion optimization', 'lead generation', 'customer acquisition'
-            ]
-        }
+        return INDUSTRY_KEYWORDS
     
-    def calculate_score(self, resume_data: Dict, job_description: str) -> Dict:
-        """Calculate comprehensive matching score"""
+    def calculate_score(self, resume_data: Dict, job_description: str, job_analysis: Dict = None) -> Dict:
+        """Calculate comprehensive matching score (job_analysis: precomputed JD profile)"""
         
         # Parse job description
-        job_analysis = self.analyze_job_description(job_description)
+        if job_analysis is None:
+            job_analysis = self.analyze_job_description(job_description)
         
         # Calculate individual scores
         scores = {
@@ -87,8 +58,8 @@ class ScoringEngine:
         total_score = sum(score * self.weights[category] 
                          for category, score in scores.items())
         
-        # Apply curve for more realistic distribution
-        total_score = self.apply_scoring_curve(total_score)
+        # Apply curve for more realistic distribution, on the 0-100 scale
+        total_score = self.apply_scoring_curve(total_score) * 100
         
         # Calculate grade and recommendation
         grade, recommendation = self.get_grade_and_recommendation(total_score)
@@ -100,7 +71,7 @@ class ScoringEngine:
         matched_skills = self.identify_matched_skills(resume_data, job_analysis)
         
         return {
-            'overall_score': round(total_score),
+            'overall_score': round(total_score, 1),
             'grade': grade,
             'recommendation': recommendation,
             'detailed_scores': scores,
@@ -500,15 +471,7 @@ class ScoringEngine:
     def detect_industry(self, job_description: str) -> List[str]:
         """Detect industry from job description"""
         
-        industries = []
-        desc_lower = job_description.lower()
-        
-        for industry, keywords in self.industry_keywords.items():
-            keyword_count = sum(1 for keyword in keywords if keyword in desc_lower)
-            if keyword_count >= 3:  # Threshold for industry detection
-                industries.append(industry)
-        
-        return industries if industries else ['general']
+        return detect_industries(job_description)
     
     def detect_experience_level(self, job_description: str) -> str:
         """Detect required experience level"""
@@ -0,0 +1,144 @@
+import json
+import math
+import os
+import threading
+import zlib
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from dedup import normalize_text
+
+
+class CandidateSearchIndex:
+    """
+    Similarity index over the text of every analyzed resume.
+
+    Each resume is a hashed, sublinear term-frequency vector (L2-normalized)
+    stored as one row of a float32 np.memmap, so the matrix lives on disk and
+    is paged in on demand. Document frequencies are kept alongside and
+    applied to the query as IDF weights, so a search is a single
+    matrix-vector product over all rows followed by a top-k partition.
+    """
+
+    DIMENSIONS = 1 << 13
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, folder: str, dimensions: int = None):
+        self.folder = folder
+        self.dimensions = dimensions or self.DIMENSIONS
+        self._matrix_path = os.path.join(folder, 'vectors.f32')
+        self._ids_path = os.path.join(folder, 'ids.txt')
+        self._df_path = os.path.join(folder, 'df.npy')
+        self._meta_path = os.path.join(folder, 'meta.json')
+        self._lock = threading.Lock()
+        self._ids: List[str] = []
+        self._known = set()
+        self._df = np.zeros(self.dimensions, dtype=np.int32)
+        self._capacity = 0
+        self._matrix = None
+        os.makedirs(folder, exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _load(self):
+        try:
+            with open(self._meta_path) as meta_file:
+                meta = json.load(meta_file)
+            if meta.get('dimensions') != self.dimensions:
+                raise ValueError('dimension mismatch')
+            with open(self._ids_path) as ids_file:
+                ids = [line.rstrip('\n') for line in ids_file if line.strip()]
+            count = min(meta.get('count', 0), len(ids))
+            self._ids = ids[:count]
+            self._known = set(self._ids)
+            self._df = np.load(self._df_path).astype(np.int32)
+            self._capacity = meta['capacity']
+            self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode='r+',
+                                     shape=(self._capacity, self.dimensions))
+        except (OSError, ValueError, KeyError):
+            self._ids, self._known = [], set()
+            self._df = np.zeros(self.dimensions, dtype=np.int32)
+            self._resize(self.INITIAL_CAPACITY)
+
+    def _resize(self, capacity: int):
+        """Grow the backing file; existing rows are kept in place"""
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self._matrix_path, 'ab') as matrix_file:
+            matrix_file.truncate(capacity * self.dimensions * 4)
+        self._capacity = capacity
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode='r+',
+                                 shape=(capacity, self.dimensions))
+
+    def vectorize(self, text: str) -> np.ndarray:
+        """Hashed sublinear TF vector, L2-normalized"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        counts = {}
+        for token in normalize_text(text):
+            if len(token) > 1:
+                bucket = zlib.crc32(token.encode('utf-8')) % self.dimensions
+                counts[bucket] = counts.get(bucket, 0) + 1
+        if not counts:
+            return vector
+        buckets = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        vector[buckets] = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        vector /= np.linalg.norm(vector)
+        return vector
+
+    def add_many(self, documents: Iterable[Tuple[str, str]]) -> int:
+        """Index (analysis_id, resume_text) pairs; already indexed ids are skipped"""
+        vectors = [(analysis_id, self.vectorize(text)) for analysis_id, text in documents
+                   if analysis_id and text]
+
+        with self._lock:
+            added = []
+            for analysis_id, vector in vectors:
+                if analysis_id in self._known or not vector.any():
+                    continue
+                row = len(self._ids)
+                if row >= self._capacity:
+                    self._resize(self._capacity * 2)
+                self._matrix[row] = vector
+                self._df[vector > 0] += 1
+                self._ids.append(analysis_id)
+                self._known.add(analysis_id)
+                added.append(analysis_id)
+
+            if added:
+                self._persist(added)
+            return len(added)
+
+    def _persist(self, added_ids: List[str]):
+        self._matrix.flush()
+        with open(self._ids_path, 'a') as ids_file:
+            ids_file.write(''.join(f"{analysis_id}\n" for analysis_id in added_ids))
+        np.save(self._df_path, self._df)
+        tmp_path = self._meta_path + '.tmp'
+        with open(tmp_path, 'w') as meta_file:
+            json.dump({'dimensions': self.dimensions, 'count': len(self._ids),
+                       'capacity': self._capacity}, meta_file)
+        os.replace(tmp_path, self._meta_path)
+
+    def search(self, query_text: str, k: int = 50) -> List[Tuple[str, float]]:
+        """Top-k (analysis_id, cosine similarity) for a job description"""
+        query = self.vectorize(query_text)
+        with self._lock:
+            count = len(self._ids)
+            if count == 0 or not query.any():
+                return []
+            matrix = self._matrix[:count]
+            ids = self._ids[:count]
+            idf = np.log((count + 1) / (self._df + 1), dtype=np.float32) + 1.0
+
+        query *= idf
+        query /= np.linalg.norm(query)
+        scores = matrix @ query
+
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], round(float(scores[i]), 4)) for i in top if math.isfinite(scores[i]) and scores[i] > 0]
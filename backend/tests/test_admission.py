@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+from fair_queue import LANE_INTERACTIVE
+
+
+def wait_for_queue_depth(controller, depth, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while controller.stats()['queue_depth'] != depth:
+        assert time.monotonic() < deadline, 'request never queued'
+        time.sleep(0.005)
+
+
+def test_requests_within_capacity_are_admitted_at_once():
+    controller = AdmissionController(lambda: 3, max_queue=1, max_wait=0.1)
+
+    assert controller.admit(2) == 2
+    assert controller.admit() == 1
+    assert controller.stats()['in_use'] == 3
+
+
+def test_cost_is_capped_at_capacity():
+    controller = AdmissionController(lambda: 2, max_queue=1, max_wait=0.1)
+
+    assert controller.admit(10) == 2
+
+
+def test_full_queue_is_rejected_immediately():
+    controller = AdmissionController(lambda: 1, max_queue=0, max_wait=5.0)
+    controller.admit()
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit()
+
+    assert rejected.value.reason == 'queue_full'
+    assert rejected.value.retry_after >= 1
+    assert controller.stats()['rejected_queue_full'] == 1
+
+
+def test_queued_request_times_out():
+    controller = AdmissionController(lambda: 1, max_queue=1, max_wait=0.05)
+    controller.admit()
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit()
+
+    assert rejected.value.reason == 'queue_timeout'
+    assert controller.stats()['rejected_timeout'] == 1
+    assert controller.stats()['queue_depth'] == 0
+
+
+def test_queued_request_is_admitted_on_release():
+    controller = AdmissionController(lambda: 1, max_queue=1, max_wait=2.0)
+    granted = controller.admit()
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(controller.admit()))
+    waiter.start()
+    wait_for_queue_depth(controller, 1)
+
+    controller.release(granted, held_for=1.0)
+    waiter.join(2)
+
+    assert results == [1]
+
+
+def start_blocked_head(controller):
+    """Occupy one of two slots and queue a two-slot head behind it"""
+    first = controller.admit()
+    results = []
+    head = threading.Thread(target=lambda: results.append(controller.admit(2)))
+    head.start()
+    wait_for_queue_depth(controller, 1)
+    return first, head, results
+
+
+def test_interactive_requests_bypass_a_blocked_head_up_to_max_bypass():
+    controller = AdmissionController(lambda: 2, max_queue=5, max_wait=5.0, max_bypass=1)
+    first, head, results = start_blocked_head(controller)
+
+    granted = controller.admit(lane=LANE_INTERACTIVE)
+    controller.release(granted)
+    controller.max_wait = 0.05
+    with pytest.raises(AdmissionRejected):
+        controller.admit(lane=LANE_INTERACTIVE)
+
+    controller.release(first)
+    head.join(2)
+    assert results == [2]
+    assert controller.stats()['interactive_bypasses'] == 1
+
+
+def test_batch_requests_never_bypass_the_head():
+    controller = AdmissionController(lambda: 2, max_queue=5, max_wait=5.0)
+    first, head, results = start_blocked_head(controller)
+
+    controller.max_wait = 0.05
+    with pytest.raises(AdmissionRejected):
+        controller.admit()
+
+    controller.release(first)
+    head.join(2)
+    assert results == [2]
+    assert controller.stats()['interactive_bypasses'] == 0
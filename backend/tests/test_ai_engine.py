@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+for module in ('spacy', 'nltk', 'textblob', 'sklearn', 'jellyfish', 'PyPDF2', 'docx'):
+    pytest.importorskip(module)
+
+from backend.ai_engine import AIEngine
+
+
+class StubParser:
+    def __init__(self):
+        self.batches = []
+
+    def analyze_resumes(self, texts):
+        self.batches.append(len(texts))
+        return [{'text': text} for text in texts]
+
+    def analyze_resume(self, text):
+        return {'text': text}
+
+
+class StubScoring:
+    def analyze_job_description(self, job_description):
+        return {'jd': job_description}
+
+    def calculate_score(self, resume_data, job_description, job_profile):
+        return {'overall_score': float(len(resume_data['text']))}
+
+
+def make_engine():
+    engine = AIEngine.__new__(AIEngine)
+    engine.parser = StubParser()
+    engine.scoring = StubScoring()
+    engine._pool = None
+    engine._pool_lock = threading.Lock()
+    engine.generate_analysis = lambda resume_data, scores, filename=None: {
+        'candidate_name': filename, 'overall_score': scores['overall_score']
+    }
+    return engine
+
+
+def test_plan_chunks_spreads_resumes_over_every_worker():
+    chunks = AIEngine.plan_chunks(10, 4)
+    assert [len(chunk) for chunk in chunks] == [2, 3, 2, 3]
+    assert [i for chunk in chunks for i in chunk] == list(range(10))
+
+
+def test_plan_chunks_keeps_a_minimum_chunk_size():
+    assert [len(chunk) for chunk in AIEngine.plan_chunks(5, 16)] == [2, 3]
+    assert [len(chunk) for chunk in AIEngine.plan_chunks(1, 8)] == [1]
+    assert AIEngine.plan_chunks(0, 8) == []
+
+
+def test_plan_chunks_with_fixed_size():
+    assert [len(chunk) for chunk in AIEngine.plan_chunks(10, 4, chunk_size=8)] == [8, 2]
+
+
+def test_analyze_batch_in_process_keeps_batch_index():
+    engine = make_engine()
+    resumes = [{'text': 'x' * (i + 1), 'filename': f'r{i}.pdf'} for i in range(5)]
+
+    results = list(engine.analyze_batch(resumes, 'python developer', max_workers=1))
+
+    assert sorted(result['batch_index'] for result in results) == list(range(5))
+    assert {result['candidate_name'] for result in results} == {f'r{i}.pdf' for i in range(5)}
+    assert engine.parser.batches == [5]
+    assert engine._pool is None
+
+
+def test_analyze_batch_falls_back_when_a_resume_fails():
+    engine = make_engine()
+    engine.scoring.calculate_score = lambda resume_data, *args: 1 / 0
+    engine.generate_fallback_analysis = lambda filename, reason: {'candidate_name': filename, 'error': reason}
+
+    results = list(engine.analyze_batch([{'text': 'a', 'filename': 'a.pdf'}], 'jd', max_workers=1))
+
+    assert results == [{'candidate_name': 'a.pdf', 'error': 'division by zero', 'batch_index': 0}]
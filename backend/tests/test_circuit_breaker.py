@@ -0,0 +1,72 @@
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def open_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker('groq', failure_threshold=2, reset_timeout=10.0, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker, clock
+
+
+def test_consecutive_failures_open_the_circuit():
+    breaker, _ = open_breaker()
+
+    assert breaker.state == OPEN
+    assert not breaker.available()
+    assert breaker.retry_in() == 10.0
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker('groq', failure_threshold=2)
+
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.state == CLOSED
+
+
+def test_half_open_lets_a_single_probe_through():
+    breaker, clock = open_breaker()
+    clock.now += 10.0
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.available()
+    breaker.begin()
+    assert not breaker.available()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.available()
+
+
+def test_failed_probe_opens_the_circuit_again():
+    breaker, clock = open_breaker()
+    clock.now += 10.0
+
+    breaker.begin()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.retry_in() == 10.0
+    assert breaker.stats()['opens'] == 2
+
+
+def test_neutral_result_ends_the_probe():
+    breaker, clock = open_breaker()
+    clock.now += 10.0
+
+    breaker.begin()
+    breaker.record_neutral()
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.available()
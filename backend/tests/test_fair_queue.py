@@ -0,0 +1,76 @@
+import threading
+
+from fair_queue import LANE_BATCH, LANE_INTERACTIVE, FairQueue
+
+
+def drain_order(queue, count):
+    return [queue.get() for _ in range(count)]
+
+
+def test_interactive_lane_gets_its_weighted_share():
+    queue = FairQueue()
+    for i in range(8):
+        queue.put(f'b{i}', tenant='batch-client', lane=LANE_BATCH)
+    for i in range(8):
+        queue.put(f'i{i}', tenant='web-client', lane=LANE_INTERACTIVE)
+
+    first = drain_order(queue, 5)
+
+    assert first == ['b0', 'i0', 'i1', 'i2', 'i3']
+
+
+def test_tenants_in_one_lane_are_interleaved():
+    queue = FairQueue()
+    for i in range(3):
+        queue.put(f'a{i}', tenant='a')
+    for i in range(3):
+        queue.put(f'b{i}', tenant='b')
+
+    assert drain_order(queue, 6) == ['a0', 'b0', 'a1', 'b1', 'a2', 'b2']
+
+
+def test_single_interactive_item_skips_a_batch_backlog():
+    queue = FairQueue()
+    for i in range(10):
+        queue.put(f'b{i}', tenant='a')
+    queue.get()
+    queue.put('single', tenant='b', lane=LANE_INTERACTIVE)
+
+    assert queue.get() == 'single'
+
+
+def test_control_items_go_first_without_admission():
+    queue = FairQueue()
+    queue.put('job')
+    queue.put(None)
+
+    assert queue.get(lambda: False) is None
+    assert queue.qsize() == 1
+
+
+def test_get_waits_for_admit_until_woken():
+    queue = FairQueue()
+    queue.put('job')
+    open_slot = threading.Event()
+    results = []
+    consumer = threading.Thread(target=lambda: results.append(queue.get(open_slot.is_set)))
+    consumer.start()
+
+    consumer.join(0.1)
+    assert consumer.is_alive()
+
+    open_slot.set()
+    queue.wake()
+    consumer.join(2)
+    assert results == ['job']
+
+
+def test_drain_empties_the_queue_in_service_order():
+    queue = FairQueue()
+    queue.put('b0', tenant='a')
+    queue.put('b1', tenant='a')
+    queue.put('i0', tenant='b', lane=LANE_INTERACTIVE)
+
+    assert queue.drain() == ['b0', 'i0', 'b1']
+    assert queue.empty()
+    assert queue.lanes() == {LANE_INTERACTIVE: 0, LANE_BATCH: 0}
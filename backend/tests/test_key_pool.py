@@ -0,0 +1,50 @@
+from key_pool import KeyPool, load_api_keys
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_load_api_keys_merges_sources_without_duplicates():
+    environ = {'GROQ_API_KEY_2': 'b', 'GROQ_API_KEY_1': 'a', 'GROQ_API_KEYS': 'c, a d'}
+
+    assert load_api_keys(environ) == ['a', 'b', 'c', 'd']
+
+
+def test_acquire_prefers_the_least_loaded_key():
+    pool = KeyPool(['a', 'b'], max_requests_per_window=10)
+
+    assert pool.acquire() == ('a', 1)
+    assert pool.acquire() == ('b', 2)
+    assert pool.acquire(preferred=0, strict=True) == ('a', 1)
+
+
+def test_cooling_key_is_skipped_until_its_deadline():
+    clock = FakeClock()
+    pool = KeyPool(['a', 'b'], max_requests_per_window=10, clock=clock)
+
+    pool.cool(1, 5.0)
+    assert pool.acquire() == ('b', 2)
+    assert pool.acquire(preferred=0, strict=True) == (None, None)
+
+    clock.now += 5.0
+    assert pool.acquire(preferred=0, strict=True) == ('a', 1)
+
+
+def test_reload_keeps_numbers_and_never_reuses_them():
+    pool = KeyPool(['a', 'b', 'c'], max_requests_per_window=10)
+    _, number = pool.acquire(preferred=1, strict=True)
+
+    assert pool.reload(['a', 'c', 'd']) == (1, 1)
+    assert pool.configured() == [(0, 'a'), (2, 'c'), (3, 'd')]
+
+    pool.release(number)
+    assert [row['in_flight'] for row in pool.snapshot()] == [0, 0, 0, 0]
+
+    assert pool.reload(['a', 'b']) == (1, 2)
+    assert pool.configured() == [(0, 'a'), (4, 'b')]
+    assert len(pool) == 2
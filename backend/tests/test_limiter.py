@@ -0,0 +1,84 @@
+from limiter import AIMDLimiter
+
+
+class FakeClock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def fill_and_release_one(limiter, latency=1.0):
+    while limiter.try_acquire():
+        pass
+    limiter.release(latency=latency)
+
+
+def test_saturated_successes_raise_the_limit_additively():
+    limiter = AIMDLimiter(initial=2, max_limit=4, clock=FakeClock())
+
+    for _ in range(4):
+        fill_and_release_one(limiter)
+
+    assert limiter.limit == 3
+    assert limiter.stats()['increases'] == 4
+
+
+def test_success_below_the_limit_holds_it():
+    limiter = AIMDLimiter(initial=2, max_limit=4, clock=FakeClock())
+
+    limiter.acquire()
+    limiter.release(latency=1.0)
+
+    assert limiter.stats()['limit_exact'] == 2.0
+
+
+def test_slow_success_holds_the_limit():
+    limiter = AIMDLimiter(initial=2, max_limit=4, clock=FakeClock())
+    fill_and_release_one(limiter, latency=1.0)
+    before = limiter.stats()['limit_exact']
+
+    fill_and_release_one(limiter, latency=1.0 * AIMDLimiter.LATENCY_TOLERANCE + 1)
+
+    assert limiter.stats()['limit_exact'] == before
+
+
+def test_overload_halves_the_limit_once_per_backoff_interval():
+    clock = FakeClock()
+    limiter = AIMDLimiter(initial=8, max_limit=8, clock=clock)
+
+    limiter.acquire()
+    limiter.release(overloaded=True)
+    limiter.acquire()
+    limiter.release(overloaded=True)
+    assert limiter.limit == 4
+
+    clock.now += AIMDLimiter.MIN_BACKOFF_INTERVAL
+    limiter.acquire()
+    limiter.release(overloaded=True)
+    assert limiter.limit == 2
+    assert limiter.stats()['decreases'] == 2
+
+
+def test_limit_never_drops_below_min_limit():
+    clock = FakeClock()
+    limiter = AIMDLimiter(initial=2, max_limit=8, min_limit=2, clock=clock)
+
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(overloaded=True)
+        clock.now += AIMDLimiter.MIN_BACKOFF_INTERVAL
+
+    assert limiter.limit == 2
+
+
+def test_try_acquire_respects_the_limit_and_close():
+    limiter = AIMDLimiter(initial=1, max_limit=4)
+
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release()
+    limiter.close()
+    assert not limiter.try_acquire()
+    assert not limiter.acquire()
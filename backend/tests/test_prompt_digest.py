@@ -0,0 +1,30 @@
+from prompt_digest import build_resume_digest, count_tokens, truncate_to_tokens
+
+FILLER = '\n'.join(f'Attended weekly meeting number {i} about office logistics and catering' for i in range(60))
+
+
+def test_short_resume_is_only_compacted():
+    digest, original, tokens = build_resume_digest('Jane Doe\n\n\nSkills\nPython   Go', 'python', 500)
+    assert digest == 'Jane Doe\nSkills\nPython Go'
+    assert tokens <= original
+
+
+def test_digest_keeps_relevant_lines_within_budget():
+    resume = ('Jane Doe\nEngineer\nSummary\nExperienced in Kubernetes, Terraform and AWS across many teams\n'
+              'Skills: Python, Go, Kubernetes, Terraform, AWS, PostgreSQL, Kafka\nExperience\n' + FILLER +
+              '\nEducation\nBSc Computer Science')
+
+    digest, original, tokens = build_resume_digest(resume, 'Kubernetes Terraform AWS Python Kafka engineer', 300)
+
+    assert tokens <= 300 < original
+    lines = digest.split('\n')
+    assert lines[:2] == ['Jane Doe', 'Engineer']
+    assert 'Experienced in Kubernetes, Terraform and AWS across many teams' in lines
+    assert 'Skills: Python, Go, Kubernetes, Terraform, AWS, PostgreSQL, Kafka' in lines
+    assert lines.index('Summary') < lines.index('Experienced in Kubernetes, Terraform and AWS across many teams')
+
+
+def test_truncate_to_tokens_cuts_at_the_budget():
+    text = truncate_to_tokens(FILLER, 50)
+    assert 0 < count_tokens(text) <= 50
+    assert FILLER.startswith(text)
@@ -0,0 +1,23 @@
+from resume_sections import extract_sections, section_of, split_heading
+
+
+def test_section_of_keeps_prefix_matching_for_local_scoring():
+    assert section_of('EXPERIENCE') == 'experience'
+    assert section_of('Experience: 5 years in backend teams') == 'experience'
+    assert section_of('Skills include Python and Go') == 'skills'
+    assert section_of('Led a team of five') is None
+
+
+def test_extract_sections_splits_on_prefix_headers():
+    sections = extract_sections('Jane Doe\nSummary\nBackend engineer\nSkills include Python\nBSc')
+    assert sections['summary'] == 'Summary\nBackend engineer\n'
+    assert sections['skills'] == 'Skills include Python\nBSc\n'
+
+
+def test_split_heading_only_accepts_whole_line_headers():
+    assert split_heading('## Skills:') == ('skills', '')
+    assert split_heading('• Technical Skills') == ('skills', '')
+    assert split_heading('Work Experience') == ('experience', '')
+    assert split_heading('Skills: Python, Go') == ('skills', 'Python, Go')
+    assert split_heading('Experienced in Kubernetes') == (None, 'Experienced in Kubernetes')
+    assert split_heading('Education at MIT') == (None, 'Education at MIT')
@@ -0,0 +1,50 @@
+import threading
+
+from scheduler import Scheduler
+
+
+def test_call_later_runs_once():
+    scheduler = Scheduler()
+    ran = threading.Event()
+    try:
+        scheduler.call_later(0.01, ran.set)
+        assert ran.wait(2)
+        assert scheduler.pending() == 0
+    finally:
+        scheduler.stop()
+
+
+def test_inline_task_runs_while_the_worker_pool_is_busy():
+    scheduler = Scheduler(workers=1)
+    unblock = threading.Event()
+    threads = []
+    ran = threading.Event()
+    try:
+        scheduler.call_later(0, unblock.wait, 5)
+        scheduler.call_later_inline(0.05, lambda: (threads.append(threading.current_thread().name), ran.set()))
+
+        assert ran.wait(2)
+        assert threads == ['scheduler']
+    finally:
+        unblock.set()
+        scheduler.stop()
+
+
+def test_cancelled_periodic_task_stops_repeating():
+    scheduler = Scheduler()
+    runs = []
+    twice = threading.Event()
+
+    def tick():
+        runs.append(1)
+        if len(runs) == 2:
+            task.cancel()
+            twice.set()
+
+    try:
+        task = scheduler.call_every(0.01, tick)
+        assert twice.wait(2)
+        assert scheduler.pending() == 0
+        assert len(runs) == 2
+    finally:
+        scheduler.stop()
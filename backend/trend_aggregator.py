@@ -0,0 +1,163 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from models import db, SkillTrend
+
+# Industry of the bucket every analysis is counted in once, whatever industries it matched
+ALL_INDUSTRIES = '*'
+
+
+class SkillTrendAggregator:
+    """
+    Incremental skill frequency counters behind the skill_trends table.
+
+    Finished analyses only bump in-memory counters keyed by
+    (skill, industry, day). The counters are flushed as one batched UPSERT
+    once enough keys are pending or the flush interval has passed, so trend
+    queries read pre-aggregated daily buckets instead of rescanning stored
+    analyses. Each analysis is also counted once under ALL_INDUSTRIES, which
+    the unfiltered view reads, so a job description matching several
+    industries is not counted once per industry there.
+    """
+
+    FLUSH_INTERVAL = 60  # seconds
+    MAX_PENDING_KEYS = 5000
+    MAX_WINDOW_DAYS = 365
+
+    def __init__(self, flush_interval: int = None, max_pending_keys: int = None):
+        self.flush_interval = flush_interval or self.FLUSH_INTERVAL
+        self.max_pending_keys = max_pending_keys or self.MAX_PENDING_KEYS
+        self._counts = Counter()
+        self._last_seen: Dict[tuple, datetime] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def normalize_skill(skill) -> str:
+        return ' '.join(str(skill).split()).lower()[:200]
+
+    def record(self, skills: Iterable, industries: Iterable[str], seen_at: datetime = None):
+        """Count the skills of one analysis under each industry and once under ALL_INDUSTRIES"""
+        seen_at = seen_at or datetime.utcnow()
+        day = seen_at.date()
+        names = {self.normalize_skill(skill) for skill in skills or [] if str(skill).strip()}
+        if not names:
+            return
+
+        with self._lock:
+            for industry in set(industries or ['general']) | {ALL_INDUSTRIES}:
+                for name in names:
+                    key = (name, industry, day)
+                    self._counts[key] += 1
+                    self._last_seen[key] = seen_at
+            due = (len(self._counts) >= self.max_pending_keys or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+
+        if due:
+            self.flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._counts)
+
+    def flush(self) -> int:
+        """Write pending counters with one batched UPSERT; returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, Counter()
+                last_seen, self._last_seen = self._last_seen, {}
+                self._last_flush = time.monotonic()
+            if not counts:
+                return 0
+
+            rows = [
+                {
+                    'skill_name': skill_name,
+                    'industry': industry,
+                    'period_start': day,
+                    'frequency': count,
+                    'last_seen': last_seen[(skill_name, industry, day)]
+                }
+                for (skill_name, industry, day), count in counts.items()
+            ]
+            try:
+                self._upsert(rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                # Put the counts back so the next flush retries them
+                with self._lock:
+                    self._counts.update(counts)
+                    for key, seen in last_seen.items():
+                        self._last_seen[key] = max(seen, self._last_seen.get(key, seen))
+                raise
+            return len(rows)
+
+    def _upsert(self, rows: List[Dict]):
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            insert = None
+
+        if insert is None:
+            self._merge_rows(rows)
+            return
+
+        statement = insert(SkillTrend)
+        statement = statement.on_conflict_do_update(
+            index_elements=['skill_name', 'industry', 'period_start'],
+            set_={
+                'frequency': SkillTrend.frequency + statement.excluded.frequency,
+                'last_seen': statement.excluded.last_seen
+            }
+        )
+        db.session.execute(statement, rows)
+
+    def _merge_rows(self, rows: List[Dict]):
+        """Portable read-modify-write fallback for databases without ON CONFLICT"""
+        for row in rows:
+            record = db.session.execute(
+                db.select(SkillTrend).filter_by(
+                    skill_name=row['skill_name'], industry=row['industry'], period_start=row['period_start']
+                )
+            ).scalar_one_or_none()
+            if record is None:
+                db.session.add(SkillTrend(**row))
+            else:
+                record.frequency = (record.frequency or 0) + row['frequency']
+                record.last_seen = max(record.last_seen or row['last_seen'], row['last_seen'])
+
+    def top_skills(self, industry: Optional[str] = None, days: int = 30, k: int = 20) -> List[Dict]:
+        """Top-k skills over the last `days` daily buckets, optionally for one industry"""
+        days = max(1, min(days, self.MAX_WINDOW_DAYS))
+        since = datetime.utcnow().date() - timedelta(days=days - 1)
+        total = db.func.sum(SkillTrend.frequency).label('frequency')
+
+        query = (
+            db.select(SkillTrend.skill_name, total, db.func.max(SkillTrend.last_seen).label('last_seen'))
+            .filter(SkillTrend.period_start >= since)
+            .group_by(SkillTrend.skill_name)
+            .order_by(total.desc(), SkillTrend.skill_name)
+            .limit(k)
+        )
+        query = query.filter(SkillTrend.industry == (industry or ALL_INDUSTRIES))
+
+        return [
+            {
+                'skill': row.skill_name,
+                'frequency': int(row.frequency or 0),
+                'last_seen': row.last_seen.isoformat() if row.last_seen else None
+            }
+            for row in db.session.execute(query)
+        ]
+
+    def industries(self) -> List[str]:
+        return list(db.session.scalars(
+            db.select(SkillTrend.industry).filter(SkillTrend.industry != ALL_INDUSTRIES).distinct().order_by(SkillTrend.industry)
+        ))